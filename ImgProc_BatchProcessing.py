@@ -0,0 +1,633 @@
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+
+import cv2
+import numpy as np
+
+from ImgProc_ImageLoading import LeitorAntecipado, ampliar_coordenadas, carregar_imagem, decodificar
+from ImgProc_Instrumentation import (Instrumentacao, adicionar_argumentos, etapa, instrumentar, medir_blocos, perfil,
+                                     salvar_jsonl)
+from ImgProc_Instrumentation import exibir_resumo as exibir_resumo_etapas
+
+EXTENSOES_IMAGEM = (".jpg", ".jpeg", ".png", ".bmp")
+
+# Pastas de saída usadas por cada pipeline (as mesmas dos scripts interativos)
+PASTAS_SAIDA = {
+    "monitoramento": ("csv_coordenadas", "csv_distancias"),
+    "distancias": ("csv_coordinates", "csv_distances"),
+}
+
+# Sufixos dos CSVs de coordenadas e de distâncias de cada pipeline (os mesmos dos scripts interativos)
+SUFIXOS_SAIDA = {
+    "monitoramento": ("_coordenadas", "_distancias"),
+    "distancias": ("_coordinates", "_distances"),
+}
+
+# Separador das pastas no nome das saídas de imagens que estão em subpastas das entradas
+SEPARADOR_PASTAS = "__"
+
+# Pastas das figuras com os pontos desenhados (--sobreposicao)
+PASTAS_FIGURAS = {
+    "monitoramento": "sobreposicoes",
+    "distancias": "overlays",
+}
+
+# Máximo de imagens enviadas de uma vez a cada processo (a leitura antecipada acontece dentro do grupo)
+TAMANHO_GRUPO = 8
+
+# Modos de detecção do pipeline "monitoramento" (--deteccao): imagem inteira, pirâmide ou blocos
+MODOS_DETECCAO = ("completa", "piramide", "blocos")
+
+# Modos de distância cujos pares são desenhados como arestas na figura (os demais seriam densos demais)
+MODOS_COM_ARESTAS = ("raio", "vizinhos", "grade")
+
+# Função para expandir diretórios e padrões glob em uma lista ordenada de imagens
+def listar_imagens(entradas):
+    caminhos = set()
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            candidatos = glob.glob(os.path.join(glob.escape(entrada), "**", "*"), recursive=True)
+        elif os.path.isfile(entrada):
+            candidatos = [entrada]
+        else:
+            candidatos = glob.glob(entrada, recursive=True)
+        for caminho in candidatos:
+            if os.path.isfile(caminho) and caminho.lower().endswith(EXTENSOES_IMAGEM):
+                caminhos.add(os.path.abspath(caminho))
+    # Ordem determinística independente do sistema de arquivos
+    return sorted(caminhos)
+
+# Função para encontrar a raiz das entradas: a pasta comum às pastas informadas, às pastas dos arquivos e à parte
+# fixa (sem curingas) dos padrões glob. Sem entradas (ou em unidades diferentes no Windows), None.
+def raiz_entradas(entradas):
+    pastas = []
+    for entrada in entradas:
+        if os.path.isfile(entrada):
+            entrada = os.path.dirname(entrada)
+        while glob.has_magic(entrada):
+            entrada = os.path.dirname(entrada)
+        pastas.append(os.path.abspath(entrada or "."))
+    try:
+        return os.path.commonpath(pastas) if pastas else None
+    except ValueError:
+        return None
+
+# Função para montar o caminho usado nos nomes das saídas de uma imagem: as pastas entre a raiz das entradas e a
+# imagem entram no nome ("sugestao (1)/peca A/IMG_1.jpg" -> "sugestao (1)__peca A__IMG_1.jpg"), para que imagens
+# de mesmo nome em pastas diferentes não sobrescrevam as saídas umas das outras. Sem raiz, vale o nome do arquivo.
+def caminho_saida_imagem(caminho_imagem, raiz=None):
+    if raiz is None:
+        return caminho_imagem
+    try:
+        relativo = os.path.relpath(caminho_imagem, raiz)
+    except ValueError:
+        return caminho_imagem
+    if relativo == os.pardir or relativo.startswith(os.pardir + os.sep):
+        return caminho_imagem
+    return os.path.join(os.path.dirname(caminho_imagem), SEPARADOR_PASTAS.join(relativo.split(os.sep)))
+
+# Função para garantir que duas imagens do lote não gravem nas mesmas saídas (ex.: IMG_1.jpg e IMG_1.png)
+def conferir_nomes_saida(caminhos, raiz=None):
+    imagens_por_nome = {}
+    for caminho in caminhos:
+        nome_arquivo = os.path.splitext(os.path.basename(caminho_saida_imagem(caminho, raiz)))[0]
+        imagens_por_nome.setdefault(nome_arquivo, []).append(caminho)
+    repetidas = [", ".join(imagens) for imagens in imagens_por_nome.values() if len(imagens) > 1]
+    if repetidas:
+        raise ValueError(f"Imagens com as mesmas saídas: {'; '.join(repetidas)}")
+
+# Função para detectar com o detector escolhido em --detector (registro de ImgProc_Detectors), com o refino
+# sub-pixel pedido; as coordenadas voltam à resolução original quando a imagem foi decodificada reduzida
+def _detectar_com_registro(imagem, opcoes):
+    from ImgProc_Detectors import detectar_pontos
+    from ImgProc_Pipeline import como_pontos, converter_cinza, refinar_subpixel
+    coordenadas_pontos = como_pontos(detectar_pontos(imagem, opcoes["detector"]))
+    if opcoes.get("subpixel"):
+        coordenadas_pontos = refinar_subpixel(converter_cinza(imagem), coordenadas_pontos, metodo=opcoes["subpixel"])
+    return ampliar_coordenadas(coordenadas_pontos, opcoes.get("reducao", 1))
+
+# Função para descartar os pontos fora do polígono da região de interesse em processamento (se houver)
+def _filtrar_regiao(coordenadas_pontos, opcoes):
+    if opcoes.get("roi") is None:
+        return coordenadas_pontos
+    from ImgProc_ROI import filtrar_na_roi
+    return filtrar_na_roi(coordenadas_pontos, opcoes["roi"], opcoes["origem_roi"])
+
+# Pipeline de ImgProc_StructuralMonitoring: cantos com filtro + distâncias a partir do ponto inicial.
+# Os pontos circulam como um único array N x 2 (int32, ou float32 com opcoes["subpixel"]) até as saídas.
+def processar_monitoramento(imagem, opcoes):
+    import ImgProc_StructuralMonitoring as monitoramento
+    from ImgProc_DistanceEngine import gerar_distancias
+    from ImgProc_Pipeline import executar
+
+    deteccao = opcoes.get("deteccao", "completa")
+    if opcoes.get("detector"):
+        coordenadas_pontos = _detectar_com_registro(imagem, opcoes)
+    elif deteccao == "piramide":
+        from ImgProc_PyramidDetection import detectar_cantos_piramide
+        # O refino leva os candidatos do nível reduzido à resolução original: sem --subpixel, por cantos
+        coordenadas_pontos = detectar_cantos_piramide(imagem, niveis=opcoes.get("niveis", 1),
+                                                      subpixel=opcoes.get("subpixel") or "cantos")
+    elif deteccao == "blocos":
+        from ImgProc_PyramidDetection import detectar_cantos_em_blocos
+        coordenadas_pontos = detectar_cantos_em_blocos(imagem, tamanho_bloco=opcoes.get("tamanho_bloco", 2048))
+    else:
+        # Com a imagem decodificada em escala reduzida, a distância mínima acompanha a redução
+        reducao = opcoes.get("reducao", 1)
+        configuracao = monitoramento.configuracao_deteccao(minDistance=max(1, 20 // reducao),
+                                                           subpixel=opcoes.get("subpixel"))
+        coordenadas_pontos = ampliar_coordenadas(executar(imagem, configuracao, _CACHE), reducao)
+    coordenadas_pontos = _filtrar_regiao(coordenadas_pontos, opcoes)
+    coordenadas_pontos = monitoramento.filtrar_pontos(coordenadas_pontos, limiar_distancia=monitoramento.LIMIAR_FILTRO)
+    if len(coordenadas_pontos) == 0:
+        raise ValueError("Não foi possível detectar pontos na imagem.")
+    return coordenadas_pontos, gerar_distancias(coordenadas_pontos, modo="inicial")
+
+# Pipeline de ImgProc_DistanceCalculation: cantos + distâncias (todos os pares, raio, k vizinhos ou grade)
+def processar_distancias(imagem, opcoes):
+    import ImgProc_DistanceCalculation as calculo
+    from ImgProc_DistanceEngine import gerar_distancias
+    from ImgProc_Pipeline import executar
+
+    tabela = None
+    if opcoes.get("calibracao"):
+        from ImgProc_Calibration import carregar_perfil
+        tabela = carregar_perfil(opcoes["calibracao"])["tabela_deteccao"]
+    reducao = opcoes.get("reducao", 1)
+    if opcoes.get("detector"):
+        coordenadas_pontos = _detectar_com_registro(imagem, opcoes)
+    else:
+        configuracao = calculo.configuracao_deteccao(minDistance=max(1, 15 // reducao), tabela=tabela,
+                                                     subpixel=opcoes.get("subpixel"))
+        coordenadas_pontos = ampliar_coordenadas(executar(imagem, configuracao, _CACHE), reducao)
+    coordenadas_pontos = _filtrar_regiao(coordenadas_pontos, opcoes)
+    modo = opcoes.get("modo_distancias", "todos")
+    if modo == "grade":
+        from ImgProc_GridTopology import gerar_distancias_grade
+        return coordenadas_pontos, gerar_distancias_grade(coordenadas_pontos)
+    blocos = gerar_distancias(coordenadas_pontos, modo=modo, raio=opcoes.get("raio"), k=opcoes.get("vizinhos"))
+    return coordenadas_pontos, blocos
+
+PIPELINES = {
+    "monitoramento": processar_monitoramento,
+    "distancias": processar_distancias,
+}
+
+# Saída em CSV, com as mesmas pastas e colunas dos scripts interativos (sem as mensagens por arquivo dos scripts)
+def salvar_csv(pipeline, caminho_imagem, coordenadas_pontos, blocos, pasta_saida):
+    from ImgProc_DistanceCalculation import COLUNAS_DISTANCIAS
+    from ImgProc_DistanceEngine import salvar_blocos_csv
+    from ImgProc_Pipeline import salvar_coordenadas
+
+    pasta_coordenadas, pasta_distancias = (os.path.join(pasta_saida, p) for p in PASTAS_SAIDA[pipeline])
+    sufixo_coordenadas, sufixo_distancias = SUFIXOS_SAIDA[pipeline]
+    salvar_coordenadas(coordenadas_pontos, caminho_imagem, pasta_coordenadas, sufixo_coordenadas, avisar=False)
+    os.makedirs(pasta_distancias, exist_ok=True)
+    nome_arquivo = os.path.splitext(os.path.basename(caminho_imagem))[0]
+    colunas = ("Ponto A", "Ponto B", "Distância") if pipeline == "monitoramento" else COLUNAS_DISTANCIAS
+    nome_csv = os.path.join(pasta_distancias, f"{nome_arquivo}{sufixo_distancias}.csv")
+    return salvar_blocos_csv(blocos, nome_csv, colunas=colunas), None
+
+# Saída binária: arrays tipados em "resultados/" + entrada para o manifesto
+def salvar_binario(pipeline, caminho_imagem, coordenadas_pontos, blocos, pasta_saida):
+    from ImgProc_ResultStore import PASTA_RESULTADOS, salvar_resultado_binario
+
+    nome_arquivo = os.path.splitext(os.path.basename(caminho_imagem))[0]
+    entrada = salvar_resultado_binario(os.path.join(pasta_saida, PASTA_RESULTADOS), nome_arquivo,
+                                       coordenadas_pontos, blocos, caminho_imagem)
+    return entrada["pares"]["forma"][0], entrada
+
+FORMATOS_SAIDA = {
+    "csv": salvar_csv,
+    "binario": salvar_binario,
+}
+
+# Cache de etapas do processo atual (criado pelo inicializador quando --cache é usado)
+_CACHE = None
+
+# Inicializador dos processos: evita que cada worker dispare várias threads do OpenCV,
+# abre o cache de etapas compartilhado em disco e, se pedido, liga o tracemalloc
+def inicializar_worker(pasta_cache=None, limite_cache_mb=2048, rastrear_memoria=False):
+    global _CACHE
+    cv2.setNumThreads(1)
+    if rastrear_memoria:
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+    if pasta_cache:
+        from ImgProc_StageCache import CacheEtapas
+        _CACHE = CacheEtapas(pasta_cache, limite_disco=limite_cache_mb * 1024 ** 2)
+
+# Função para repassar os blocos de distâncias guardando os pares (a, b) para desenhá-los depois
+def _guardar_pares(blocos, pares):
+    for indices_a, indices_b, valores in blocos:
+        pares.append(np.column_stack((indices_a, indices_b)))
+        yield indices_a, indices_b, valores
+
+# Função para gravar as saídas de uma imagem (ou de uma região dela): CSV/binário e, se pedida, a figura.
+# 'origem' é o canto da região na imagem inteira: os arquivos usam coordenadas da imagem inteira e a figura,
+# desenhada sobre 'imagem' (o recorte), as coordenadas locais. Retorna (distâncias gravadas, entrada do manifesto).
+def salvar_saidas(caminho_saida, imagem, coordenadas_pontos, blocos, pipeline, pasta_saida, opcoes, origem=(0, 0)):
+    salvar = FORMATOS_SAIDA[opcoes.get("formato", "csv")]
+    arestas = None
+    if (opcoes.get("sobreposicao") and pipeline == "distancias"
+            and opcoes.get("modo_distancias") in MODOS_COM_ARESTAS):
+        arestas = []
+        blocos = _guardar_pares(blocos, arestas)
+    coordenadas_saida = coordenadas_pontos
+    if origem != (0, 0):
+        from ImgProc_ROI import deslocar
+        coordenadas_saida = deslocar(coordenadas_pontos, origem)
+    with etapa("serializacao", pontos=len(coordenadas_pontos)) as registro:
+        distancias, entrada = salvar(pipeline, caminho_saida, coordenadas_saida, medir_blocos("distancias", blocos),
+                                     pasta_saida)
+        registro["pares"] = distancias
+    if opcoes.get("sobreposicao"):
+        from ImgProc_Overlay import caminho_figura, salvar_sobreposicao
+        with etapa("sobreposicao", pontos=len(coordenadas_pontos)):
+            arestas = np.concatenate(arestas) if arestas else None
+            pasta_figuras = os.path.join(pasta_saida, PASTAS_FIGURAS[pipeline])
+            pontos_figura = np.asarray(coordenadas_pontos, dtype=np.float64).reshape(-1, 2) / opcoes.get("reducao", 1)
+            salvar_sobreposicao(caminho_figura(caminho_saida, pasta_figuras), imagem, pontos_figura,
+                                arestas, opcoes.get("ids", False))
+    return distancias, entrada
+
+# Função para nomear as saídas de uma região: <imagem>_<região>, ao lado da imagem original
+def caminho_regiao(caminho_imagem, nome_regiao):
+    nome_arquivo, extensao = os.path.splitext(caminho_imagem)
+    return f"{nome_arquivo}_{nome_regiao}{extensao}"
+
+# Função para processar as regiões de interesse de uma imagem em paralelo, em um pool de threads: detecção,
+# distâncias e gravação rodam sobre o recorte de cada região, que tem as suas próprias saídas e numeração
+# de pontos. Retorna um resultado por região (as falhas ficam isoladas na própria região).
+def processar_regioes(caminho_imagem, imagem, pipeline, pasta_saida, opcoes):
+    from ImgProc_ROI import processar_rois, rois_da_imagem
+
+    caminho_saida = caminho_saida_imagem(caminho_imagem, opcoes.get("raiz"))
+
+    reducao = opcoes.get("reducao", 1)
+    with etapa("deteccao_regioes"):
+        rois = rois_da_imagem(imagem, opcoes["rois"], reducao)
+
+    def processar(recorte, roi, origem):
+        # A instrumentação é por thread: cada região mede as suas etapas e o resultado as devolve
+        instrumentacao = Instrumentacao({"imagem": caminho_imagem, "roi": roi["nome"]})
+        with instrumentar(instrumentacao) if opcoes.get("instrumentar") else nullcontext():
+            coordenadas_pontos, blocos = PIPELINES[pipeline](recorte, {**opcoes, "roi": roi, "origem_roi": origem})
+            distancias, entrada = salvar_saidas(caminho_regiao(caminho_saida, roi["nome"]), recorte,
+                                                coordenadas_pontos, blocos, pipeline, pasta_saida, opcoes, origem)
+        return {"nome": roi["nome"], "status": "ok", "pontos": len(coordenadas_pontos), "distancias": distancias,
+                "erro": "", "entrada": entrada, "etapas": instrumentacao.registros}
+
+    regioes = []
+    for roi, retorno in processar_rois(imagem, rois, processar, opcoes.get("threads_roi"), reducao):
+        if isinstance(retorno, Exception):
+            retorno = {"nome": roi["nome"], "status": "erro", "pontos": 0, "distancias": 0,
+                       "erro": f"{type(retorno).__name__}: {retorno}", "entrada": None, "etapas": []}
+        regioes.append(retorno)
+    return regioes
+
+# Função executada em cada worker; erros ficam isolados na própria imagem.
+# Com opcoes["instrumentar"], as métricas de cada etapa voltam em resultado["etapas"].
+# 'dados' são os bytes do arquivo já lidos (leitura antecipada); sem eles a imagem é lida do disco.
+# Com opcoes["rois"], cada região de interesse é processada à parte e resultado["regioes"] traz uma por região.
+# resultado["saida"] é o caminho que dá nome às saídas (ver caminho_saida_imagem, com a raiz em opcoes["raiz"]).
+def processar_imagem(caminho_imagem, pipeline, pasta_saida, opcoes, dados=None):
+    inicio = time.perf_counter()
+    resultado = {"imagem": caminho_imagem, "saida": caminho_saida_imagem(caminho_imagem, opcoes.get("raiz")),
+                 "status": "ok", "pontos": 0, "distancias": 0, "erro": "", "entrada": None}
+    instrumentacao = Instrumentacao({"imagem": caminho_imagem})
+    with instrumentar(instrumentacao) if opcoes.get("instrumentar") else nullcontext():
+        try:
+            # Os detectores só usam tons de cinza; a cor só é decodificada para desenhar as figuras
+            leitura = "cor" if opcoes.get("sobreposicao") else "cinza"
+            reducao = opcoes.get("reducao", 1)
+            with etapa("decodificacao"):
+                if dados is not None:
+                    imagem = decodificar(dados, leitura, reducao)
+                else:
+                    imagem = carregar_imagem(caminho_imagem, leitura, reducao)
+            if imagem is None:
+                raise ValueError("Erro ao carregar a imagem.")
+            if opcoes.get("rois"):
+                resultado["regioes"] = processar_regioes(caminho_imagem, imagem, pipeline, pasta_saida, opcoes)
+                for regiao in resultado["regioes"]:
+                    instrumentacao.registros.extend(regiao.pop("etapas"))
+                    resultado["pontos"] += regiao["pontos"]
+                    resultado["distancias"] += regiao["distancias"]
+                erros = [f"{r['nome']}: {r['erro']}" for r in resultado["regioes"] if r["status"] != "ok"]
+                if len(erros) == len(resultado["regioes"]):
+                    raise ValueError("; ".join(erros))
+                resultado["erro"] = "; ".join(erros)
+            else:
+                coordenadas_pontos, blocos = PIPELINES[pipeline](imagem, opcoes)
+                resultado["pontos"] = len(coordenadas_pontos)
+                resultado["distancias"], resultado["entrada"] = salvar_saidas(
+                    resultado["saida"], imagem, coordenadas_pontos, blocos, pipeline, pasta_saida, opcoes
+                )
+        except Exception as erro:
+            resultado["status"] = "erro"
+            resultado["erro"] = f"{type(erro).__name__}: {erro}"
+    resultado["tempo"] = time.perf_counter() - inicio
+    resultado["etapas"] = instrumentacao.registros
+    return resultado
+
+# Função executada em cada worker para um grupo de imagens: enquanto uma imagem é processada,
+# os bytes das seguintes já estão sendo lidos do disco
+def processar_grupo(caminhos, pipeline, pasta_saida, opcoes):
+    with LeitorAntecipado(caminhos) as leitor:
+        return [processar_imagem(caminho, pipeline, pasta_saida, opcoes, dados) for caminho, dados in leitor]
+
+# Função para dividir o lote em grupos pequenos: grandes o bastante para a leitura antecipada,
+# pequenos o bastante para manter todos os processos ocupados até o fim
+def dividir_em_grupos(caminhos, processos):
+    processos = processos or os.cpu_count() or 1
+    tamanho = max(1, min(TAMANHO_GRUPO, len(caminhos) // (processos * 4)))
+    return [caminhos[i:i + tamanho] for i in range(0, len(caminhos), tamanho)]
+
+# Função para processar todas as imagens em um pool de processos. Sem opcoes["raiz"], os nomes das saídas partem
+# da pasta comum às imagens; nomes repetidos interrompem o lote antes de qualquer gravação (ValueError).
+def processar_lote(caminhos, pipeline="monitoramento", pasta_saida=".", processos=None, opcoes=None):
+    opcoes = opcoes or {}
+    if "raiz" not in opcoes:
+        opcoes = {**opcoes, "raiz": raiz_entradas(caminhos)}
+    conferir_nomes_saida(caminhos, opcoes["raiz"])
+    argumentos_worker = (opcoes.get("cache"), opcoes.get("limite_cache_mb", 2048), opcoes.get("tracemalloc", False))
+    if processos == 1:
+        inicializar_worker(*argumentos_worker)
+        return processar_grupo(caminhos, pipeline, pasta_saida, opcoes)
+
+    resultados = []
+    with ProcessPoolExecutor(max_workers=processos, initializer=inicializar_worker,
+                             initargs=argumentos_worker) as executor:
+        grupos = dividir_em_grupos(caminhos, processos)
+        futuros = [executor.submit(processar_grupo, grupo, pipeline, pasta_saida, opcoes) for grupo in grupos]
+        # Os resultados são coletados na ordem de entrada, não na ordem de conclusão
+        for grupo, futuro in zip(grupos, futuros):
+            try:
+                resultados.extend(futuro.result())
+            except Exception as erro:
+                # Falha do próprio worker (ex.: processo encerrado pelo sistema)
+                resultados.extend({"imagem": caminho, "status": "erro", "pontos": 0, "distancias": 0,
+                                   "erro": f"{type(erro).__name__}: {erro}", "tempo": 0.0, "entrada": None,
+                                   "etapas": []} for caminho in grupo)
+    return resultados
+
+# Função para registrar no manifesto os resultados binários do lote (feito só no processo principal)
+def registrar_manifesto(resultados, pasta_saida):
+    from ImgProc_ResultStore import PASTA_RESULTADOS, atualizar_manifesto
+
+    entradas = {}
+    for r in resultados:
+        if r["status"] != "ok":
+            continue
+        for caminho, entrada in _alvos_saida(r):
+            if entrada is not None:
+                entradas[os.path.splitext(os.path.basename(caminho))[0]] = entrada
+    if entradas:
+        atualizar_manifesto(os.path.join(pasta_saida, PASTA_RESULTADOS), entradas)
+
+# Função para listar (caminho usado nos nomes das saídas, entrada do manifesto) de um resultado:
+# a própria imagem ou, com regiões de interesse, cada região processada com sucesso
+def _alvos_saida(resultado):
+    caminho_saida = resultado.get("saida", resultado["imagem"])
+    if "regioes" in resultado:
+        return [(caminho_regiao(caminho_saida, r["nome"]), r["entrada"])
+                for r in resultado["regioes"] if r["status"] == "ok"]
+    return [(caminho_saida, resultado["entrada"])]
+
+# Função para listar os arquivos gerados para uma imagem (usados pelo registro para saber se ainda existem)
+def caminhos_saida(resultado, pipeline, pasta_saida, opcoes):
+    saidas = []
+    for caminho, entrada in _alvos_saida(resultado):
+        nome_arquivo = os.path.splitext(os.path.basename(caminho))[0]
+        if opcoes.get("formato", "csv") == "binario":
+            from ImgProc_ResultStore import PASTA_RESULTADOS
+            saidas.extend(os.path.join(pasta_saida, PASTA_RESULTADOS, entrada[chave]["arquivo"])
+                          for chave in ("coordenadas", "pares", "distancias"))
+        else:
+            saidas.extend(os.path.join(pasta_saida, pasta, f"{nome_arquivo}{sufixo}.csv")
+                          for pasta, sufixo in zip(PASTAS_SAIDA[pipeline], SUFIXOS_SAIDA[pipeline]))
+        if opcoes.get("sobreposicao"):
+            from ImgProc_Overlay import caminho_figura
+            saidas.append(caminho_figura(caminho, os.path.join(pasta_saida, PASTAS_FIGURAS[pipeline])))
+    return [os.path.abspath(s) for s in saidas]
+
+# Função para separar as imagens já processadas com a mesma configuração (conteúdo e parâmetros iguais)
+def filtrar_processadas(registro_execucoes, caminhos, hash_configuracao, reprocessar=False):
+    from ImgProc_RunRegistry import hash_arquivo
+
+    pendentes, hashes = [], {}
+    for caminho in caminhos:
+        try:
+            hashes[caminho] = hash_arquivo(caminho)
+        except OSError:
+            # O erro de leitura é informado pelo próprio processamento
+            pendentes.append(caminho)
+            continue
+        if reprocessar or registro_execucoes.buscar(hashes[caminho], hash_configuracao, caminho) is None:
+            pendentes.append(caminho)
+    return pendentes, hashes
+
+# Função para gravar no registro o resultado de cada imagem processada
+def registrar_execucoes(registro_execucoes, resultados, hashes, configuracao, hash_configuracao, pipeline,
+                        pasta_saida, opcoes, especime=None):
+    for r in resultados:
+        if r["imagem"] not in hashes:
+            continue
+        saidas = caminhos_saida(r, pipeline, pasta_saida, opcoes) if r["status"] == "ok" else []
+        registro_execucoes.registrar(r, hashes[r["imagem"]], configuracao, hash_configuracao, saidas, especime)
+
+# Função para processar um conjunto de imagens consultando o registro: pula o que já foi feito
+# e registra o restante. Retorna os resultados das imagens processadas.
+def processar_com_registro(caminhos, pipeline, pasta_saida, processos, opcoes, registro_execucoes,
+                           reprocessar=False, especime=None):
+    from ImgProc_RunRegistry import configuracao_execucao
+
+    configuracao, hash_configuracao = configuracao_execucao(pipeline, opcoes, pasta_saida)
+    pendentes, hashes = filtrar_processadas(registro_execucoes, caminhos, hash_configuracao, reprocessar)
+    if len(pendentes) < len(caminhos):
+        print(f"{len(caminhos) - len(pendentes)} imagens já processadas com esta configuração foram puladas.")
+    if not pendentes:
+        return []
+    resultados = processar_lote(pendentes, pipeline, pasta_saida, processos, opcoes)
+    if opcoes.get("formato") == "binario":
+        registrar_manifesto(resultados, pasta_saida)
+    registrar_execucoes(registro_execucoes, resultados, hashes, configuracao, hash_configuracao, pipeline,
+                        pasta_saida, opcoes, especime)
+    return resultados
+
+# Função para observar as pastas de entrada e processar as fotos novas ou alteradas à medida que chegam.
+# Um arquivo só é processado quando tamanho e data não mudam entre duas varreduras (a câmera terminou de gravá-lo).
+def observar_entradas(entradas, pipeline, pasta_saida, processos, opcoes, registro_execucoes, intervalo=2.0,
+                      especime=None):
+    print(f"Observando {', '.join(entradas)} a cada {intervalo:g} s (Ctrl+C para encerrar).")
+    anteriores, tratados = {}, {}
+    try:
+        while True:
+            atuais = {}
+            for caminho in listar_imagens(entradas):
+                try:
+                    info = os.stat(caminho)
+                except FileNotFoundError:
+                    continue
+                atuais[caminho] = (info.st_size, info.st_mtime_ns)
+            prontos = [c for c, estado in atuais.items() if anteriores.get(c) == estado and tratados.get(c) != estado]
+            if prontos:
+                inicio = time.perf_counter()
+                resultados = processar_com_registro(prontos, pipeline, pasta_saida, processos, opcoes,
+                                                    registro_execucoes, especime=especime)
+                if resultados:
+                    exibir_resumo(resultados, time.perf_counter() - inicio)
+                tratados.update((c, atuais[c]) for c in prontos)
+            anteriores = atuais
+            time.sleep(intervalo)
+    except KeyboardInterrupt:
+        print("Observação encerrada.")
+
+# Função para exibir o resumo do lote
+def exibir_resumo(resultados, tempo_total):
+    falhas = [r for r in resultados if r["status"] != "ok"]
+    for r in resultados:
+        if r["status"] == "ok":
+            print(f"[ok]   {r['imagem']}: {r['pontos']} pontos, {r['distancias']} distâncias ({r['tempo']:.2f} s)")
+        else:
+            print(f"[erro] {r['imagem']}: {r['erro']}")
+        for regiao in r.get("regioes", []):
+            if regiao["status"] == "ok":
+                print(f"         {regiao['nome']}: {regiao['pontos']} pontos, {regiao['distancias']} distâncias")
+            else:
+                print(f"         {regiao['nome']}: {regiao['erro']}")
+
+    taxa = len(resultados) / tempo_total if tempo_total > 0 else 0.0
+    print(f"\nImagens processadas: {len(resultados) - len(falhas)} de {len(resultados)} ({len(falhas)} com erro)")
+    print(f"Tempo total: {tempo_total:.2f} s - {taxa:.2f} imagens/s")
+
+def main(argv=None):
+    from ImgProc_Detectors import DETECTORES
+
+    parser = argparse.ArgumentParser(description="Processamento em lote (sem interface gráfica) de diretórios de imagens.")
+    parser.add_argument("entradas", nargs="+", help="Diretórios, arquivos ou padrões glob de imagens")
+    parser.add_argument("--pipeline", choices=sorted(PIPELINES), default="monitoramento",
+                        help="Pipeline de detecção e cálculo de distâncias a executar")
+    parser.add_argument("--saida", default=".", help="Pasta base onde as pastas de CSV serão criadas")
+    parser.add_argument("--processos", type=int, default=None,
+                        help="Número de processos (padrão: número de núcleos da máquina)")
+    parser.add_argument("--modo-distancias", choices=("todos", "raio", "vizinhos", "grade"), default="todos",
+                        help="Pares usados pelo pipeline 'distancias' ('grade': só vizinhos da grade reconstruída)")
+    parser.add_argument("--raio", type=float, help="Distância máxima entre pares no modo 'raio'")
+    parser.add_argument("--vizinhos", type=int, help="Número de vizinhos por ponto no modo 'vizinhos'")
+    parser.add_argument("--deteccao", choices=MODOS_DETECCAO, default="completa",
+                        help="Detecção do pipeline 'monitoramento': imagem inteira, pirâmide grossa-para-fina ou blocos")
+    parser.add_argument("--detector", choices=sorted(DETECTORES),
+                        help="Detector do registro usado no lugar do detector padrão do pipeline "
+                             "(ex.: 'centroides' para as imagens de pontos)")
+    parser.add_argument("--niveis", type=int, default=1, help="Níveis de redução da pirâmide (--deteccao piramide)")
+    parser.add_argument("--tamanho-bloco", type=int, default=2048, help="Lado dos blocos em pixels (--deteccao blocos)")
+    parser.add_argument("--calibracao", help="Perfil de calibração de tons de cinza do pipeline 'distancias' "
+                                             "(ImgProc_Calibration.py)")
+    parser.add_argument("--reducao", type=int, choices=(1, 2, 4, 8), default=1,
+                        help="Decodifica as imagens reduzidas (1/2, 1/4 ou 1/8 de cada lado): bem mais rápido, "
+                             "mas pode perder pontos; as coordenadas voltam à resolução original")
+    parser.add_argument("--subpixel", choices=("cantos", "centroide"),
+                        help="Refina os pontos com precisão sub-pixel (cornerSubPix ou centroide ponderado pela "
+                             "intensidade); as coordenadas deixam de ser truncadas para pixels inteiros")
+    parser.add_argument("--rois", help="Regiões de interesse: nome (ou JSON) de uma configuração de "
+                                       "ImgProc_ROI.py, ou 'auto' para detectá-las em cada imagem")
+    parser.add_argument("--threads-roi", type=int, default=4, help="Threads por imagem para as regiões (--rois)")
+    parser.add_argument("--cache", help="Pasta do cache de etapas de pré-processamento (desativado se omitido)")
+    parser.add_argument("--limite-cache-mb", type=int, default=2048, help="Tamanho máximo do cache em disco (MB)")
+    parser.add_argument("--formato", choices=sorted(FORMATOS_SAIDA), default="csv",
+                        help="Formato de saída: CSV por imagem ou arrays binários com manifesto")
+    parser.add_argument("--sobreposicao", action="store_true",
+                        help="Grava a figura de cada imagem com os pontos (e as arestas nos modos raio, vizinhos e grade)")
+    parser.add_argument("--ids", action="store_true", help="Escreve o número de cada ponto nas figuras")
+    parser.add_argument("--registro", help="Banco SQLite de execuções: imagens já processadas com a mesma "
+                                           "configuração são puladas (ex.: execucoes.sqlite)")
+    parser.add_argument("--reprocessar", action="store_true", help="Processa tudo de novo, mesmo se já registrado")
+    parser.add_argument("--especime", help="Nome do espécime no registro (padrão: pasta da imagem relativa à pasta "
+                                             "do banco de registro)")
+    parser.add_argument("--observar", action="store_true",
+                        help="Fica observando as entradas e processa as fotos novas ou alteradas (usa o registro)")
+    parser.add_argument("--intervalo", type=float, default=2.0, help="Intervalo entre varreduras em --observar (s)")
+    adicionar_argumentos(parser)
+    args = parser.parse_args(argv)
+    if args.modo_distancias == "raio" and args.raio is None:
+        parser.error("--modo-distancias raio exige --raio")
+    if args.modo_distancias == "vizinhos" and args.vizinhos is None:
+        parser.error("--modo-distancias vizinhos exige --vizinhos")
+    if args.reducao > 1 and args.pipeline == "monitoramento" and args.deteccao != "completa":
+        parser.error("--reducao só se aplica à --deteccao completa")
+    if args.detector and (args.deteccao != "completa" or args.calibracao):
+        parser.error("--detector não se combina com --deteccao nem com --calibracao")
+    if args.calibracao and args.pipeline != "distancias":
+        parser.error("--calibracao só se aplica ao pipeline 'distancias'")
+    if args.rois:
+        from ImgProc_ROI import AUTOMATICA, carregar_rois
+        if args.rois != AUTOMATICA:
+            try:
+                carregar_rois(args.rois)
+            except ValueError as erro:
+                parser.error(str(erro))
+    opcoes = {"modo_distancias": args.modo_distancias, "raio": args.raio, "vizinhos": args.vizinhos,
+              "formato": args.formato, "deteccao": args.deteccao, "niveis": args.niveis,
+              "tamanho_bloco": args.tamanho_bloco, "cache": args.cache, "limite_cache_mb": args.limite_cache_mb,
+              "instrumentar": bool(args.metricas or args.resumo_etapas or args.tracemalloc),
+              "tracemalloc": args.tracemalloc, "sobreposicao": args.sobreposicao, "ids": args.ids,
+              "calibracao": args.calibracao, "reducao": args.reducao, "detector": args.detector,
+              "subpixel": args.subpixel, "rois": args.rois, "threads_roi": args.threads_roi,
+              "raiz": raiz_entradas(args.entradas)}
+    if args.perfil is not None and args.processos != 1:
+        # O cProfile só enxerga o processo atual
+        print("--perfil executa o lote em um único processo.")
+        args.processos = 1
+
+    registro_execucoes = None
+    if args.registro or args.observar:
+        from ImgProc_RunRegistry import REGISTRO_PADRAO, RegistroExecucoes
+        registro_execucoes = RegistroExecucoes(args.registro or REGISTRO_PADRAO)
+    if args.observar:
+        observar_entradas(args.entradas, args.pipeline, args.saida, args.processos, opcoes, registro_execucoes,
+                          args.intervalo, args.especime)
+        registro_execucoes.fechar()
+        return 0
+
+    caminhos = listar_imagens(args.entradas)
+    if not caminhos:
+        print("Nenhuma imagem encontrada.")
+        return 1
+
+    try:
+        conferir_nomes_saida(caminhos, opcoes["raiz"])
+    except ValueError as erro:
+        print(erro)
+        return 1
+
+    print(f"{len(caminhos)} imagens encontradas.")
+    inicio = time.perf_counter()
+    with perfil(args.perfil or None) if args.perfil is not None else nullcontext():
+        if registro_execucoes is None:
+            resultados = processar_lote(caminhos, args.pipeline, args.saida, args.processos, opcoes)
+            if args.formato == "binario":
+                registrar_manifesto(resultados, args.saida)
+        else:
+            resultados = processar_com_registro(caminhos, args.pipeline, args.saida, args.processos, opcoes,
+                                                registro_execucoes, args.reprocessar, args.especime)
+            registro_execucoes.fechar()
+    exibir_resumo(resultados, time.perf_counter() - inicio)
+
+    registros = [registro for r in resultados for registro in r["etapas"]]
+    if args.metricas:
+        salvar_jsonl(registros, args.metricas)
+        print(f"Métricas salvas em '{args.metricas}'")
+    if args.resumo_etapas or (args.tracemalloc and not args.metricas):
+        exibir_resumo_etapas(registros)
+    return 0 if all(r["status"] == "ok" for r in resultados) else 2
+
+if __name__ == "__main__":
+    sys.exit(main())
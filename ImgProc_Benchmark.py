@@ -0,0 +1,303 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+from scipy.spatial import cKDTree
+
+from ImgProc_BatchProcessing import listar_imagens
+from ImgProc_ImageLoading import carregar_imagem
+
+# Função para gerar uma grade sintética de marcadores com tamanho, ruído e desfoque controláveis.
+# marcador="grade" desenha linhas (como *_nos.jpg); "ponto" desenha linhas com pontos nos nós (como *_pontos.jpg).
+# Retorna a imagem BGR e as posições verdadeiras dos nós (N x 2).
+def gerar_grade_sintetica(linhas, colunas, espacamento=30, espessura=2, marcador="grade", ruido=0.0,
+                          desfoque=0.0, semente=0):
+    margem = espacamento
+    altura, largura = margem * 2 + espacamento * (linhas - 1), margem * 2 + espacamento * (colunas - 1)
+    imagem = np.full((altura, largura), 255, dtype=np.uint8)
+
+    xs = margem + espacamento * np.arange(colunas)
+    ys = margem + espacamento * np.arange(linhas)
+    for x in xs:
+        cv2.line(imagem, (int(x), int(ys[0])), (int(x), int(ys[-1])), 0, espessura)
+    for y in ys:
+        cv2.line(imagem, (int(xs[0]), int(y)), (int(xs[-1]), int(y)), 0, espessura)
+    if marcador == "ponto":
+        for y in ys:
+            for x in xs:
+                cv2.circle(imagem, (int(x), int(y)), espessura * 2, 0, -1)
+
+    if desfoque > 0:
+        imagem = cv2.GaussianBlur(imagem, (0, 0), desfoque)
+    if ruido > 0:
+        gerador = np.random.default_rng(semente)
+        imagem = np.clip(imagem + gerador.normal(0, ruido, imagem.shape), 0, 255).astype(np.uint8)
+
+    grade_x, grade_y = np.meshgrid(xs, ys)
+    pontos = np.column_stack((grade_x.ravel(), grade_y.ravel())).astype(np.float32)
+    return cv2.cvtColor(imagem, cv2.COLOR_GRAY2BGR), pontos
+
+# Variantes de detecção comparadas lado a lado (importadas sob demanda)
+def _variantes_deteccao():
+    import ImgProc_Detectors
+    import ImgProc_DistanceCalculation
+    import ImgProc_PointDetection
+    import ImgProc_PointDetection2
+    import ImgProc_PointDetection3
+    import ImgProc_PyramidDetection
+    import ImgProc_StructuralMonitoring
+
+    return {
+        "PointDetection.detectar_cantos": ImgProc_PointDetection.detectar_cantos,
+        "PointDetection2.detectar_cantos": ImgProc_PointDetection2.detectar_cantos,
+        "PointDetection3.detectar_cantos": ImgProc_PointDetection3.detectar_cantos,
+        "DistanceCalculation.detectar_cantos": ImgProc_DistanceCalculation.detectar_cantos,
+        "StructuralMonitoring.detectar_cantos_com_filtro": ImgProc_StructuralMonitoring.detectar_cantos_com_filtro,
+        "PyramidDetection.detectar_cantos_piramide": ImgProc_PyramidDetection.detectar_cantos_piramide,
+        "PyramidDetection.detectar_cantos_em_blocos": ImgProc_PyramidDetection.detectar_cantos_em_blocos,
+        "Detectors.centroides": ImgProc_Detectors.detector_centroides,
+        "Detectors.modelo": ImgProc_Detectors.detector_modelo,
+    }
+
+# Função para ler um campo de /proc/self/status em KiB (VmRSS: residente agora, VmHWM: pico)
+def _status_kib(campo):
+    with open("/proc/self/status", encoding="ascii") as arquivo:
+        for linha in arquivo:
+            if linha.startswith(campo + ":"):
+                return int(linha.split()[1])
+    raise OSError(f"{campo} ausente de /proc/self/status")
+
+# Executado em um processo novo: quanto a memória residente (RSS) do processo cresce no pico durante a chamada.
+# Ao contrário do tracemalloc, o RSS inclui as alocações nativas (buffers de decodificação, pirâmides e mapas de
+# resposta do OpenCV). No Linux o pico do processo é zerado antes da chamada (/proc/self/clear_refs), porque o
+# processo criado herda o pico do processo pai; nos demais sistemas usa o ru_maxrss. Sem os dois, retorna None.
+# No Linux uma primeira chamada descartada carrega os módulos importados sob demanda antes da medição.
+def _pico_rss_processo(funcao, argumentos):
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as arquivo:
+            arquivo.write("5")
+        funcao(*argumentos)
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as arquivo:
+            arquivo.write("5")
+        antes = _status_kib("VmRSS")
+        funcao(*argumentos)
+        return (_status_kib("VmHWM") - antes) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    antes = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    funcao(*argumentos)
+    depois = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss vem em bytes no macOS e em KiB nos demais sistemas
+    return (depois - antes) * (1 if sys.platform == "darwin" else 1024)
+
+# Parâmetro M_MMAP_THRESHOLD de mallopt (glibc)
+M_MMAP_THRESHOLD = -3
+
+# Função executada no processo de medição antes da chamada: mesmo número de threads do OpenCV do processo pai e,
+# na glibc, limiar fixo de mmap (o mesmo efeito de MALLOC_MMAP_THRESHOLD_, mas só neste processo), para que os
+# arrays grandes liberados na chamada descartada voltem ao sistema em vez de serem reaproveitados sem aparecer
+# no pico da chamada medida
+def _inicializar_medicao(threads):
+    cv2.setNumThreads(threads)
+    import ctypes
+    try:
+        ctypes.CDLL(None).mallopt(M_MMAP_THRESHOLD, 128 * 1024)
+    except (AttributeError, OSError):
+        pass
+
+# Função para medir o pico de RSS de uma chamada em um processo novo ("spawn"), sem a memória já ocupada
+# por este processo; a função e os argumentos precisam ser serializáveis (funções de módulo)
+def pico_rss(funcao, *argumentos):
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_inicializar_medicao, initargs=(cv2.getNumThreads(),)) as executor:
+        pico = executor.submit(_pico_rss_processo, funcao, argumentos).result()
+    return None if pico is None else pico / 1024 ** 2
+
+# Função para medir uma chamada: latências (sem tracemalloc), pico do heap do Python (uma execução extra com
+# tracemalloc, que não enxerga as alocações nativas do OpenCV e do NumPy feitas fora do alocador do Python) e,
+# com rss=True, o pico de memória residente do processo em uma execução isolada
+def medir(funcao, *argumentos, repeticoes=3, rss=True):
+    latencias = []
+    resultado = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao(*argumentos)
+        latencias.append(time.perf_counter() - inicio)
+
+    tracemalloc.start()
+    funcao(*argumentos)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, {
+        "latencia_mediana_s": statistics.median(latencias),
+        "latencia_min_s": min(latencias),
+        "pico_heap_python_mb": pico / 1024 ** 2,
+        "pico_rss_mb": pico_rss(funcao, *argumentos) if rss else None,
+    }
+
+# Função para calcular a fração dos nós verdadeiros encontrada a até 'tolerancia' pixels
+def revocacao(pontos_detectados, pontos_verdadeiros, tolerancia=5.0):
+    if len(pontos_detectados) == 0:
+        return 0.0
+    distancias, _ = cKDTree(np.asarray(pontos_detectados, dtype=np.float64)).query(pontos_verdadeiros)
+    return float(np.mean(distancias <= tolerancia))
+
+# Distâncias em fluxo: os blocos são consumidos sem montar a lista completa
+def consumir_distancias(coordenadas_pontos):
+    from ImgProc_DistanceEngine import gerar_distancias
+    return sum(len(d) for _, _, d in gerar_distancias(coordenadas_pontos, modo="todos"))
+
+# Função para executar todas as etapas em uma imagem e devolver um registro por etapa/variante
+def avaliar(nome, imagem, pontos_verdadeiros, repeticoes, limite_pares, tolerancia=5.0, rss=True):
+    from ImgProc_DistanceCalculation import calcular_distancias
+    from ImgProc_StructuralMonitoring import filtrar_pontos
+
+    registros = []
+    base = {"entrada": nome, "largura": imagem.shape[1], "altura": imagem.shape[0]}
+    megapixels = imagem.shape[0] * imagem.shape[1] / 1e6
+
+    pontos_referencia = None
+    for variante, detectar in _variantes_deteccao().items():
+        registro = {**base, "etapa": "deteccao", "variante": variante}
+        try:
+            pontos, medidas = medir(detectar, imagem, repeticoes=repeticoes, rss=rss)
+        except Exception as erro:
+            registros.append({**registro, "erro": f"{type(erro).__name__}: {erro}"})
+            continue
+        registro.update(medidas, pontos=len(pontos), vazao_mpx_s=megapixels / medidas["latencia_mediana_s"])
+        if pontos_verdadeiros is not None:
+            registro["revocacao"] = revocacao(pontos, pontos_verdadeiros, tolerancia)
+        registros.append(registro)
+        if variante == "DistanceCalculation.detectar_cantos":
+            pontos_referencia = pontos
+
+    if pontos_referencia is None or len(pontos_referencia) == 0:
+        return registros
+    n = len(pontos_referencia)
+    pares = n * (n - 1) // 2
+
+    _, medidas = medir(filtrar_pontos, pontos_referencia, 20, repeticoes=repeticoes, rss=rss)
+    registros.append({**base, "etapa": "filtrar_pontos", "variante": "StructuralMonitoring.filtrar_pontos",
+                      "pontos": n, **medidas, "vazao_pontos_s": n / medidas["latencia_mediana_s"]})
+
+    _, medidas = medir(consumir_distancias, pontos_referencia, repeticoes=repeticoes, rss=rss)
+    registros.append({**base, "etapa": "distancias", "variante": "DistanceEngine.gerar_distancias(todos)",
+                      "pontos": n, "pares": pares, **medidas, "vazao_pares_s": pares / medidas["latencia_mediana_s"]})
+
+    registro = {**base, "etapa": "distancias", "variante": "DistanceCalculation.calcular_distancias",
+                "pontos": n, "pares": pares}
+    if pares > limite_pares:
+        registro["erro"] = f"ignorado: {pares} pares acima do limite de {limite_pares}"
+    else:
+        _, medidas = medir(calcular_distancias, pontos_referencia, repeticoes=repeticoes, rss=rss)
+        registro.update(medidas, vazao_pares_s=pares / medidas["latencia_mediana_s"])
+    registros.append(registro)
+    return registros
+
+# Função para identificar o commit atual (para comparar execuções entre commits)
+def commit_atual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+# Função para comparar com um relatório anterior (razão entre as latências medianas)
+def comparar(relatorio, anterior):
+    chave = lambda r: (r["entrada"], r["etapa"], r["variante"])
+    anteriores = {chave(r): r for r in anterior["resultados"] if "latencia_mediana_s" in r}
+    print(f"\nComparação com o commit {anterior.get('commit') or '?'} (razão > 1 = mais lento agora):")
+    for r in relatorio["resultados"]:
+        if "latencia_mediana_s" in r and chave(r) in anteriores:
+            razao = r["latencia_mediana_s"] / anteriores[chave(r)]["latencia_mediana_s"]
+            print(f"  {razao:6.2f}x  {r['entrada']} | {r['etapa']} | {r['variante']}")
+
+# Função para exibir os resultados em forma de tabela
+def exibir_tabela(resultados):
+    for r in resultados:
+        if "erro" in r:
+            print(f"{r['entrada'][:28]:28} {r['variante'][:48]:48} {r['erro']}")
+            continue
+        extra = f" revocação {r['revocacao']:.2f}" if "revocacao" in r else ""
+        rss = f"{r['pico_rss_mb']:8.1f}" if r.get("pico_rss_mb") is not None else f"{'-':>8}"
+        print(f"{r['entrada'][:28]:28} {r['variante'][:48]:48} {r['latencia_mediana_s'] * 1000:9.1f} ms "
+              f"{r['pico_heap_python_mb']:8.1f} MB heap {rss} MB RSS  {r.get('pontos', '')}{extra}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark das etapas de detecção e de cálculo de distâncias.")
+    parser.add_argument("--imagens", nargs="*", default=[], help="Imagens reais (ex.: images)")
+    parser.add_argument("--sintetico", nargs="*", default=["10x10", "30x30", "100x100"],
+                        help="Grades sintéticas LINHASxCOLUNAS")
+    parser.add_argument("--marcador", choices=("grade", "ponto"), default="grade")
+    parser.add_argument("--espacamento", type=int, default=30, help="Espaçamento entre nós sintéticos (pixels)")
+    parser.add_argument("--ruido", type=float, default=0.0, help="Desvio padrão do ruído gaussiano")
+    parser.add_argument("--desfoque", type=float, default=0.0, help="Sigma do desfoque gaussiano")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--limite-pares", type=int, default=2_000_000,
+                        help="Máximo de pares para medir a versão em lista de calcular_distancias")
+    parser.add_argument("--sem-rss", action="store_true",
+                        help="Não mede o pico de RSS (cada medição roda em um processo novo, o que é mais lento)")
+    parser.add_argument("--saida", default="benchmark.json", help="Relatório JSON")
+    parser.add_argument("--comparar", help="Relatório JSON anterior para comparação")
+    args = parser.parse_args(argv)
+
+    cv2.setNumThreads(1)
+    resultados = []
+    for especificacao in args.sintetico:
+        linhas, colunas = (int(v) for v in especificacao.lower().split("x"))
+        imagem, verdadeiros = gerar_grade_sintetica(linhas, colunas, args.espacamento, marcador=args.marcador,
+                                                    ruido=args.ruido, desfoque=args.desfoque)
+        nome = f"sintetico_{linhas}x{colunas}_{args.marcador}"
+        # Detectores baseados em bordas marcam os cantos das linhas, deslocados alguns pixels do nó
+        resultados.extend(avaliar(nome, imagem, verdadeiros, args.repeticoes, args.limite_pares,
+                                  tolerancia=args.espacamento / 4, rss=not args.sem_rss))
+
+    for caminho_imagem in listar_imagens(args.imagens) if args.imagens else []:
+        _, medidas = medir(cv2.imread, caminho_imagem, repeticoes=args.repeticoes, rss=not args.sem_rss)
+        imagem = cv2.imread(caminho_imagem)
+        if imagem is None:
+            continue
+        nome = os.path.basename(caminho_imagem)
+        resultados.append({"entrada": nome, "etapa": "decodificacao", "variante": "cv2.imread", **medidas})
+        for reducao in (1, 2):
+            _, medidas = medir(carregar_imagem, caminho_imagem, "cinza", reducao, repeticoes=args.repeticoes,
+                               rss=not args.sem_rss)
+            resultados.append({"entrada": nome, "etapa": "decodificacao", "variante": f"cinza 1/{reducao}",
+                               **medidas})
+        resultados.extend(avaliar(nome, imagem, None, args.repeticoes, args.limite_pares, rss=not args.sem_rss))
+
+    relatorio = {
+        "commit": commit_atual(),
+        "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "maquina": {"plataforma": platform.platform(), "python": platform.python_version(),
+                    "opencv": cv2.__version__, "numpy": np.__version__, "nucleos": os.cpu_count()},
+        "parametros": vars(args),
+        "resultados": resultados,
+    }
+    with open(args.saida, "w", encoding="utf-8") as arquivo:
+        json.dump(relatorio, arquivo, ensure_ascii=False, indent=1)
+
+    exibir_tabela(resultados)
+    print(f"\nRelatório salvo em '{args.saida}'")
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo:
+            comparar(relatorio, json.load(arquivo))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
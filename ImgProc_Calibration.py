@@ -0,0 +1,148 @@
+import argparse
+import glob
+import json
+import os
+import sys
+from functools import lru_cache
+
+import cv2
+import numpy as np
+
+PASTA_PERFIS = "perfis_calibracao"
+VERSAO_PERFIL = 1
+
+# Pixels mais escuros que o fundo por mais que esta margem são considerados marcações
+MARGEM_FUNDO = 15
+
+# Rampa com os 256 níveis de cinza: aplicar uma operação pixel a pixel sobre ela produz sua tabela (LUT)
+RAMPA = np.arange(256, dtype=np.uint8).reshape(1, 256)
+
+# Função para compilar uma cadeia de operações pixel a pixel em uma única tabela de 256 entradas.
+# Cada operação é executada sobre a rampa, então a tabela reproduz exatamente a cadeia original.
+def compilar_tabela(*operacoes):
+    tabela = RAMPA.copy()
+    for operacao in operacoes:
+        tabela = np.asarray(operacao(tabela), dtype=np.uint8).reshape(1, 256)
+    return tabela.reshape(256)
+
+# Operação de contraste e brilho (a mesma de ajustar_contraste_brilho)
+def operacao_contraste_brilho(alpha, beta):
+    return lambda niveis: cv2.convertScaleAbs(niveis, alpha=alpha, beta=beta)
+
+# Operação de limiar: níveis acima de 'limiar' passam a valer 'valor' (os demais não mudam)
+def operacao_limiar(limiar, valor=0):
+    return lambda niveis: np.where(niveis > limiar, valor, niveis)
+
+# Tabela equivalente a converter_cinza_para_preto (cinza acima de 180 vira preto)
+TABELA_PRETO = compilar_tabela(operacao_limiar(180, 0))
+
+# Função para aplicar uma tabela em uma única passada sobre a imagem em tons de cinza
+def aplicar_tabela(imagem_cinza, tabela, dst=None):
+    return cv2.LUT(imagem_cinza, tabela, dst=dst)
+
+# Função para medir os níveis de uma imagem de calibração: o fundo (papel) e a cor das marcações
+def medir_niveis(imagem_cinza, margem=MARGEM_FUNDO):
+    fundo = float(np.median(imagem_cinza))
+    marcas = imagem_cinza[imagem_cinza < fundo - margem]
+    if len(marcas) == 0:
+        raise ValueError("Nenhuma marcação mais escura que o fundo foi encontrada na imagem de calibração.")
+    return fundo, float(np.median(marcas))
+
+# Função para montar um perfil de calibração a partir de imagens de referência do mesmo fundo/marcação.
+# O contraste leva a marcação a 0 e o fundo a 255; o limiar fica entre os dois níveis medidos.
+def calibrar_perfil(nome, caminhos):
+    niveis = []
+    for caminho in caminhos:
+        imagem_cinza = cv2.imread(caminho, cv2.IMREAD_GRAYSCALE)
+        if imagem_cinza is None:
+            raise ValueError(f"Erro ao carregar a imagem de calibração: {caminho}")
+        niveis.append(medir_niveis(imagem_cinza))
+    fundo, marca = np.median(np.asarray(niveis), axis=0)
+    if fundo - marca < 1:
+        raise ValueError(f"Fundo ({fundo:.0f}) e marcação ({marca:.0f}) têm o mesmo nível de cinza.")
+
+    limiar = (fundo + marca) / 2
+    alpha = 255.0 / (fundo - marca)
+    beta = -alpha * marca
+    # Detecção: contraste + brilho e, acima do limiar (já na escala ajustada), fundo uniforme
+    tabela_deteccao = compilar_tabela(operacao_contraste_brilho(alpha, beta),
+                                      operacao_limiar(alpha * limiar + beta, 255))
+    # Visualização: fundo acima do limiar vira preto (o "> 180" de converter_cinza_para_preto, calibrado)
+    tabela_preto = compilar_tabela(operacao_limiar(limiar, 0))
+    return {"versao": VERSAO_PERFIL, "nome": nome, "origem": [os.path.basename(c) for c in caminhos],
+            "fundo": fundo, "marca": marca, "limiar": limiar, "alpha": alpha, "beta": beta,
+            "tabela_deteccao": tabela_deteccao, "tabela_preto": tabela_preto}
+
+def caminho_perfil(nome, pasta=PASTA_PERFIS):
+    return os.path.join(pasta, f"{nome}.json")
+
+# Função para gravar o perfil em JSON (as tabelas já compiladas vão junto)
+def salvar_perfil(perfil_calibracao, pasta=PASTA_PERFIS):
+    os.makedirs(pasta, exist_ok=True)
+    caminho = caminho_perfil(perfil_calibracao["nome"], pasta)
+    dados = {chave: valor.tolist() if isinstance(valor, np.ndarray) else valor
+             for chave, valor in perfil_calibracao.items()}
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        json.dump(dados, arquivo, ensure_ascii=False, indent=1)
+    return caminho
+
+# Função para carregar um perfil pelo nome (em 'pasta') ou pelo caminho do JSON.
+# Fica em memória no processo, então cada worker lê o arquivo uma única vez.
+@lru_cache(maxsize=None)
+def carregar_perfil(nome, pasta=PASTA_PERFIS):
+    caminho = nome if nome.endswith(".json") else caminho_perfil(nome, pasta)
+    if not os.path.exists(caminho):
+        raise ValueError(f"Perfil de calibração não encontrado: {caminho} (use ImgProc_Calibration.py calibrar)")
+    with open(caminho, encoding="utf-8") as arquivo:
+        dados = json.load(arquivo)
+    for chave in ("tabela_deteccao", "tabela_preto"):
+        dados[chave] = np.asarray(dados[chave], dtype=np.uint8)
+    return dados
+
+# Função para nomear o perfil de uma imagem de referência: cinza_claro_199_200_202.jpeg -> claro_199_200_202
+def nome_referencia(caminho):
+    nome = os.path.splitext(os.path.basename(caminho))[0]
+    return nome[len("cinza_"):] if nome.startswith("cinza_") else nome
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Perfis de calibração de tons de cinza (tabelas de 256 níveis).")
+    parser.add_argument("--pasta", default=PASTA_PERFIS, help="Pasta dos perfis")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    calibrar = subparsers.add_parser("calibrar", help="Cria um perfil a partir de imagens do mesmo fundo")
+    calibrar.add_argument("nome", help="Nome do perfil")
+    calibrar.add_argument("imagens", nargs="+", help="Imagens de calibração")
+    referencias = subparsers.add_parser("referencias", help="Cria um perfil para cada imagem cinza_* da pasta")
+    referencias.add_argument("pasta_imagens", nargs="?", default="images")
+    subparsers.add_parser("listar", help="Lista os perfis gravados")
+    args = parser.parse_args(argv)
+
+    if args.comando == "listar":
+        for caminho in sorted(glob.glob(os.path.join(glob.escape(args.pasta), "*.json"))):
+            dados = carregar_perfil(caminho)
+            print(f"{dados['nome']}: fundo {dados['fundo']:.0f}, marcação {dados['marca']:.0f}, "
+                  f"limiar {dados['limiar']:.1f} ({', '.join(dados['origem'])})")
+        return 0
+
+    if args.comando == "calibrar":
+        grupos = {args.nome: args.imagens}
+    else:
+        caminhos = sorted(glob.glob(os.path.join(glob.escape(args.pasta_imagens), "cinza_*")))
+        if not caminhos:
+            print(f"Nenhuma imagem cinza_* em '{args.pasta_imagens}'.")
+            return 1
+        grupos = {nome_referencia(caminho): [caminho] for caminho in caminhos}
+
+    for nome, caminhos in grupos.items():
+        try:
+            perfil_calibracao = calibrar_perfil(nome, caminhos)
+        except ValueError as erro:
+            print(f"{nome}: {erro}")
+            continue
+        caminho = salvar_perfil(perfil_calibracao, args.pasta)
+        print(f"{nome}: fundo {perfil_calibracao['fundo']:.0f}, marcação {perfil_calibracao['marca']:.0f}, "
+              f"limiar {perfil_calibracao['limiar']:.1f} -> '{caminho}'")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,44 @@
+import numpy as np
+from scipy.spatial import cKDTree
+
+# Função para selecionar os pontos que ficam após remover vizinhos muito próximos.
+# Mantém a semântica dos filtros originais: os pontos são visitados na ordem recebida
+# (goodFeaturesToTrack já os entrega do mais forte para o mais fraco) e um ponto só é
+# mantido se nenhum ponto mantido antes dele estiver próximo demais.
+# inclusivo=False descarta pares com distância < distancia_minima (detectar_cantos);
+# inclusivo=True descarta também os pares com distância == distancia_minima (filtrar_pontos).
+def indices_pontos_distantes(pontos, distancia_minima, inclusivo=False):
+    pontos = np.asarray(pontos, dtype=np.float64).reshape(-1, 2)
+    n = len(pontos)
+    if n == 0:
+        return np.empty(0, dtype=np.intp)
+
+    # Pares candidatos em O(n log n) com uma KD-tree; o raio é exato e depois refinado
+    pares = cKDTree(pontos).query_pairs(distancia_minima, output_type="ndarray")
+    if len(pares):
+        diferencas = pontos[pares[:, 0]] - pontos[pares[:, 1]]
+        distancias_quadradas = np.einsum("ij,ij->i", diferencas, diferencas)
+        limite = distancia_minima * distancia_minima
+        proximos = distancias_quadradas <= limite if inclusivo else distancias_quadradas < limite
+        pares = pares[proximos]
+
+    # Lista de adjacência compacta: para cada ponto, os vizinhos que vêm depois dele
+    pares = np.sort(pares, axis=1)
+    pares = pares[np.argsort(pares[:, 0], kind="stable")]
+    inicios = np.searchsorted(pares[:, 0], np.arange(n + 1))
+    vizinhos = pares[:, 1]
+
+    # Varredura gulosa na ordem original: o primeiro (mais forte) ponto vence
+    descartado = np.zeros(n, dtype=bool)
+    for i in range(n):
+        if not descartado[i]:
+            descartado[vizinhos[inicios[i]:inicios[i + 1]]] = True
+    return np.flatnonzero(~descartado)
+
+# Função para filtrar uma lista de pontos (x, y) mantendo o tipo dos elementos recebidos
+# (um array N x 2 volta como array, sem passar por tuplas)
+def filtrar_pontos_proximos(coordenadas_pontos, distancia_minima, inclusivo=False):
+    indices = indices_pontos_distantes(coordenadas_pontos, distancia_minima, inclusivo)
+    if isinstance(coordenadas_pontos, np.ndarray):
+        return coordenadas_pontos[indices]
+    return [coordenadas_pontos[i] for i in indices]
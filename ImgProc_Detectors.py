@@ -0,0 +1,160 @@
+import argparse
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from ImgProc_Pipeline import como_pontos, converter_cinza
+
+# Registro de detectores: cada detector recebe a imagem (colorida ou em tons de cinza) e parâmetros
+# opcionais e devolve os pontos em pixels; detectar_pontos entrega sempre um array N x 2 contíguo em float32,
+# sem arredondar as coordenadas sub-pixel (centroides, modelo). Os módulos de cada detector só são importados
+# quando ele é usado.
+
+def _bgr(imagem):
+    return cv2.cvtColor(imagem, cv2.COLOR_GRAY2BGR) if imagem.ndim == 2 else imagem
+
+def detector_monitoramento(imagem, **parametros):
+    from ImgProc_StructuralMonitoring import detectar_cantos_com_filtro
+    return detectar_cantos_com_filtro(imagem, **parametros)
+
+def detector_distancias(imagem, **parametros):
+    from ImgProc_DistanceCalculation import detectar_cantos
+    return detectar_cantos(imagem, **parametros)
+
+def detector_piramide(imagem, **parametros):
+    from ImgProc_PyramidDetection import detectar_cantos_piramide
+    return detectar_cantos_piramide(imagem, **parametros)
+
+def detector_blocos(imagem, **parametros):
+    from ImgProc_PyramidDetection import detectar_cantos_em_blocos
+    return detectar_cantos_em_blocos(imagem, **parametros)
+
+# Detector declarativo: um preset ou JSON de ImgProc_Pipeline (ex.: pipeline="pointdetection2")
+def detector_pipeline(imagem, pipeline="distancias"):
+    from ImgProc_Pipeline import carregar_configuracao, executar
+    return executar(imagem, carregar_configuracao(pipeline))
+
+# Variantes originais (ImgProc_PointDetection*.py), que esperam a imagem colorida
+def _detector_legado(modulo):
+    def detectar(imagem):
+        import importlib
+        return importlib.import_module(modulo).detectar_cantos(_bgr(imagem))
+    return detectar
+
+# Função para binarizar as marcações escuras (limiar de Otsu) e remover as linhas finas da grade com uma
+# abertura morfológica: sobram só as marcações mais largas que as linhas (os pontos dos "*_pontos.jpg")
+def binarizar_marcacoes(imagem_cinza, espessura_linha=None):
+    _, binaria = cv2.threshold(imagem_cinza, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    if espessura_linha is None:
+        # A maior parte dos pixels escuros pertence às linhas: a mediana da distância até o fundo
+        # é a meia espessura típica das linhas
+        distancias = cv2.distanceTransform(binaria, cv2.DIST_L2, 3)
+        escuros = distancias[binaria > 0]
+        espessura_linha = 2 * float(np.median(escuros)) if len(escuros) else 0.0
+    lado = 2 * int(np.ceil(espessura_linha)) + 1
+    if lado > 1:
+        elemento = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (lado, lado))
+        binaria = cv2.morphologyEx(binaria, cv2.MORPH_OPEN, elemento)
+    return binaria
+
+# Detector de centroides: limiar + componentes conexas, em tempo linear no número de pixels
+# (sem resposta de canto por pixel nem ordenação de candidatos). Componentes muito menores ou
+# muito maiores que a marcação típica (ruído, manchas) são descartados.
+def detector_centroides(imagem, espessura_linha=None, area_minima=None, fator_area=4.0):
+    binaria = binarizar_marcacoes(converter_cinza(imagem), espessura_linha)
+    quantidade, _, estatisticas, centroides = cv2.connectedComponentsWithStats(binaria, connectivity=8)
+    areas = estatisticas[1:, cv2.CC_STAT_AREA]
+    centroides = centroides[1:]
+    if len(areas) == 0:
+        return como_pontos([])
+    tipica = float(np.median(areas))
+    area_minima = area_minima if area_minima is not None else tipica / fator_area
+    validos = (areas >= area_minima) & (areas <= tipica * fator_area)
+    return como_pontos(centroides[validos])
+
+# Função para sintetizar o modelo de uma marcação: disco escuro sobre fundo claro
+def modelo_disco(diametro):
+    lado = 2 * int(np.ceil(diametro)) + 1
+    modelo = np.full((lado, lado), 255, dtype=np.uint8)
+    cv2.circle(modelo, (lado // 2, lado // 2), max(1, int(round(diametro / 2))), 0, -1, cv2.LINE_AA)
+    return modelo
+
+# Detector por correlação com um modelo (arquivo de imagem ou disco sintético): máximos locais da correlação
+# normalizada acima de 'limiar'. Sem modelo, o diâmetro do disco vem da área típica dos centroides.
+def detector_modelo(imagem, modelo=None, diametro=None, limiar=0.6, minDistance=None):
+    imagem_cinza = converter_cinza(imagem)
+    if isinstance(modelo, str):
+        caminho_modelo = modelo
+        modelo = cv2.imread(caminho_modelo, cv2.IMREAD_GRAYSCALE)
+        if modelo is None:
+            raise ValueError(f"Erro ao carregar o modelo: {caminho_modelo}")
+    elif modelo is None:
+        if diametro is None:
+            binaria = binarizar_marcacoes(imagem_cinza)
+            _, _, estatisticas, _ = cv2.connectedComponentsWithStats(binaria, connectivity=8)
+            if len(estatisticas) < 2:
+                return como_pontos([])
+            diametro = 2 * np.sqrt(np.median(estatisticas[1:, cv2.CC_STAT_AREA]) / np.pi)
+        modelo = modelo_disco(diametro)
+
+    altura, largura = modelo.shape[:2]
+    resposta = cv2.matchTemplate(imagem_cinza, converter_cinza(modelo), cv2.TM_CCOEFF_NORMED)
+    # Máximo local: o valor é o maior da vizinhança do tamanho do modelo
+    lado = minDistance or max(altura, largura)
+    maximos = cv2.dilate(resposta, cv2.getStructuringElement(cv2.MORPH_RECT, (lado, lado)))
+    ys, xs = np.nonzero((resposta >= limiar) & (resposta == maximos))
+    return como_pontos(np.column_stack((xs + (largura - 1) / 2, ys + (altura - 1) / 2)))
+
+DETECTORES = {
+    "monitoramento": detector_monitoramento,
+    "distancias": detector_distancias,
+    "piramide": detector_piramide,
+    "blocos": detector_blocos,
+    "pipeline": detector_pipeline,
+    "pointdetection": _detector_legado("ImgProc_PointDetection"),
+    "pointdetection2": _detector_legado("ImgProc_PointDetection2"),
+    "pointdetection3": _detector_legado("ImgProc_PointDetection3"),
+    "centroides": detector_centroides,
+    "modelo": detector_modelo,
+}
+
+# Função para acrescentar um detector ao registro (ex.: um detector específico de um ensaio)
+def registrar_detector(nome, funcao):
+    DETECTORES[nome] = funcao
+    return funcao
+
+# Função para executar um detector do registro pelo nome
+def detectar_pontos(imagem, detector="monitoramento", **parametros):
+    if detector not in DETECTORES:
+        raise ValueError(f"Detector desconhecido: {detector} (disponíveis: {', '.join(sorted(DETECTORES))})")
+    return como_pontos(DETECTORES[detector](imagem, **parametros)).astype(np.float32, copy=False)
+
+def main(argv=None):
+    from ImgProc_BatchProcessing import listar_imagens
+    from ImgProc_ImageLoading import carregar_imagem
+
+    parser = argparse.ArgumentParser(description="Executa os detectores do registro e compara pontos e tempos.")
+    parser.add_argument("entradas", nargs="+", help="Diretórios, arquivos ou padrões glob de imagens")
+    parser.add_argument("--detectores", nargs="+", choices=sorted(DETECTORES), default=["monitoramento", "centroides"])
+    args = parser.parse_args(argv)
+
+    for caminho_imagem in listar_imagens(args.entradas):
+        imagem = carregar_imagem(caminho_imagem, "cinza")
+        if imagem is None:
+            print(f"Erro ao carregar a imagem: {caminho_imagem}")
+            continue
+        print(caminho_imagem)
+        for nome in args.detectores:
+            inicio = time.perf_counter()
+            try:
+                pontos = detectar_pontos(imagem, nome)
+            except Exception as erro:
+                print(f"  {nome:16} {type(erro).__name__}: {erro}")
+                continue
+            print(f"  {nome:16} {len(pontos):6d} pontos {1000 * (time.perf_counter() - inicio):8.1f} ms")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
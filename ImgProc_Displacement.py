@@ -0,0 +1,292 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import linear_sum_assignment
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from scipy.spatial import cKDTree
+
+# Um par de vizinhos mútuos só é aceito direto se o segundo candidato estiver bem mais longe
+# (distância ao mais próximo < RAZAO_AMBIGUIDADE x distância ao segundo); os demais vão para a atribuição ótima
+RAZAO_AMBIGUIDADE = 0.8
+
+# Custo das atribuições impossíveis (pares além da distância máxima) no problema de atribuição
+CUSTO_PROIBIDO = 1e9
+
+# Função para estimar a distância máxima de associação: metade do espaçamento típico entre pontos vizinhos
+def distancia_maxima_padrao(referencia):
+    if len(referencia) < 2:
+        return np.inf
+    distancias, _ = cKDTree(referencia).query(referencia, k=2)
+    return 0.5 * float(np.median(distancias[:, 1]))
+
+# Função para estimar a translação rígida entre as imagens (mediana dos deslocamentos até o vizinho
+# mais próximo, refinada algumas vezes), para que a associação seja feita sobre o movimento residual.
+# A mediana é estável com uma amostra dos pontos, o que mantém a estimativa barata em séries grandes.
+def estimar_translacao(referencia, atual, arvore_atual=None, iteracoes=3, amostra=1000):
+    translacao = np.zeros(2)
+    if len(referencia) == 0 or len(atual) == 0:
+        return translacao
+    arvore_atual = arvore_atual if arvore_atual is not None else cKDTree(atual)
+    if len(referencia) > amostra:
+        referencia = referencia[np.linspace(0, len(referencia) - 1, amostra).astype(np.intp)]
+    for _ in range(iteracoes):
+        _, indices = arvore_atual.query(referencia + translacao, k=1)
+        translacao = np.median(atual[indices] - referencia, axis=0)
+    return translacao
+
+# Função para resolver os casos ambíguos: os pares candidatos (dentro da distância máxima) são separados
+# em componentes conexas e cada componente é resolvida com o algoritmo húngaro (linear_sum_assignment)
+def _atribuir_ambiguos(referencia, atual, restantes_ref, restantes_atual, distancia_maxima):
+    if len(restantes_ref) == 0 or len(restantes_atual) == 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    candidatos = cKDTree(referencia[restantes_ref]).sparse_distance_matrix(
+        cKDTree(atual[restantes_atual]), distancia_maxima, output_type="coo_matrix")
+    if candidatos.nnz == 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+
+    # Grafo bipartido: vértices 0..n_ref-1 (referência) e n_ref.. (atual)
+    n_ref, n_atual = len(restantes_ref), len(restantes_atual)
+    grafo = coo_matrix((np.ones(candidatos.nnz), (candidatos.row, candidatos.col + n_ref)),
+                       shape=(n_ref + n_atual, n_ref + n_atual))
+    _, rotulos = connected_components(grafo, directed=False)
+
+    associados_ref, associados_atual = [], []
+    ordem = np.argsort(rotulos[candidatos.row], kind="stable")
+    linhas, colunas, custos = candidatos.row[ordem], candidatos.col[ordem], candidatos.data[ordem]
+    inicios = np.flatnonzero(np.diff(rotulos[linhas], prepend=-1))
+    for inicio, fim in zip(inicios, np.append(inicios[1:], len(linhas))):
+        linhas_comp, colunas_comp = linhas[inicio:fim], colunas[inicio:fim]
+        unicas_ref, locais_ref = np.unique(linhas_comp, return_inverse=True)
+        unicas_atual, locais_atual = np.unique(colunas_comp, return_inverse=True)
+        if len(linhas_comp) == 1:
+            associados_ref.append(unicas_ref)
+            associados_atual.append(unicas_atual)
+            continue
+        matriz = np.full((len(unicas_ref), len(unicas_atual)), CUSTO_PROIBIDO)
+        matriz[locais_ref, locais_atual] = custos[inicio:fim]
+        escolhidos_ref, escolhidos_atual = linear_sum_assignment(matriz)
+        validos = matriz[escolhidos_ref, escolhidos_atual] < CUSTO_PROIBIDO
+        associados_ref.append(unicas_ref[escolhidos_ref[validos]])
+        associados_atual.append(unicas_atual[escolhidos_atual[validos]])
+    return restantes_ref[np.concatenate(associados_ref)], restantes_atual[np.concatenate(associados_atual)]
+
+# Função para associar os pontos da imagem atual aos da referência.
+# Vizinhos mais próximos mútuos e sem concorrentes próximos são aceitos diretamente (KD-tree);
+# os casos ambíguos são resolvidos por atribuição ótima. Retorna (índices na referência, índices na atual,
+# translação estimada), com os pares ordenados pelo índice da referência.
+# A translação é estimada módulo o espaçamento da grade: deslocamentos maiores que meio vão não são distinguíveis.
+def associar_pontos(referencia, atual, distancia_maxima=None, compensar_translacao=True,
+                    razao_ambiguidade=RAZAO_AMBIGUIDADE, arvore_referencia=None):
+    referencia = np.asarray(referencia, dtype=np.float64).reshape(-1, 2)
+    atual = np.asarray(atual, dtype=np.float64).reshape(-1, 2)
+    vazio = np.empty(0, dtype=np.intp)
+    if len(referencia) == 0 or len(atual) == 0:
+        return vazio, vazio, np.zeros(2)
+    if distancia_maxima is None:
+        distancia_maxima = distancia_maxima_padrao(referencia)
+
+    arvore_atual = cKDTree(atual)
+    translacao = estimar_translacao(referencia, atual, arvore_atual) if compensar_translacao else np.zeros(2)
+    deslocada = referencia + translacao
+    # A árvore da referência pode vir pronta (séries): basta consultá-la com a atual sem a translação
+    arvore_referencia = arvore_referencia if arvore_referencia is not None else cKDTree(referencia)
+
+    k = min(2, len(atual))
+    distancias_ref, vizinhos_ref = arvore_atual.query(deslocada, k=[1, 2][:k])
+    distancias_atual, vizinhos_atual = arvore_referencia.query(atual - translacao,
+                                                               k=[1, 2][:min(2, len(referencia))])
+
+    # Segundo vizinho ausente (só um ponto do outro lado): sem concorrente
+    segunda_ref = distancias_ref[:, 1] if k == 2 else np.full(len(referencia), np.inf)
+    segunda_atual = distancias_atual[:, 1] if distancias_atual.shape[1] == 2 else np.full(len(atual), np.inf)
+
+    indices_ref = np.arange(len(referencia))
+    mais_proximo = vizinhos_ref[:, 0]
+    mutuos = (vizinhos_atual[mais_proximo, 0] == indices_ref) & (distancias_ref[:, 0] <= distancia_maxima)
+    distintos = ((distancias_ref[:, 0] < razao_ambiguidade * segunda_ref)
+                 & (distancias_ref[:, 0] < razao_ambiguidade * segunda_atual[mais_proximo]))
+    diretos = mutuos & distintos
+    associados_ref, associados_atual = indices_ref[diretos], mais_proximo[diretos]
+
+    livres_atual = np.ones(len(atual), dtype=bool)
+    livres_atual[associados_atual] = False
+    ambiguos_ref, ambiguos_atual = _atribuir_ambiguos(deslocada, atual, indices_ref[~diretos],
+                                                      np.flatnonzero(livres_atual), distancia_maxima)
+
+    associados_ref = np.concatenate((associados_ref, ambiguos_ref))
+    associados_atual = np.concatenate((associados_atual, ambiguos_atual))
+    ordem = np.argsort(associados_ref)
+    return associados_ref[ordem], associados_atual[ordem], translacao
+
+# Função para calcular o deslocamento de cada ponto associado (atual - referência)
+def calcular_deslocamentos(referencia, atual, indices_ref, indices_atual):
+    referencia = np.asarray(referencia, dtype=np.float64).reshape(-1, 2)
+    atual = np.asarray(atual, dtype=np.float64).reshape(-1, 2)
+    vetores = atual[indices_atual] - referencia[indices_ref]
+    return vetores, np.linalg.norm(vetores, axis=1)
+
+# Função para calcular a deformação de cada aresta da referência cujos dois pontos foram associados:
+# (L - L0) / L0. Retorna as arestas presentes (índices da referência), L0, L e a deformação.
+def calcular_deformacoes(referencia, atual, indices_ref, indices_atual, arestas):
+    referencia = np.asarray(referencia, dtype=np.float64).reshape(-1, 2)
+    atual = np.asarray(atual, dtype=np.float64).reshape(-1, 2)
+    arestas = np.asarray(arestas, dtype=np.intp).reshape(-1, 2)
+    posicao = np.full(len(referencia), -1, dtype=np.intp)
+    posicao[indices_ref] = indices_atual
+    presentes = (posicao[arestas[:, 0]] >= 0) & (posicao[arestas[:, 1]] >= 0)
+    arestas = arestas[presentes]
+
+    comprimentos_ref = np.linalg.norm(referencia[arestas[:, 1]] - referencia[arestas[:, 0]], axis=1)
+    comprimentos = np.linalg.norm(atual[posicao[arestas[:, 1]]] - atual[posicao[arestas[:, 0]]], axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        deformacoes = np.where(comprimentos_ref > 0, (comprimentos - comprimentos_ref) / comprimentos_ref, np.nan)
+    return arestas, comprimentos_ref, comprimentos, deformacoes
+
+# Função para definir as arestas da referência em que a deformação é medida:
+# a grade reconstruída ("grade") ou os k vizinhos mais próximos de cada ponto ("vizinhos")
+def arestas_referencia(referencia, modo="grade", k=4):
+    if modo == "grade":
+        from ImgProc_GridTopology import reconstruir_grade
+        return reconstruir_grade(referencia)["arestas"]
+    from ImgProc_DistanceEngine import gerar_distancias
+    arestas = [np.column_stack((a, b)) for a, b, _ in gerar_distancias(referencia, modo="vizinhos", k=k)]
+    return np.concatenate(arestas) if arestas else np.empty((0, 2), dtype=np.intp)
+
+# Comparação de uma série de imagens com a mesma referência: os pontos e as arestas da referência
+# são preparados uma única vez e reaproveitados em todas as comparações
+class ComparadorReferencia:
+    def __init__(self, referencia, modo_arestas="grade", k=4, distancia_maxima=None, compensar_translacao=True):
+        self.referencia = np.asarray(referencia, dtype=np.float64).reshape(-1, 2)
+        self.arestas = arestas_referencia(self.referencia, modo_arestas, k)
+        self.distancia_maxima = (distancia_maxima if distancia_maxima is not None
+                                 else distancia_maxima_padrao(self.referencia))
+        self.compensar_translacao = compensar_translacao
+        self.arvore = cKDTree(self.referencia)
+
+    # Função para comparar os pontos de uma imagem com a referência
+    def comparar(self, atual):
+        atual = np.asarray(atual, dtype=np.float64).reshape(-1, 2)
+        indices_ref, indices_atual, translacao = associar_pontos(
+            self.referencia, atual, self.distancia_maxima, self.compensar_translacao,
+            arvore_referencia=self.arvore)
+        vetores, deslocamentos = calcular_deslocamentos(self.referencia, atual, indices_ref, indices_atual)
+        arestas, comprimentos_ref, comprimentos, deformacoes = calcular_deformacoes(
+            self.referencia, atual, indices_ref, indices_atual, self.arestas)
+        return {"indices_ref": indices_ref, "indices_atual": indices_atual, "translacao": translacao,
+                "pontos_atual": atual, "vetores": vetores, "deslocamentos": deslocamentos, "arestas": arestas,
+                "comprimentos_ref": comprimentos_ref, "comprimentos": comprimentos, "deformacoes": deformacoes}
+
+# Função para obter a maior deformação em módulo; arestas de comprimento nulo na referência (NaN) são ignoradas
+# e, sem nenhuma aresta válida, o resultado é NaN (sem o aviso de np.nanmax para arrays só com NaN)
+def deformacao_maxima(deformacoes):
+    validas = np.abs(deformacoes[~np.isnan(deformacoes)])
+    return float(validas.max()) if len(validas) else float("nan")
+
+# Função para salvar os deslocamentos por ponto e as deformações por aresta de uma comparação.
+# Os IDs são os números dos pontos da referência (a partir de 1).
+def salvar_comparacao(comparacao, referencia, caminho_imagem, pasta_csv="csv_deslocamentos"):
+    os.makedirs(pasta_csv, exist_ok=True)
+    nome_arquivo = os.path.splitext(os.path.basename(caminho_imagem))[0]
+    indices_ref, vetores = comparacao["indices_ref"], comparacao["vetores"]
+    pontos_ref = referencia[indices_ref]
+    pontos_atual = comparacao["pontos_atual"][comparacao["indices_atual"]]
+
+    df_pontos = pd.DataFrame({"ID": indices_ref + 1, "X ref": pontos_ref[:, 0], "Y ref": pontos_ref[:, 1],
+                              "X": pontos_atual[:, 0], "Y": pontos_atual[:, 1], "dX": vetores[:, 0],
+                              "dY": vetores[:, 1], "Deslocamento": comparacao["deslocamentos"]})
+    df_pontos.to_csv(os.path.join(pasta_csv, f"{nome_arquivo}_deslocamentos.csv"), index=False, float_format="%.3f")
+
+    arestas = comparacao["arestas"]
+    df_arestas = pd.DataFrame({"ID A": arestas[:, 0] + 1, "ID B": arestas[:, 1] + 1,
+                               "Comprimento ref": comparacao["comprimentos_ref"],
+                               "Comprimento": comparacao["comprimentos"], "Deformação": comparacao["deformacoes"]})
+    df_arestas.to_csv(os.path.join(pasta_csv, f"{nome_arquivo}_deformacoes.csv"), index=False, float_format="%.6g")
+
+# Função para agrupar as imagens em séries: cada pasta é uma série e a primeira imagem (em ordem de nome,
+# que nas fotos da câmera segue a data de captura) é a referência
+def agrupar_series(caminhos):
+    series = {}
+    for caminho in caminhos:
+        series.setdefault(os.path.dirname(caminho), []).append(caminho)
+    return series
+
+def main(argv=None):
+    import cv2
+
+    from ImgProc_BatchProcessing import listar_imagens
+    from ImgProc_Tracking import detectar_pontos
+
+    parser = argparse.ArgumentParser(description="Deslocamentos e deformações de cada imagem em relação à referência.")
+    parser.add_argument("entradas", nargs="+", help="Diretórios, arquivos ou padrões glob de imagens")
+    parser.add_argument("--referencia", help="Imagem de referência única (padrão: a primeira imagem de cada pasta)")
+    parser.add_argument("--saida", default="csv_deslocamentos", help="Pasta dos CSVs")
+    parser.add_argument("--arestas", choices=("grade", "vizinhos"), default="grade",
+                        help="Arestas da referência em que a deformação é medida")
+    parser.add_argument("--vizinhos", type=int, default=4, help="Vizinhos por ponto com --arestas vizinhos")
+    parser.add_argument("--distancia-maxima", type=float,
+                        help="Deslocamento residual máximo para associar dois pontos, em pixels "
+                             "(padrão: metade do espaçamento típico da referência)")
+    parser.add_argument("--sem-compensacao", action="store_true",
+                        help="Não remove a translação rígida antes de associar os pontos")
+    args = parser.parse_args(argv)
+
+    caminhos = listar_imagens(args.entradas)
+    if args.referencia:
+        referencia_unica = os.path.abspath(args.referencia)
+        series = {"": [referencia_unica] + [c for c in caminhos if c != referencia_unica]}
+    else:
+        series = agrupar_series(caminhos)
+    if not any(len(imagens) > 1 for imagens in series.values()):
+        print("É preciso ao menos uma referência e uma imagem a comparar.")
+        return 1
+
+    raiz = os.path.commonpath(list(series)) if len(series) > 1 else None
+    tempo_deteccao = tempo_comparacao = 0.0
+    comparacoes = 0
+    inicio = time.perf_counter()
+    for pasta, imagens in series.items():
+        if len(imagens) < 2:
+            continue
+        pasta_csv = os.path.join(args.saida, os.path.relpath(pasta, raiz)) if raiz else args.saida
+        comparador = None
+        for caminho_imagem in imagens:
+            imagem = cv2.imread(caminho_imagem)
+            if imagem is None:
+                print(f"Erro ao carregar a imagem: {caminho_imagem}")
+                continue
+            inicio_deteccao = time.perf_counter()
+            pontos = detectar_pontos(imagem)
+            tempo_deteccao += time.perf_counter() - inicio_deteccao
+
+            if comparador is None:
+                comparador = ComparadorReferencia(pontos, args.arestas, args.vizinhos, args.distancia_maxima,
+                                                  not args.sem_compensacao)
+                print(f"\nReferência: {caminho_imagem} ({len(pontos)} pontos, {len(comparador.arestas)} arestas)")
+                continue
+
+            inicio_comparacao = time.perf_counter()
+            comparacao = comparador.comparar(pontos)
+            decorrido = time.perf_counter() - inicio_comparacao
+            tempo_comparacao += decorrido
+            comparacoes += 1
+            salvar_comparacao(comparacao, comparador.referencia, caminho_imagem, pasta_csv)
+
+            maxima = deformacao_maxima(comparacao["deformacoes"])
+            mediana = np.median(comparacao["deslocamentos"]) if len(comparacao["deslocamentos"]) else float("nan")
+            tx, ty = comparacao["translacao"]
+            print(f"{os.path.basename(caminho_imagem)}: {len(comparacao['indices_ref'])} de {len(pontos)} pontos "
+                  f"associados, translação ({tx:.1f}, {ty:.1f}) px, deslocamento mediano {mediana:.2f} px, "
+                  f"deformação máxima {maxima:.4f} ({decorrido * 1000:.1f} ms)")
+
+    tempo_total = time.perf_counter() - inicio
+    print(f"\n{comparacoes} comparações em {tempo_total:.2f} s (detecção {tempo_deteccao:.2f} s, "
+          f"associação e deformações {tempo_comparacao * 1000:.1f} ms)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
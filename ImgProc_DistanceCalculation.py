@@ -1,147 +1,145 @@
+import argparse
 import cv2
-import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-from tkinter import Tk
-from tkinter.filedialog import askopenfilename
 import os
-from itertools import combinations
-import math
-
-# Ajustar contraste e brilho
-def ajustar_contraste_brilho(imagem, alpha=1.5, beta=30):
-    return cv2.convertScaleAbs(imagem, alpha=alpha, beta=beta)
-
-# Converter cinza para preto
-def converter_cinza_para_preto(imagem):
-    imagem_cinza = cv2.cvtColor(imagem, cv2.COLOR_BGR2GRAY)
-    imagem_cinza[imagem_cinza > 180] = 0  # Transforma em preto diretamente
-    return imagem_cinza
-
-# Detectar cantos na imagem
-def detectar_cantos(imagem):
-    imagem_cinza = cv2.cvtColor(imagem, cv2.COLOR_BGR2GRAY)
-    imagem_ajustada = ajustar_contraste_brilho(imagem_cinza)
-    imagem_suavizada = cv2.GaussianBlur(imagem_ajustada, (5, 5), 0)
-    
-    # Ajustando parâmetros para detecção de pontos
-    maxCorners = 0  # Limite máximo de pontos a serem detectados
-    qualityLevel = 0.05  # Aumentado para filtrar pontos de qualidade mais baixa
-    minDistance = 15  # Distância mínima entre pontos
-
-    # Detecta pontos com goodFeaturesToTrack
-    pontos = cv2.goodFeaturesToTrack(imagem_suavizada, maxCorners=maxCorners, qualityLevel=qualityLevel, minDistance=minDistance)
-
-    if pontos is not None:
-        pontos = pontos.astype(int)
-
-        # Lista para armazenar os pontos filtrados
-        coordenadas_pontos = []
-
-        for p in pontos:
-            x, y = p[0]
-            # Verificar se o ponto é suficientemente distante dos outros pontos
-            is_distante = True
-            for (px, py) in coordenadas_pontos:
-                if np.linalg.norm(np.array([x, y]) - np.array([px, py])) < minDistance:
-                    is_distante = False
-                    break
-            if is_distante:
-                coordenadas_pontos.append((x, y))
-
-        return coordenadas_pontos
-    else:
-        return []
+from ImgProc_Calibration import carregar_perfil
+from ImgProc_DistanceEngine import gerar_distancias, blocos_para_lista, salvar_blocos_csv
+from ImgProc_Instrumentation import adicionar_argumentos, etapa, medir_blocos, sessao
+from ImgProc_Overlay import caminho_figura, salvar_sobreposicao
+from ImgProc_Pipeline import (ajustar_configuracao, com_subpixel, converter_cinza_para_preto, executar, localizar,
+                              preparar, selecionar_imagem)
+import ImgProc_Pipeline as pipeline
+
+# API pública do script (as funções comuns vêm de ImgProc_Pipeline e são importadas de lá)
+__all__ = ["COLUNAS_DISTANCIAS", "configuracao_deteccao", "suavizar_imagem", "localizar_cantos", "detectar_cantos",
+           "salvar_coordenadas", "calcular_distancias", "salvar_distancias_em_blocos", "exibir_distancias",
+           "exibir_imagem_com_pontos", "main"]
+
+COLUNAS_DISTANCIAS = ("Ponto A", " Ponto B", " Distância")
+
+# Configuração do preset "distancias" de ImgProc_Pipeline com os parâmetros informados.
+# maxCorners = 0: sem limite de pontos; qualityLevel = 0.05: filtra pontos de qualidade mais baixa;
+# minDistance = 15: distância mínima entre pontos (também usada no filtro de pontos próximos).
+# Com a tabela de um perfil de calibração, contraste, brilho e limiar são aplicados em uma única passada.
+# Com subpixel ("cantos" ou "centroide"), os pontos são refinados na imagem em tons de cinza em vez de truncados.
+def configuracao_deteccao(maxCorners=0, qualityLevel=0.05, minDistance=15, alpha=1.5, beta=30, tabela=None,
+                          subpixel=None):
+    configuracao = ajustar_configuracao(
+        "distancias", contraste={"alpha": alpha, "beta": beta}, dedup={"limiar": minDistance},
+        cantos={"maxCorners": maxCorners, "qualityLevel": qualityLevel, "minDistance": minDistance})
+    if tabela is not None:
+        configuracao[0] = {"etapa": "tabela", "tabela": tabela}
+    return com_subpixel(configuracao, subpixel) if subpixel else configuracao
+
+# Ajustar contraste e brilho e suavizar (entrada do detector)
+def suavizar_imagem(imagem_cinza, alpha=1.5, beta=30, tabela=None):
+    return preparar(imagem_cinza, configuracao_deteccao(alpha=alpha, beta=beta, tabela=tabela))[0]
+
+# Localizar os cantos na imagem já suavizada (retorna array N x 2: int32, ou float32 com subpixel)
+def localizar_cantos(imagem_suavizada, maxCorners=0, qualityLevel=0.05, minDistance=15):
+    return localizar(imagem_suavizada, None, configuracao_deteccao(maxCorners, qualityLevel, minDistance))
+
+# Detectar cantos na imagem (retorna array N x 2: int32, ou float32 com subpixel)
+def detectar_cantos(imagem, maxCorners=0, qualityLevel=0.05, minDistance=15, cache=None, alpha=1.5, beta=30,
+                    tabela=None, subpixel=None):
+    configuracao = configuracao_deteccao(maxCorners, qualityLevel, minDistance, alpha, beta, tabela, subpixel)
+    return executar(imagem, configuracao, cache)
 
 # Salvar pontos em CSV
-def salvar_coordenadas(coordenadas_pontos, caminho_imagem):
-    pasta_csv = "csv_coordinates"
-    os.makedirs(pasta_csv, exist_ok=True)
-    
-    nome_arquivo = os.path.splitext(os.path.basename(caminho_imagem))[0]
-    nome_csv = os.path.join(pasta_csv, f"{nome_arquivo}_coordinates.csv")
-    
-    df_pontos = pd.DataFrame(coordenadas_pontos, columns=["X", "Y"])
-    df_pontos.to_csv(nome_csv, index=False)
-    
-    print(f"Coordenadas salvas em '{nome_csv}'")
-
-# Função para calcular a distância euclidiana entre dois pontos
-def calcular_distancia(pontoA, pontoB):
-    return math.sqrt((pontoB[0] - pontoA[0]) ** 2 + (pontoB[1] - pontoA[1]) ** 2)
+def salvar_coordenadas(coordenadas_pontos, caminho_imagem, pasta_csv="csv_coordinates"):
+    pipeline.salvar_coordenadas(coordenadas_pontos, caminho_imagem, pasta_csv, "_coordinates")
 
 # Função para calcular as distâncias entre todos os pontos
 def calcular_distancias(coordenadas_pontos):
-    distancias = []
-    for (i, pontoA), (j, pontoB) in combinations(enumerate(coordenadas_pontos), 2):
-        distancia = calcular_distancia(pontoA, pontoB)
-        distancias.append((i + 1, j + 1, distancia))  # Adiciona índices dos pontos e a distância
-    return distancias
-
-# Função para salvar as distâncias em um arquivo CSV dentro da pasta "CSV"
-def salvar_distancias(distancias, caminho_imagem):
-    pasta_csv = "csv_distances"
-    os.makedirs(pasta_csv, exist_ok=True)  # Cria a pasta se não existir
-    
-    nome_arquivo = os.path.splitext(os.path.basename(caminho_imagem))[0]  # Pega o nome da imagem sem extensão
-    nome_csv = os.path.join(pasta_csv, f"{nome_arquivo}_distances.csv")  # Cria o caminho completo do CSV
-    
-    df_distancias = pd.DataFrame(distancias, columns=["Ponto A", " Ponto B", " Distância"])
-    df_distancias.to_csv(nome_csv, index=False)
-    
-    print(f"Distâncias salvas em '{nome_csv}'")
-
-def exibir_imagem_com_pontos(imagem, coordenadas_pontos, imagem_cinza):
-    # Exibe a imagem original com os pontos
-    plt.subplot(1, 2, 1)  # Cria uma subplot para a imagem original
-    plt.imshow(cv2.cvtColor(imagem, cv2.COLOR_BGR2RGB))
-    for (x, y) in coordenadas_pontos:
-        plt.plot(x, y, 'gx')
-    plt.gca().invert_yaxis()
-    plt.title(f"Imagem Original com Pontos ({len(coordenadas_pontos)})")
-
-    # Exibe a imagem em tons de cinza com os pontos
-    plt.subplot(1, 2, 2)  # Cria uma subplot para a imagem em tons de cinza
-    plt.imshow(imagem_cinza, cmap='gray')
-
-    plt.gca().invert_yaxis()
-    plt.title(f"Imagem em Tons de Cinza com Pontos ({len(coordenadas_pontos)})")
-
-    plt.tight_layout()  # Ajusta o layout para evitar sobreposição
-    plt.show()
+    return blocos_para_lista(gerar_distancias(coordenadas_pontos, modo="todos"))
 
-def main():
-    Tk().withdraw()
-    caminho_imagem = askopenfilename(title="Selecione uma imagem", filetypes=[("Imagens", "*.jpg;*.jpeg;*.png;*.bmp")])
-
-    if caminho_imagem:
-        imagem = cv2.imread(caminho_imagem)
-        
-        if imagem is not None:
-            coordenadas_pontos = detectar_cantos(imagem)
+# Função para gravar as distâncias bloco a bloco, sem montar a lista completa em memória
+def salvar_distancias_em_blocos(blocos, caminho_imagem, pasta_csv="csv_distances"):
+    os.makedirs(pasta_csv, exist_ok=True)
 
-            imagem_cinza = converter_cinza_para_preto(imagem)
+    nome_arquivo = os.path.splitext(os.path.basename(caminho_imagem))[0]
+    nome_csv = os.path.join(pasta_csv, f"{nome_arquivo}_distances.csv")
 
-            print(f"Total de pontos detectados: {len(coordenadas_pontos)}")
-            for i, coord in enumerate(coordenadas_pontos):
-                print(f"Ponto {i + 1}: X = {coord[0]}, Y = {coord[1]}")
+    total = salvar_blocos_csv(blocos, nome_csv, colunas=COLUNAS_DISTANCIAS)
 
-            salvar_coordenadas(coordenadas_pontos, caminho_imagem)
+    print(f"Distâncias salvas em '{nome_csv}'")
+    return total
 
-            # Calcular e exibir as distâncias em seguida
-            distancias = calcular_distancias(coordenadas_pontos)
-            print("\nDistâncias entre os pontos:")
-            for dist in distancias:
-                print(f"Distância entre Ponto {dist[0]} e Ponto {dist[1]}: {dist[2]:.2f}")
+# Função para exibir as distâncias de cada bloco antes de repassá-lo adiante
+def exibir_distancias(blocos):
+    for indices_a, indices_b, valores in blocos:
+        for a, b, d in zip(indices_a + 1, indices_b + 1, valores):
+            print(f"Distância entre Ponto {a} e Ponto {b}: {d:.2f}")
+        yield indices_a, indices_b, valores
 
-            # Salvar as distâncias
-            salvar_distancias(distancias, caminho_imagem)
+# Visualizador opcional (--exibir); os pontos já vêm desenhados na imagem
+def exibir_imagem_com_pontos(imagem, coordenadas_pontos, imagem_cinza):
+    pipeline.exibir_imagem_com_pontos(imagem, coordenadas_pontos, imagem_cinza, "Imagem Original com Pontos")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Detecta os pontos de uma imagem e calcula as distâncias entre todos eles.")
+    parser.add_argument("imagem", nargs="?", help="Imagem a processar (se omitida, abre a janela de seleção)")
+    parser.add_argument("--verboso", action="store_true", help="Exibe cada ponto e cada distância no console")
+    parser.add_argument("--exibir", action="store_true", help="Abre a imagem com os pontos no matplotlib")
+    parser.add_argument("--ids", action="store_true", help="Escreve o número de cada ponto na figura")
+    parser.add_argument("--pasta-figuras", default="overlays", help="Pasta da figura com os pontos")
+    parser.add_argument("--calibracao", help="Perfil de calibração de tons de cinza (ImgProc_Calibration.py)")
+    parser.add_argument("--subpixel", choices=("cantos", "centroide"),
+                        help="Refina os pontos com precisão sub-pixel (cornerSubPix ou centroide ponderado)")
+    adicionar_argumentos(parser)
+    args = parser.parse_args(argv)
+
+    perfil_calibracao = None
+    if args.calibracao:
+        try:
+            perfil_calibracao = carregar_perfil(args.calibracao)
+        except ValueError as erro:
+            parser.error(str(erro))
+    caminho_imagem = args.imagem
+    if not caminho_imagem:
+        caminho_imagem = selecionar_imagem()
 
-            # Exibir a imagem com os pontos
+    if caminho_imagem:
+        with sessao(args, {"imagem": caminho_imagem}):
+            with etapa("decodificacao"):
+                imagem = cv2.imread(caminho_imagem)
+            
+            if imagem is not None:
+                # A conversão para tons de cinza é feita uma única vez e reaproveitada
+                imagem_cinza = cv2.cvtColor(imagem, cv2.COLOR_BGR2GRAY)
+                if perfil_calibracao is None:
+                    coordenadas_pontos = detectar_cantos(imagem_cinza, subpixel=args.subpixel)
+                    imagem_cinza = converter_cinza_para_preto(imagem_cinza)
+                else:
+                    coordenadas_pontos = detectar_cantos(imagem_cinza, tabela=perfil_calibracao["tabela_deteccao"],
+                                                         subpixel=args.subpixel)
+                    imagem_cinza = converter_cinza_para_preto(imagem_cinza, perfil_calibracao["tabela_preto"])
+
+                print(f"Total de pontos detectados: {len(coordenadas_pontos)}")
+                if args.verboso:
+                    for i, coord in enumerate(coordenadas_pontos):
+                        print(f"Ponto {i + 1}: X = {coord[0]}, Y = {coord[1]}")
+
+                # Calcular e salvar as distâncias bloco a bloco (exibidas só com --verboso)
+                with etapa("serializacao", pontos=len(coordenadas_pontos)) as registro:
+                    salvar_coordenadas(coordenadas_pontos, caminho_imagem)
+                    blocos = medir_blocos("distancias", gerar_distancias(coordenadas_pontos, modo="todos"))
+                    if args.verboso:
+                        print("\nDistâncias entre os pontos:")
+                        blocos = exibir_distancias(blocos)
+                    registro["pares"] = total_distancias = salvar_distancias_em_blocos(blocos, caminho_imagem)
+                print(f"Total de distâncias: {total_distancias}")
+
+                with etapa("sobreposicao", pontos=len(coordenadas_pontos)):
+                    caminho_saida = salvar_sobreposicao(caminho_figura(caminho_imagem, args.pasta_figuras), imagem,
+                                                        coordenadas_pontos, ids=args.ids)
+                print(f"Figura salva em '{caminho_saida}'")
+
+            else:
+                print("Erro ao carregar a imagem.")
+
+        # Exibir a imagem com os pontos (fora da medição, pois a janela bloqueia até ser fechada)
+        if args.exibir and imagem is not None:
             exibir_imagem_com_pontos(imagem, coordenadas_pontos, imagem_cinza)
-
-        else:
-            print("Erro ao carregar a imagem.")
             
     else:
         print("Nenhuma imagem selecionada.")
@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from ImgProc_Pipeline import como_pontos
+
+# Quantidade máxima de pares calculados de uma vez (limita a memória usada por bloco)
+TAMANHO_BLOCO_PADRAO = 1 << 20
+
+MODOS_DISTANCIA = ("todos", "inicial", "raio", "vizinhos", "pares")
+
+# Função para calcular as distâncias de um conjunto de pares (índices começando em 0)
+def _distancias_dos_pares(pontos, indices_a, indices_b):
+    diferencas = pontos[indices_b] - pontos[indices_a]
+    return np.sqrt(np.einsum("ij,ij->i", diferencas, diferencas))
+
+# Função para dividir pares já calculados em blocos de tamanho limitado
+def _dividir_em_blocos(pontos, indices_a, indices_b, tamanho_bloco, distancias=None):
+    for inicio in range(0, len(indices_a), tamanho_bloco):
+        a = indices_a[inicio:inicio + tamanho_bloco]
+        b = indices_b[inicio:inicio + tamanho_bloco]
+        if distancias is None:
+            d = _distancias_dos_pares(pontos, a, b)
+        else:
+            d = distancias[inicio:inicio + tamanho_bloco]
+        yield a, b, d
+
+# Todos os pares (i < j) na mesma ordem de itertools.combinations, linha a linha da matriz condensada
+def _blocos_todos(pontos, tamanho_bloco):
+    n = len(pontos)
+    linha = 0
+    while linha < n - 1:
+        # Agrupa linhas consecutivas até atingir o tamanho do bloco (no mínimo uma linha)
+        pares_por_linha = n - 1 - np.arange(linha, n - 1)
+        acumulado = np.cumsum(pares_por_linha)
+        quantidade_linhas = max(1, int(np.searchsorted(acumulado, tamanho_bloco, side="right")))
+        linhas = np.arange(linha, linha + quantidade_linhas)
+        contagens = pares_por_linha[:quantidade_linhas]
+
+        indices_a = np.repeat(linhas, contagens)
+        inicios = np.repeat(np.cumsum(contagens) - contagens, contagens)
+        indices_b = indices_a + 1 + (np.arange(len(indices_a)) - inicios)
+        yield indices_a, indices_b, _distancias_dos_pares(pontos, indices_a, indices_b)
+        linha += quantidade_linhas
+
+# Distâncias do primeiro ponto até todos os demais
+def _blocos_inicial(pontos, tamanho_bloco):
+    indices_b = np.arange(1, len(pontos))
+    indices_a = np.zeros_like(indices_b)
+    yield from _dividir_em_blocos(pontos, indices_a, indices_b, tamanho_bloco)
+
+# Apenas pares cuja distância é menor ou igual ao raio
+def _blocos_raio(pontos, tamanho_bloco, raio):
+    pares = cKDTree(pontos).query_pairs(raio, output_type="ndarray")
+    pares = pares[np.lexsort((pares[:, 1], pares[:, 0]))]
+    yield from _dividir_em_blocos(pontos, pares[:, 0], pares[:, 1], tamanho_bloco)
+
+# Pares formados por cada ponto e seus k vizinhos mais próximos (sem repetições)
+def _blocos_vizinhos(pontos, tamanho_bloco, k):
+    k = min(k, len(pontos) - 1)
+    if k < 1:
+        return
+    _, vizinhos = cKDTree(pontos).query(pontos, k=k + 1)
+    origens = np.repeat(np.arange(len(pontos)), k)
+    destinos = vizinhos[:, 1:].ravel()
+    pares = np.unique(np.sort(np.column_stack((origens, destinos)), axis=1), axis=0)
+    yield from _dividir_em_blocos(pontos, pares[:, 0], pares[:, 1], tamanho_bloco)
+
+# Apenas os pares informados (ex.: arestas da grade), na ordem recebida
+def _blocos_pares(pontos, tamanho_bloco, pares):
+    pares = np.asarray(pares, dtype=np.intp).reshape(-1, 2)
+    yield from _dividir_em_blocos(pontos, pares[:, 0], pares[:, 1], tamanho_bloco)
+
+# Função para gerar as distâncias em blocos (indices_a, indices_b, distancias), com índices a partir de 0
+def gerar_distancias(coordenadas_pontos, modo="todos", raio=None, k=None, pares=None,
+                     tamanho_bloco=TAMANHO_BLOCO_PADRAO):
+    pontos = como_pontos(coordenadas_pontos).astype(np.float64)
+    if len(pontos) < 2:
+        return iter(())
+    if modo == "todos":
+        return _blocos_todos(pontos, tamanho_bloco)
+    if modo == "inicial":
+        return _blocos_inicial(pontos, tamanho_bloco)
+    if modo == "raio":
+        if raio is None:
+            raise ValueError("O modo 'raio' exige o parâmetro raio.")
+        return _blocos_raio(pontos, tamanho_bloco, raio)
+    if modo == "vizinhos":
+        if k is None:
+            raise ValueError("O modo 'vizinhos' exige o parâmetro k.")
+        return _blocos_vizinhos(pontos, tamanho_bloco, k)
+    if modo == "pares":
+        if pares is None:
+            raise ValueError("O modo 'pares' exige o parâmetro pares.")
+        return _blocos_pares(pontos, tamanho_bloco, pares)
+    raise ValueError(f"Modo de distância desconhecido: {modo}")
+
+# Função para converter os blocos na lista de tuplas (Ponto A, Ponto B, Distância) usada pelos scripts
+def blocos_para_lista(blocos):
+    distancias = []
+    for indices_a, indices_b, valores in blocos:
+        distancias.extend(zip((indices_a + 1).tolist(), (indices_b + 1).tolist(), valores.tolist()))
+    return distancias
+
+# Função para gravar os blocos diretamente em um CSV, sem montar a tabela inteira em memória
+def salvar_blocos_csv(blocos, nome_csv, colunas=("Ponto A", "Ponto B", "Distância")):
+    total = 0
+    with open(nome_csv, "w", newline="", encoding="utf-8") as arquivo:
+        pd.DataFrame(columns=list(colunas)).to_csv(arquivo, index=False)
+        for indices_a, indices_b, valores in blocos:
+            bloco = pd.DataFrame({colunas[0]: indices_a + 1, colunas[1]: indices_b + 1, colunas[2]: valores})
+            bloco.to_csv(arquivo, header=False, index=False)
+            total += len(bloco)
+    return total
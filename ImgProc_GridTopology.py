@@ -0,0 +1,169 @@
+import argparse
+import os
+import sys
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+from scipy.spatial import Delaunay, QhullError, cKDTree
+
+from ImgProc_DistanceEngine import gerar_distancias
+
+# Tolerância angular (graus) para uma aresta ser considerada paralela a uma direção da grade
+TOLERANCIA_ANGULO = 15.0
+
+# Função para extrair as arestas únicas de uma triangulação de Delaunay
+def arestas_delaunay(pontos):
+    if len(pontos) < 3:
+        return np.array([[0, 1]]) if len(pontos) == 2 else np.empty((0, 2), dtype=int)
+    try:
+        simplices = Delaunay(pontos).simplices
+    except QhullError:
+        # Pontos colineares: liga cada ponto ao vizinho mais próximo
+        _, vizinhos = cKDTree(pontos).query(pontos, k=2)
+        return np.unique(np.sort(np.column_stack((np.arange(len(pontos)), vizinhos[:, 1])), axis=1), axis=0)
+    arestas = np.concatenate((simplices[:, [0, 1]], simplices[:, [1, 2]], simplices[:, [0, 2]]))
+    return np.unique(np.sort(arestas, axis=1), axis=0)
+
+# Função para estimar as duas direções dominantes (em graus, 0 a 180) das arestas
+def direcoes_dominantes(vetores):
+    angulos = np.degrees(np.arctan2(vetores[:, 1], vetores[:, 0])) % 180.0
+    histograma = np.bincount(np.floor(angulos).astype(int) % 180, minlength=180).astype(float)
+    # Suavização circular para tornar o pico robusto a pequenas variações de perspectiva
+    janela = np.array([1, 2, 3, 2, 1], dtype=float)
+    suavizado = np.convolve(np.concatenate((histograma[-2:], histograma, histograma[:2])), janela, mode="valid")
+    primeira = float(np.argmax(suavizado)) + 0.5
+
+    distancia = np.abs((np.arange(180) + 0.5 - primeira + 90.0) % 180.0 - 90.0)
+    suavizado[distancia < 30.0] = -1
+    segunda = float(np.argmax(suavizado)) + 0.5
+    return primeira, segunda
+
+# Função para reconstruir a topologia da grade: atribui (linha, coluna) a cada ponto e
+# retorna as arestas entre vizinhos da grade (índices começando em 0) com sua orientação
+def reconstruir_grade(coordenadas_pontos, tolerancia_angulo=TOLERANCIA_ANGULO):
+    pontos = np.asarray(coordenadas_pontos, dtype=np.float64).reshape(-1, 2)
+    n = len(pontos)
+    linhas = np.full(n, -1, dtype=np.int32)
+    colunas = np.full(n, -1, dtype=np.int32)
+    componentes = np.full(n, -1, dtype=np.int32)
+    vazio = {"linhas": linhas, "colunas": colunas, "componentes": componentes,
+             "arestas": np.empty((0, 2), dtype=np.int64), "orientacoes": np.empty(0, dtype="<U1")}
+    if n < 2:
+        return vazio
+
+    candidatas = arestas_delaunay(pontos)
+    vetores = pontos[candidatas[:, 1]] - pontos[candidatas[:, 0]]
+    comprimentos = np.linalg.norm(vetores, axis=1)
+
+    # A direção mais próxima da horizontal define as colunas; a outra, as linhas
+    direcao_1, direcao_2 = direcoes_dominantes(vetores)
+    if abs((direcao_1 + 90.0) % 180.0 - 90.0) > abs((direcao_2 + 90.0) % 180.0 - 90.0):
+        direcao_1, direcao_2 = direcao_2, direcao_1
+    unitarios = np.array([[np.cos(np.radians(d)), np.sin(np.radians(d))] for d in (direcao_1, direcao_2)])
+    # Colunas crescem para a direita e linhas para baixo
+    if unitarios[0, 0] < 0:
+        unitarios[0] = -unitarios[0]
+    if unitarios[1, 1] < 0:
+        unitarios[1] = -unitarios[1]
+
+    # Classifica cada aresta candidata: eixo 0 (ao longo da linha) ou 1 (ao longo da coluna) e sentido
+    cossenos = (vetores @ unitarios.T) / comprimentos[:, None]
+    eixo = np.argmax(np.abs(cossenos), axis=1)
+    cosseno_eixo = cossenos[np.arange(len(candidatas)), eixo]
+    alinhada = np.abs(cosseno_eixo) >= np.cos(np.radians(tolerancia_angulo))
+    sentido = np.sign(cosseno_eixo).astype(int)
+
+    # Para cada ponto e cada meia-direção (+u, -u, +v, -v), apenas a aresta mais curta é aceita
+    # (as arestas são visitadas da mais longa para a mais curta, então a mais curta prevalece)
+    melhor = np.full((n, 4), -1, dtype=np.int64)
+    for k in np.flatnonzero(alinhada)[np.argsort(-comprimentos[alinhada])]:
+        a, b = candidatas[k]
+        slot_a = 2 * eixo[k] + (0 if sentido[k] > 0 else 1)
+        slot_b = 2 * eixo[k] + (1 if sentido[k] > 0 else 0)
+        melhor[a, slot_a] = b
+        melhor[b, slot_b] = a
+
+    # Mantém só as arestas escolhidas pelos dois extremos
+    grafo = nx.Graph()
+    grafo.add_nodes_from(range(n))
+    arestas, orientacoes = [], []
+    for a in range(n):
+        for slot in (0, 2):
+            b = melhor[a, slot]
+            if b >= 0 and melhor[b, slot + 1] == a:
+                passo = (0, 1) if slot == 0 else (1, 0)
+                grafo.add_edge(a, b, passo=passo, origem=a)
+                arestas.append((min(a, b), max(a, b)))
+                orientacoes.append("H" if slot == 0 else "V")
+
+    # Propaga os índices (linha, coluna) por busca em largura em cada componente conexa
+    for numero, componente in enumerate(sorted(nx.connected_components(grafo), key=len, reverse=True)):
+        raiz = min(componente)
+        linhas[raiz], colunas[raiz], componentes[raiz] = 0, 0, numero
+        for origem, destino in nx.bfs_edges(grafo, raiz):
+            dados = grafo.edges[origem, destino]
+            fator = 1 if dados["origem"] == origem else -1
+            linhas[destino] = linhas[origem] + fator * dados["passo"][0]
+            colunas[destino] = colunas[origem] + fator * dados["passo"][1]
+            componentes[destino] = numero
+        membros = np.fromiter(componente, dtype=np.int64)
+        linhas[membros] -= linhas[membros].min()
+        colunas[membros] -= colunas[membros].min()
+
+    if not arestas:
+        return vazio | {"linhas": linhas, "colunas": colunas, "componentes": componentes}
+    arestas = np.array(arestas, dtype=np.int64)
+    orientacoes = np.array(orientacoes)
+    ordem = np.lexsort((arestas[:, 1], arestas[:, 0]))
+    return {"linhas": linhas, "colunas": colunas, "componentes": componentes,
+            "arestas": arestas[ordem], "orientacoes": orientacoes[ordem]}
+
+# Função para gerar as distâncias apenas ao longo das arestas da grade (O(n) pares)
+def gerar_distancias_grade(coordenadas_pontos, grade=None):
+    grade = grade if grade is not None else reconstruir_grade(coordenadas_pontos)
+    return gerar_distancias(coordenadas_pontos, modo="pares", pares=grade["arestas"])
+
+# Função para salvar coordenadas com índices da grade e os vãos entre vizinhos da grade
+def salvar_grade(coordenadas_pontos, grade, caminho_imagem, pasta_csv="csv_grade"):
+    os.makedirs(pasta_csv, exist_ok=True)
+    nome_arquivo = os.path.splitext(os.path.basename(caminho_imagem))[0]
+    pontos = np.asarray(coordenadas_pontos).reshape(-1, 2)
+
+    df_pontos = pd.DataFrame({"Ponto": np.arange(1, len(pontos) + 1), "X": pontos[:, 0], "Y": pontos[:, 1],
+                              "Linha": grade["linhas"], "Coluna": grade["colunas"],
+                              "Componente": grade["componentes"]})
+    df_pontos.to_csv(os.path.join(pasta_csv, f"{nome_arquivo}_coordinates.csv"), index=False)
+
+    a, b = grade["arestas"][:, 0], grade["arestas"][:, 1]
+    distancias = np.concatenate([d for _, _, d in gerar_distancias_grade(pontos, grade)] or [np.empty(0)])
+    df_distancias = pd.DataFrame({"Ponto A": a + 1, "Ponto B": b + 1,
+                                  "Linha A": grade["linhas"][a], "Coluna A": grade["colunas"][a],
+                                  "Linha B": grade["linhas"][b], "Coluna B": grade["colunas"][b],
+                                  "Orientação": grade["orientacoes"], "Distância": distancias})
+    df_distancias.to_csv(os.path.join(pasta_csv, f"{nome_arquivo}_distances.csv"), index=False)
+    print(f"Grade salva em '{pasta_csv}' ({len(pontos)} pontos, {len(a)} arestas)")
+
+def main(argv=None):
+    import cv2
+
+    from ImgProc_BatchProcessing import listar_imagens
+    from ImgProc_StructuralMonitoring import LIMIAR_FILTRO, detectar_cantos_com_filtro, filtrar_pontos
+
+    parser = argparse.ArgumentParser(description="Reconstrói a grade de nós e mede os vãos entre vizinhos.")
+    parser.add_argument("entradas", nargs="+", help="Diretórios, arquivos ou padrões glob de imagens")
+    parser.add_argument("--saida", default="csv_grade", help="Pasta dos CSVs")
+    args = parser.parse_args(argv)
+
+    for caminho_imagem in listar_imagens(args.entradas):
+        imagem = cv2.imread(caminho_imagem)
+        if imagem is None:
+            print(f"Erro ao carregar a imagem: {caminho_imagem}")
+            continue
+        coordenadas_pontos = filtrar_pontos(detectar_cantos_com_filtro(imagem), limiar_distancia=LIMIAR_FILTRO)
+        grade = reconstruir_grade(coordenadas_pontos)
+        salvar_grade(coordenadas_pontos, grade, caminho_imagem, args.saida)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
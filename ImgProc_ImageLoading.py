@@ -0,0 +1,171 @@
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+# Modos de leitura: a imagem colorida completa (caminho antigo), direto em tons de cinza ou em cinza já
+# reduzida pelo decodificador JPEG (1/2, 1/4 ou 1/8 de cada lado, sem decodificar a resolução inteira)
+FLAGS_LEITURA = {
+    ("cor", 1): cv2.IMREAD_COLOR,
+    ("cor", 2): cv2.IMREAD_REDUCED_COLOR_2,
+    ("cor", 4): cv2.IMREAD_REDUCED_COLOR_4,
+    ("cor", 8): cv2.IMREAD_REDUCED_COLOR_8,
+    ("cinza", 1): cv2.IMREAD_GRAYSCALE,
+    ("cinza", 2): cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    ("cinza", 4): cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    ("cinza", 8): cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
+REDUCOES = (1, 2, 4, 8)
+
+def flag_leitura(leitura="cor", reducao=1):
+    try:
+        return FLAGS_LEITURA[(leitura, reducao)]
+    except KeyError:
+        raise ValueError(f"Leitura inválida: {leitura} com redução {reducao} (use cor/cinza e 1, 2, 4 ou 8)")
+
+# Função para ler o arquivo inteiro em um buffer reaproveitável (cresce só quando um arquivo não cabe).
+# Retorna (bytes lidos, buffer); os bytes são uma visão do buffer e valem até a próxima leitura nele.
+def ler_bytes(caminho, buffer=None):
+    with open(caminho, "rb", buffering=0) as arquivo:
+        tamanho = os.fstat(arquivo.fileno()).st_size
+        if buffer is None or len(buffer) < tamanho:
+            buffer = np.empty(max(tamanho, 2 * len(buffer) if buffer is not None else tamanho), dtype=np.uint8)
+        lidos = arquivo.readinto(memoryview(buffer)[:tamanho])
+    return buffer[:lidos], buffer
+
+# Função para decodificar os bytes de uma imagem no modo pedido (None se não for uma imagem válida)
+def decodificar(dados, leitura="cor", reducao=1):
+    if dados is None or len(dados) == 0:
+        return None
+    return cv2.imdecode(dados, flag_leitura(leitura, reducao))
+
+# Função para carregar uma imagem do disco no modo pedido; equivale a cv2.imread quando leitura="cor"
+def carregar_imagem(caminho, leitura="cor", reducao=1):
+    try:
+        dados, _ = ler_bytes(caminho)
+    except OSError:
+        return None
+    return decodificar(dados, leitura, reducao)
+
+# Função para levar coordenadas detectadas na imagem reduzida de volta à resolução original
+# (o centro do pixel reduzido cai no centro do bloco de 'reducao' x 'reducao' pixels originais).
+# Pontos sub-pixel (array float) continuam em float32; os inteiros são arredondados para o pixel mais próximo.
+def ampliar_coordenadas(coordenadas_pontos, reducao):
+    if reducao == 1:
+        return coordenadas_pontos
+    pontos = np.asarray(coordenadas_pontos, dtype=np.float64).reshape(-1, 2) * reducao + (reducao - 1) / 2
+    if isinstance(coordenadas_pontos, np.ndarray):
+        if coordenadas_pontos.dtype.kind == "f":
+            return pontos.astype(np.float32)
+        return np.round(pontos).astype(np.int32)
+    return [(int(x), int(y)) for x, y in np.round(pontos)]
+
+# Leitura antecipada: uma thread lê os bytes das próximas imagens enquanto a atual é decodificada e processada.
+# Os bytes ficam em um conjunto fixo de buffers reaproveitados, então a memória não cresce com o lote.
+# Cada iteração devolve (caminho, bytes); os bytes valem até a iteração seguinte.
+class LeitorAntecipado:
+    def __init__(self, caminhos, profundidade=2):
+        self.caminhos = list(caminhos)
+        self.prontos = queue.Queue(maxsize=profundidade)
+        self.livres = queue.Queue()
+        for _ in range(profundidade + 1):
+            self.livres.put(None)
+        self.parar = threading.Event()
+        self.thread = threading.Thread(target=self._ler, name="leitura-antecipada", daemon=True)
+        self._em_uso = None
+
+    def _ler(self):
+        for caminho in self.caminhos:
+            buffer = self.livres.get()
+            if self.parar.is_set():
+                return
+            try:
+                dados, buffer = ler_bytes(caminho, buffer)
+            except OSError:
+                dados = None
+            self.prontos.put((caminho, dados, buffer))
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *excecao):
+        self.parar.set()
+        self.livres.put(None)
+        # Libera a thread caso esteja bloqueada esperando espaço na fila
+        while self.thread.is_alive():
+            try:
+                self.prontos.get(timeout=0.05)
+            except queue.Empty:
+                pass
+        return False
+
+    def __iter__(self):
+        for _ in self.caminhos:
+            if self._em_uso is not None:
+                self.livres.put(self._em_uso)
+            caminho, dados, self._em_uso = self.prontos.get()
+            yield caminho, dados
+
+# Função para comparar o caminho antigo (imread colorido + cvtColor) com as leituras diretas
+def comparar_leituras(caminhos, repeticoes=3):
+    import tracemalloc
+
+    variantes = {
+        "imread + cvtColor": lambda c: cv2.cvtColor(cv2.imread(c), cv2.COLOR_BGR2GRAY),
+        "imread cinza": lambda c: cv2.imread(c, cv2.IMREAD_GRAYSCALE),
+    }
+    estado = {"buffer": None}
+
+    def ler_reaproveitando(caminho, reducao):
+        dados, estado["buffer"] = ler_bytes(caminho, estado["buffer"])
+        return decodificar(dados, "cinza", reducao)
+
+    for reducao in REDUCOES:
+        variantes[f"buffer cinza 1/{reducao}"] = lambda c, r=reducao: ler_reaproveitando(c, r)
+
+    resultados = []
+    for nome, funcao in variantes.items():
+        tempos, picos = [], []
+        for caminho in caminhos:
+            funcao(caminho)
+            inicio = time.perf_counter()
+            for _ in range(repeticoes):
+                funcao(caminho)
+            tempos.append((time.perf_counter() - inicio) / repeticoes)
+            tracemalloc.start()
+            funcao(caminho)
+            picos.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        resultados.append({"variante": nome, "tempo_medio_ms": 1000 * float(np.mean(tempos)),
+                           "pico_max_mb": max(picos) / 1024 ** 2})
+    return resultados
+
+def main(argv=None):
+    from ImgProc_BatchProcessing import listar_imagens
+
+    parser = argparse.ArgumentParser(description="Compara o tempo e a memória da decodificação das imagens.")
+    parser.add_argument("entradas", nargs="+", help="Diretórios, arquivos ou padrões glob de imagens")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    caminhos = listar_imagens(args.entradas)
+    if not caminhos:
+        print("Nenhuma imagem encontrada.")
+        return 1
+    cv2.setNumThreads(1)
+    resultados = comparar_leituras(caminhos, args.repeticoes)
+    referencia = resultados[0]["tempo_medio_ms"]
+    print(f"{len(caminhos)} imagens\n{'Variante':22} {'Tempo (ms)':>10} {'Pico (MB)':>10} {'Aceleração':>10}")
+    for r in resultados:
+        print(f"{r['variante']:22} {r['tempo_medio_ms']:10.1f} {r['pico_max_mb']:10.1f} "
+              f"{referencia / r['tempo_medio_ms']:9.2f}x")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+import cProfile
+import io
+import json
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+MB = 1024 ** 2
+
+# Instrumentação ativa em cada thread (sem ela as etapas não são medidas). Threads auxiliares, como as das
+# regiões de interesse, ativam a sua própria instrumentação e não disputam a pilha de etapas da thread principal.
+_LOCAL = threading.local()
+
+def _ativa():
+    return getattr(_LOCAL, "ativa", None)
+
+# Função para obter o pico de memória residente do processo, em MB (None se indisponível)
+def rss_maximo_mb():
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB; macOS, em bytes
+    return pico / MB if sys.platform == "darwin" else pico / 1024
+
+# Registro das etapas do pipeline: tempo de parede, tempo de CPU, pico de memória e contagens.
+# Etapas podem ser aninhadas; "tempo_proprio_s" desconta o tempo das etapas internas.
+# O pico de memória vem do tracemalloc e só é medido quando ele está ativo (--tracemalloc).
+class Instrumentacao:
+    def __init__(self, contexto=None):
+        self.contexto = dict(contexto or {})
+        self.registros = []
+        self._pilha = []
+
+    @contextmanager
+    def etapa(self, nome, **contagens):
+        registro = {**self.contexto, "etapa": nome, **contagens}
+        rastreando = tracemalloc.is_tracing()
+        if rastreando:
+            atual, pico = tracemalloc.get_traced_memory()
+            if self._pilha:
+                self._pilha[-1]["_pico"] = max(self._pilha[-1]["_pico"], pico)
+            tracemalloc.reset_peak()
+            registro["_memoria_inicial"] = registro["_pico"] = atual
+        registro["_filhos"] = 0.0
+        self._pilha.append(registro)
+        inicio, inicio_cpu = time.perf_counter(), time.process_time()
+        try:
+            yield registro
+        finally:
+            tempo = time.perf_counter() - inicio
+            registro["tempo_s"] = tempo
+            registro["tempo_proprio_s"] = tempo - registro.pop("_filhos")
+            registro["cpu_s"] = time.process_time() - inicio_cpu
+            self._pilha.pop()
+            if self._pilha:
+                self._pilha[-1]["_filhos"] += tempo
+            if rastreando and tracemalloc.is_tracing():
+                pico = max(tracemalloc.get_traced_memory()[1], registro.pop("_pico"))
+                registro["memoria_pico_mb"] = (pico - registro.pop("_memoria_inicial")) / MB
+                if self._pilha:
+                    self._pilha[-1]["_pico"] = max(self._pilha[-1]["_pico"], pico)
+            else:
+                registro.pop("_pico", None)
+                registro.pop("_memoria_inicial", None)
+                registro["memoria_pico_mb"] = None
+            registro["rss_max_mb"] = rss_maximo_mb()
+            self.registros.append(registro)
+
+    # Mede o consumo de um gerador de blocos de distâncias (o cálculo só acontece quando os
+    # blocos são lidos, normalmente dentro da serialização); o registro é emitido ao final
+    def blocos(self, nome, blocos):
+        tempo = tempo_cpu = 0.0
+        pares = 0
+        iterador = iter(blocos)
+        while True:
+            inicio, inicio_cpu = time.perf_counter(), time.process_time()
+            try:
+                bloco = next(iterador)
+            except StopIteration:
+                break
+            finally:
+                decorrido = time.perf_counter() - inicio
+                tempo += decorrido
+                tempo_cpu += time.process_time() - inicio_cpu
+                if self._pilha:
+                    self._pilha[-1]["_filhos"] += decorrido
+            pares += len(bloco[0])
+            yield bloco
+        self.registros.append({**self.contexto, "etapa": nome, "pares": pares, "tempo_s": tempo,
+                               "tempo_proprio_s": tempo, "cpu_s": tempo_cpu, "memoria_pico_mb": None,
+                               "rss_max_mb": rss_maximo_mb()})
+
+# Função para ativar uma instrumentação na thread atual durante um bloco "with"
+@contextmanager
+def instrumentar(instrumentacao):
+    anterior, _LOCAL.ativa = _ativa(), instrumentacao
+    try:
+        yield instrumentacao
+    finally:
+        _LOCAL.ativa = anterior
+
+# Função usada pelos módulos do pipeline para medir uma etapa; sem instrumentação ativa
+# apenas devolve um registro descartável
+@contextmanager
+def etapa(nome, **contagens):
+    ativa = _ativa()
+    if ativa is None:
+        yield {}
+        return
+    with ativa.etapa(nome, **contagens) as registro:
+        yield registro
+
+# Função para medir o cálculo de distâncias feito sob demanda pelo gerador de blocos
+def medir_blocos(nome, blocos):
+    ativa = _ativa()
+    if ativa is None:
+        return blocos
+    return ativa.blocos(nome, blocos)
+
+# Função para acrescentar registros a um arquivo JSON lines
+def salvar_jsonl(registros, caminho):
+    with open(caminho, "a", encoding="utf-8") as arquivo:
+        for registro in registros:
+            arquivo.write(json.dumps(registro, ensure_ascii=False, default=str) + "\n")
+
+# Função para agregar os registros por etapa (na ordem em que cada etapa apareceu)
+def resumir(registros):
+    resumo = {}
+    for registro in registros:
+        total = resumo.setdefault(registro["etapa"], {"etapa": registro["etapa"], "chamadas": 0, "tempo_s": 0.0,
+                                                      "tempo_proprio_s": 0.0, "cpu_s": 0.0,
+                                                      "memoria_pico_mb": None, "pontos": 0, "pares": 0})
+        total["chamadas"] += 1
+        for campo in ("tempo_s", "tempo_proprio_s", "cpu_s"):
+            total[campo] += registro[campo]
+        for campo in ("pontos", "pares"):
+            total[campo] += registro.get(campo) or 0
+        if registro.get("memoria_pico_mb") is not None:
+            total["memoria_pico_mb"] = max(total["memoria_pico_mb"] or 0.0, registro["memoria_pico_mb"])
+    return list(resumo.values())
+
+# Função para exibir o resumo por etapa em forma de tabela
+def exibir_resumo(registros):
+    print(f"\n{'Etapa':24} {'Chamadas':>8} {'Tempo (s)':>10} {'Próprio (s)':>11} {'CPU (s)':>9} "
+          f"{'Pico (MB)':>9} {'Pontos':>9} {'Pares':>11}")
+    for total in resumir(registros):
+        pico = "-" if total["memoria_pico_mb"] is None else f"{total['memoria_pico_mb']:.1f}"
+        print(f"{total['etapa'][:24]:24} {total['chamadas']:8d} {total['tempo_s']:10.3f} "
+              f"{total['tempo_proprio_s']:11.3f} {total['cpu_s']:9.3f} {pico:>9} "
+              f"{total['pontos'] or '-':>9} {total['pares'] or '-':>11}")
+
+# Função para perfilar um bloco com cProfile: grava as estatísticas em 'caminho' (se informado)
+# e exibe as funções com maior tempo acumulado
+@contextmanager
+def perfil(caminho=None, linhas=20):
+    perfilador = cProfile.Profile()
+    perfilador.enable()
+    try:
+        yield perfilador
+    finally:
+        perfilador.disable()
+        if caminho:
+            perfilador.dump_stats(caminho)
+            print(f"Perfil salvo em '{caminho}'")
+        texto = io.StringIO()
+        pstats.Stats(perfilador, stream=texto).sort_stats("cumulative").print_stats(linhas)
+        print(texto.getvalue())
+
+# Função para registrar no parser os parâmetros de instrumentação comuns aos scripts
+def adicionar_argumentos(parser):
+    parser.add_argument("--metricas", help="Arquivo JSON lines com as métricas de cada etapa")
+    parser.add_argument("--resumo-etapas", action="store_true", help="Exibe a tabela de tempos por etapa")
+    parser.add_argument("--perfil", nargs="?", const="", default=None,
+                        help="Executa sob o cProfile (opcionalmente gravando as estatísticas no arquivo)")
+    parser.add_argument("--tracemalloc", action="store_true", help="Mede o pico de memória de cada etapa")
+
+# Função para executar um bloco com a instrumentação pedida na linha de comando
+# (--metricas, --resumo-etapas, --perfil, --tracemalloc); sem esses parâmetros nada é medido
+@contextmanager
+def sessao(args, contexto=None):
+    # --tracemalloc sozinho exibe a tabela de etapas
+    exibir = args.resumo_etapas or (args.tracemalloc and not args.metricas)
+    medir = bool(args.metricas or exibir)
+    iniciou_tracemalloc = args.tracemalloc and not tracemalloc.is_tracing()
+    if iniciou_tracemalloc:
+        tracemalloc.start()
+    instrumentacao = Instrumentacao(contexto)
+    try:
+        with perfil(args.perfil or None) if args.perfil is not None else nullcontext():
+            with instrumentar(instrumentacao) if medir else nullcontext():
+                yield instrumentacao
+    finally:
+        if iniciou_tracemalloc:
+            tracemalloc.stop()
+        if args.metricas:
+            salvar_jsonl(instrumentacao.registros, args.metricas)
+            print(f"Métricas salvas em '{args.metricas}'")
+        if exibir:
+            exibir_resumo(instrumentacao.registros)
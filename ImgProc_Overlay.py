@@ -0,0 +1,109 @@
+import argparse
+import os
+import sys
+
+import cv2
+import numpy as np
+
+COR_PONTOS = (0, 255, 0)     # Verde (BGR), como o 'gx' das figuras do matplotlib
+COR_ARESTAS = (255, 128, 0)  # Azul
+COR_IDS = (0, 0, 255)        # Vermelho
+
+# Função para escolher tamanho e espessura dos marcadores proporcionais à imagem
+def _escala(imagem):
+    lado = min(imagem.shape[:2])
+    return max(3, round(lado / 250)), max(1, round(lado / 1000))
+
+# Função para copiar a imagem em um buffer BGR pré-alocado, onde tudo é desenhado
+def _buffer_bgr(imagem, buffer=None):
+    if buffer is None or buffer.shape[:2] != imagem.shape[:2]:
+        buffer = np.empty((*imagem.shape[:2], 3), dtype=np.uint8)
+    if imagem.ndim == 2:
+        cv2.cvtColor(imagem, cv2.COLOR_GRAY2BGR, dst=buffer)
+    else:
+        np.copyto(buffer, imagem[..., :3])
+    return buffer
+
+# Função para desenhar pontos (marcadores "x"), IDs opcionais e arestas opcionais.
+# Todos os marcadores e todas as arestas são enviados ao OpenCV em uma única chamada cada.
+# 'arestas' são pares de índices (a partir de 0); 'buffer' permite reaproveitar a memória entre imagens.
+def desenhar_sobreposicao(imagem, coordenadas_pontos, arestas=None, ids=False, tamanho=None, espessura=None,
+                          buffer=None):
+    saida = _buffer_bgr(imagem, buffer)
+    pontos = np.asarray(coordenadas_pontos, dtype=np.float64).reshape(-1, 2)
+    tamanho_padrao, espessura_padrao = _escala(saida)
+    tamanho = tamanho or tamanho_padrao
+    espessura = espessura or espessura_padrao
+
+    if arestas is not None and len(arestas):
+        arestas = np.asarray(arestas, dtype=np.intp).reshape(-1, 2)
+        segmentos = np.round(pontos[arestas]).astype(np.int32)
+        cv2.polylines(saida, segmentos, False, COR_ARESTAS, espessura, cv2.LINE_AA)
+
+    if len(pontos):
+        # Cada "x" são dois segmentos diagonais centrados no ponto
+        deslocamentos = np.array([[[-1, -1], [1, 1]], [[-1, 1], [1, -1]]]) * tamanho
+        segmentos = np.round(pontos[:, None, None, :] + deslocamentos).astype(np.int32).reshape(-1, 2, 2)
+        cv2.polylines(saida, segmentos, False, COR_PONTOS, espessura, cv2.LINE_AA)
+
+    if ids:
+        escala_fonte = espessura * 0.4
+        for numero, (x, y) in enumerate(np.round(pontos).astype(int), start=1):
+            cv2.putText(saida, str(numero), (x + tamanho, y - tamanho), cv2.FONT_HERSHEY_SIMPLEX, escala_fonte,
+                        COR_IDS, espessura, cv2.LINE_AA)
+    return saida
+
+# Função para gravar a sobreposição em PNG/JPEG (o formato segue a extensão do arquivo)
+def salvar_sobreposicao(caminho_saida, imagem, coordenadas_pontos, arestas=None, ids=False):
+    pasta = os.path.dirname(caminho_saida)
+    if pasta:
+        os.makedirs(pasta, exist_ok=True)
+    if not cv2.imwrite(caminho_saida, desenhar_sobreposicao(imagem, coordenadas_pontos, arestas, ids)):
+        raise ValueError(f"Não foi possível gravar a sobreposição em '{caminho_saida}'.")
+    return caminho_saida
+
+# Função para montar o nome da figura de uma imagem (Figure_<nome>.png, como as figuras existentes)
+def caminho_figura(caminho_imagem, pasta_saida="sobreposicoes", extensao=".png"):
+    nome_arquivo = os.path.splitext(os.path.basename(caminho_imagem))[0]
+    return os.path.join(pasta_saida, f"Figure_{nome_arquivo}{extensao}")
+
+# Visualizador interativo (opcional): exibe a sobreposição já desenhada como uma única imagem
+def exibir_sobreposicao(sobreposicao, titulo="Pontos Detectados"):
+    import matplotlib.pyplot as plt
+
+    plt.imshow(cv2.cvtColor(sobreposicao, cv2.COLOR_BGR2RGB))
+    plt.title(titulo)
+    plt.show()
+
+def main(argv=None):
+    from ImgProc_BatchProcessing import listar_imagens
+    from ImgProc_StructuralMonitoring import detectar_cantos_com_filtro, filtrar_pontos
+
+    parser = argparse.ArgumentParser(description="Grava as imagens com os pontos detectados (sem interface gráfica).")
+    parser.add_argument("entradas", nargs="+", help="Diretórios, arquivos ou padrões glob de imagens")
+    parser.add_argument("--saida", default="sobreposicoes", help="Pasta das figuras")
+    parser.add_argument("--ids", action="store_true", help="Escreve o número de cada ponto")
+    parser.add_argument("--grade", action="store_true", help="Desenha as arestas da grade reconstruída")
+    parser.add_argument("--extensao", choices=(".png", ".jpg"), default=".png")
+    parser.add_argument("--exibir", action="store_true", help="Abre cada figura no matplotlib")
+    args = parser.parse_args(argv)
+
+    for caminho_imagem in listar_imagens(args.entradas):
+        imagem = cv2.imread(caminho_imagem)
+        if imagem is None:
+            print(f"Erro ao carregar a imagem: {caminho_imagem}")
+            continue
+        coordenadas_pontos = filtrar_pontos(detectar_cantos_com_filtro(imagem), limiar_distancia=20)
+        arestas = None
+        if args.grade:
+            from ImgProc_GridTopology import reconstruir_grade
+            arestas = reconstruir_grade(coordenadas_pontos)["arestas"]
+        caminho_saida = salvar_sobreposicao(caminho_figura(caminho_imagem, args.saida, args.extensao), imagem,
+                                            coordenadas_pontos, arestas, args.ids)
+        print(f"Sobreposição salva em '{caminho_saida}' ({len(coordenadas_pontos)} pontos)")
+        if args.exibir:
+            exibir_sobreposicao(cv2.imread(caminho_saida), f"Pontos Detectados ({len(coordenadas_pontos)})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
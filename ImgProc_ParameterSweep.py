@@ -0,0 +1,151 @@
+import argparse
+import itertools
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from ImgProc_BatchProcessing import inicializar_worker, listar_imagens
+
+# Os nomes das imagens de teste indicam a quantidade de nós esperada (ex.: 289_nos, 1089_pontos)
+PADRAO_CONTAGEM = re.compile(r"^(\d+)_(nos|pontos)(?=$|[\s_.(])", re.IGNORECASE)
+
+# Função para extrair a contagem esperada do nome do arquivo (None se o nome não indicar)
+def contagem_esperada(caminho_imagem):
+    correspondencia = PADRAO_CONTAGEM.match(os.path.basename(caminho_imagem))
+    return int(correspondencia.group(1)) if correspondencia else None
+
+# Configurações pontuadas: as mesmas que o lote executa (ImgProc_BatchProcessing), variando só os parâmetros
+# da varredura. Com a imagem decodificada reduzida, a distância mínima acompanha a redução, como no lote.
+def _configuracao_cantos(alpha, beta, qualityLevel=0.05, minDistance=15, reducao=1):
+    from ImgProc_DistanceCalculation import configuracao_deteccao
+    return configuracao_deteccao(qualityLevel=qualityLevel, minDistance=max(1, minDistance // reducao),
+                                 alpha=alpha, beta=beta)
+
+def _configuracao_filtro(alpha, beta, qualityLevel=0.1, minDistance=20, reducao=1):
+    from ImgProc_StructuralMonitoring import configuracao_deteccao
+    return configuracao_deteccao(qualityLevel=qualityLevel, minDistance=max(1, minDistance // reducao),
+                                 alpha=alpha, beta=beta)
+
+# Pós-processamento do lote depois da detecção: o pipeline "monitoramento" ainda filtra os pontos próximos,
+# já nas coordenadas da resolução original
+def _filtrar_como_lote(pontos, reducao=1):
+    from ImgProc_ImageLoading import ampliar_coordenadas
+    from ImgProc_StructuralMonitoring import LIMIAR_FILTRO, filtrar_pontos
+    return filtrar_pontos(ampliar_coordenadas(pontos, reducao), limiar_distancia=LIMIAR_FILTRO)
+
+# Detectores avaliados: "cantos" (pipeline "distancias" do lote, sem pós-processamento)
+# e "filtro" (pipeline "monitoramento")
+DETECTORES = {
+    "cantos": (_configuracao_cantos, None),
+    "filtro": (_configuracao_filtro, _filtrar_como_lote),
+}
+
+# Função executada em cada worker: avalia toda a grade de parâmetros em uma imagem, decodificada como no lote,
+# fazendo o pré-processamento (que só depende de alpha e beta) uma única vez para cada combinação (alpha, beta)
+def avaliar_imagem(caminho_imagem, detector, grade, reducao=1):
+    from ImgProc_ImageLoading import carregar_imagem
+    from ImgProc_Pipeline import localizar, preparar
+
+    imagem_cinza = carregar_imagem(caminho_imagem, "cinza", reducao)
+    if imagem_cinza is None:
+        return []
+    configurar, pos_processar = DETECTORES[detector]
+
+    resultados = []
+    for (alpha, beta), combinacoes in itertools.groupby(grade, key=lambda p: (p["alpha"], p["beta"])):
+        inicio = time.perf_counter()
+        preparada, mascara = preparar(imagem_cinza, configurar(alpha, beta, reducao=reducao))
+        tempo_preparo = time.perf_counter() - inicio
+
+        for parametros in combinacoes:
+            inicio = time.perf_counter()
+            configuracao = configurar(reducao=reducao, **parametros)
+            pontos = localizar(preparada, mascara, configuracao, imagem_cinza)
+            if pos_processar is not None:
+                pontos = pos_processar(pontos, reducao)
+            quantidade = len(pontos)
+            tempo_deteccao = time.perf_counter() - inicio
+            resultados.append({"imagem": caminho_imagem, **parametros, "pontos": quantidade,
+                               "tempo_preparo": tempo_preparo, "tempo_deteccao": tempo_deteccao})
+    return resultados
+
+# Função para montar a grade de parâmetros, agrupada por (alpha, beta)
+def montar_grade(qualidades, distancias, alphas, betas):
+    return [{"alpha": a, "beta": b, "qualityLevel": q, "minDistance": d}
+            for a, b, q, d in itertools.product(alphas, betas, qualidades, distancias)]
+
+# Função para pontuar cada combinação: acurácia = 1 - erro relativo médio da contagem (mínimo 0),
+# tempo = preparo + detecção médios por imagem
+def pontuar(resultados):
+    df = pd.DataFrame(resultados)
+    df["esperado"] = df["imagem"].map(contagem_esperada)
+    df = df.dropna(subset=["esperado"])
+    if df.empty:
+        return df
+    df["erro_relativo"] = (df["pontos"] - df["esperado"]).abs() / df["esperado"]
+    df["acerto"] = (1.0 - df["erro_relativo"]).clip(lower=0.0)
+    df["tempo"] = df["tempo_preparo"] + df["tempo_deteccao"]
+    colunas = ["alpha", "beta", "qualityLevel", "minDistance"]
+    resumo = df.groupby(colunas).agg(acuracia=("acerto", "mean"), erro_maximo=("erro_relativo", "max"),
+                                     tempo_medio=("tempo", "mean"), imagens=("imagem", "count"))
+    return resumo.reset_index().sort_values(["acuracia", "tempo_medio"], ascending=[False, True])
+
+# Função para escolher a combinação mais rápida que atinge a acurácia alvo
+def escolher_parametros(resumo, acuracia_alvo):
+    aprovados = resumo[resumo["acuracia"] >= acuracia_alvo]
+    if aprovados.empty:
+        return None
+    return aprovados.sort_values("tempo_medio").iloc[0]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Varredura paralela de parâmetros do detector.")
+    parser.add_argument("entradas", nargs="+", help="Imagens cujo nome indica a contagem (ex.: images/289_nos.jpg)")
+    parser.add_argument("--detector", choices=sorted(DETECTORES), default="cantos")
+    parser.add_argument("--qualityLevel", type=float, nargs="+", default=[0.001, 0.01, 0.05, 0.1])
+    parser.add_argument("--minDistance", type=float, nargs="+", default=[10, 15, 20])
+    parser.add_argument("--alpha", type=float, nargs="+", default=[1.2, 1.5])
+    parser.add_argument("--beta", type=float, nargs="+", default=[20, 30])
+    parser.add_argument("--acuracia-alvo", type=float, default=0.95,
+                        help="Acurácia mínima (1 - erro relativo médio da contagem)")
+    parser.add_argument("--reducao", type=int, choices=(1, 2, 4, 8), default=1,
+                        help="Decodifica as imagens reduzidas, como o --reducao do lote")
+    parser.add_argument("--processos", type=int, default=None)
+    parser.add_argument("--saida", default="varredura_parametros.csv", help="CSV com o resumo de todas as combinações")
+    args = parser.parse_args(argv)
+
+    caminhos = [c for c in listar_imagens(args.entradas) if contagem_esperada(c) is not None]
+    if not caminhos:
+        print("Nenhuma imagem com contagem esperada no nome (ex.: 289_nos.jpg).")
+        return 1
+    grade = montar_grade(args.qualityLevel, args.minDistance, args.alpha, args.beta)
+    print(f"{len(caminhos)} imagens x {len(grade)} combinações")
+
+    inicio = time.perf_counter()
+    resultados = []
+    with ProcessPoolExecutor(max_workers=args.processos, initializer=inicializar_worker) as executor:
+        for parcial in executor.map(avaliar_imagem, caminhos, itertools.repeat(args.detector),
+                                    itertools.repeat(grade), itertools.repeat(args.reducao)):
+            resultados.extend(parcial)
+    print(f"Varredura concluída em {time.perf_counter() - inicio:.2f} s")
+
+    resumo = pontuar(resultados)
+    resumo.to_csv(args.saida, index=False)
+    print(f"Resumo salvo em '{args.saida}'")
+    print(resumo.head(10).to_string(index=False))
+
+    escolhido = escolher_parametros(resumo, args.acuracia_alvo)
+    if escolhido is None:
+        print(f"\nNenhuma combinação atingiu a acurácia alvo de {args.acuracia_alvo:.2f}.")
+        return 2
+    print(f"\nCombinação mais rápida com acurácia >= {args.acuracia_alvo:.2f}: "
+          f"alpha={escolhido['alpha']}, beta={escolhido['beta']}, qualityLevel={escolhido['qualityLevel']}, "
+          f"minDistance={escolhido['minDistance']} (acurácia {escolhido['acuracia']:.3f}, "
+          f"{escolhido['tempo_medio'] * 1000:.1f} ms/imagem)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,417 @@
+import argparse
+import json
+import os
+import sys
+
+import cv2
+import numpy as np
+
+from ImgProc_Calibration import TABELA_PRETO, aplicar_tabela
+from ImgProc_Instrumentation import etapa
+
+# Pipelines de detecção declarativos: uma configuração é uma lista de etapas {"etapa": nome, **parâmetros},
+# executadas em ordem. As etapas de imagem transformam a imagem em tons de cinza (a etapa "mascara" guarda
+# uma máscara da imagem atual para o detector); as etapas de pontos trabalham sobre o array N x 2 de pontos.
+# Os scripts (ImgProc_PointDetection*.py, ImgProc_DistanceCalculation.py, ImgProc_StructuralMonitoring.py)
+# são presets destas configurações e compartilham a mesma implementação de cada etapa.
+
+# Função para converter a imagem para tons de cinza apenas quando necessário
+def converter_cinza(imagem):
+    return cv2.cvtColor(imagem, cv2.COLOR_BGR2GRAY) if imagem.ndim == 3 else imagem
+
+# Função para ajustar contraste e brilho
+def ajustar_contraste_brilho(imagem, alpha=1.5, beta=30):
+    return cv2.convertScaleAbs(imagem, alpha=alpha, beta=beta)
+
+# Função para aplicar uma tabela de 256 níveis: a informada ou a de detecção de um perfil de calibração
+def aplicar_tabela_calibracao(imagem_cinza, tabela=None, perfil=None):
+    if tabela is None:
+        from ImgProc_Calibration import carregar_perfil
+        tabela = carregar_perfil(perfil)["tabela_deteccao"]
+    return aplicar_tabela(imagem_cinza, tabela)
+
+# Função para suavizar a imagem (entrada do detector)
+def suavizar(imagem, ksize=5):
+    return cv2.GaussianBlur(imagem, (ksize, ksize), 0)
+
+# Função para detectar bordas
+def detectar_bordas(imagem, threshold1=50, threshold2=150):
+    return cv2.Canny(imagem, threshold1=threshold1, threshold2=threshold2)
+
+# Função para dilatar a imagem atual (bordas) e usá-la como máscara do detector
+def dilatar(imagem, iteracoes=2):
+    return cv2.dilate(imagem, None, iterations=iteracoes)
+
+# Converter cinza para preto (aceita a imagem colorida ou já em tons de cinza, sem alterá-la)
+# O limiar é uma tabela de 256 níveis aplicada em uma única passada; um perfil de calibração fornece a sua
+def converter_cinza_para_preto(imagem, tabela=TABELA_PRETO):
+    return aplicar_tabela(converter_cinza(imagem), tabela)  # Cinza acima de 180 vira preto diretamente
+
+# Função para localizar os cantos com goodFeaturesToTrack (retorna array N x 2 em float32).
+# maxCorners = 0: sem limite de pontos
+def localizar_cantos(imagem, mascara=None, maxCorners=0, qualityLevel=0.05, minDistance=15):
+    pontos = cv2.goodFeaturesToTrack(imagem, maxCorners=maxCorners, qualityLevel=qualityLevel,
+                                     minDistance=minDistance, mask=mascara)
+    if pontos is None:
+        return np.empty((0, 2), dtype=np.float32)
+    return pontos.reshape(-1, 2)
+
+# Critério de parada do refinamento sub-pixel por cantos
+CRITERIO_SUBPIXEL = (cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 40, 0.01)
+
+# Função para truncar as coordenadas para pixels inteiros (como os scripts originais)
+def truncar(pontos):
+    return pontos.astype(np.int32)
+
+# Meia janela padrão do refino sub-pixel por cantos (cornerSubPix), em pixels da imagem refinada
+MEIA_JANELA_CANTOS = 5
+
+# Deslocamento máximo (em pixels) de um ponto no refino por cantos: além dele o refino é descartado e o ponto
+# fica na posição detectada
+DESLOCAMENTO_MAXIMO_CANTOS = 1.0
+
+# Função para medir o espaçamento típico dos pontos: a mediana da distância ao vizinho mais próximo
+# (None com menos de dois pontos)
+def espacamento_tipico(pontos):
+    if len(pontos) < 2:
+        return None
+    from scipy.spatial import cKDTree
+    distancias, _ = cKDTree(pontos).query(pontos, k=2)
+    return float(np.median(distancias[:, 1]))
+
+# Função para derivar a meia janela do centroide do espaçamento típico dos pontos, medido na própria imagem
+# refinada: numa imagem decodificada reduzida a janela encolhe junto.
+# Um quinto do espaçamento alcança a marcação a partir de um canto próximo dela sem chegar às vizinhas.
+def meia_janela_pelo_espacamento(pontos, padrao=MEIA_JANELA_CANTOS):
+    espacamento = espacamento_tipico(pontos)
+    if espacamento is None:
+        return padrao
+    return max(3, int(round(espacamento / 5)))
+
+# Função para limitar a meia janela de cornerSubPix: a janela inteira (2 * meia_janela + 1 pixels) fica abaixo da
+# metade do espaçamento típico dos pontos, para que um ponto não seja atraído pelo canto vizinho
+def limitar_meia_janela_cantos(pontos, meia_janela):
+    espacamento = espacamento_tipico(pontos)
+    if espacamento is None:
+        return meia_janela
+    return max(1, min(meia_janela, int((espacamento / 2 - 1) / 2)))
+
+# Centroide ponderado pela intensidade, de todos os pontos de uma vez: cada ponto vai para o centro de massa
+# da marcação escura na janela de (2 * meia_janela + 1)² pixels ao seu redor. Só contam os pixels mais escuros
+# que o meio-termo entre o fundo da janela (a mediana) e o nível mais escuro, com peso proporcional à diferença:
+# o ruído do fundo não puxa o ponto para o centro da janela. Sem meia_janela, ela vem do espaçamento dos pontos.
+# A janela é recentrada a cada iteração, então um ponto detectado na borda da marcação converge para o centro.
+def centroides_ponderados(imagem_cinza, pontos, meia_janela=None, iteracoes=3):
+    altura, largura = imagem_cinza.shape
+    refinados = np.array(pontos, dtype=np.float32).reshape(-1, 2)
+    if meia_janela is None:
+        meia_janela = meia_janela_pelo_espacamento(refinados)
+    deslocamentos = np.arange(-meia_janela, meia_janela + 1)
+    for _ in range(iteracoes):
+        centros = np.rint(refinados).astype(np.intp)
+        xs = np.clip(centros[:, 0, None] + deslocamentos, 0, largura - 1)
+        ys = np.clip(centros[:, 1, None] + deslocamentos, 0, altura - 1)
+        janelas = imagem_cinza[ys[:, :, None], xs[:, None, :]].astype(np.float32)  # N x lado x lado
+        fundo = np.median(janelas.reshape(len(janelas), -1), axis=1)[:, None, None]
+        limiar = (fundo + janelas.min(axis=(1, 2), keepdims=True)) / 2
+        pesos = np.clip(limiar - janelas, 0, None)
+        total = pesos.sum(axis=(1, 2))
+        # Janela uniforme (sem marcação): o ponto fica onde estava
+        validos = total > 0
+        somas = np.column_stack((np.einsum("nij,nj->n", pesos, xs.astype(np.float32)),
+                                 np.einsum("nij,ni->n", pesos, ys.astype(np.float32))))
+        refinados[validos] = somas[validos] / total[validos, None]
+    return refinados
+
+# Função para refinar os pontos com precisão sub-pixel sobre a imagem em tons de cinza, em uma única chamada
+# para todos os pontos: metodo="cantos" usa cv2.cornerSubPix (nós da grade, cantos) e metodo="centroide" o
+# centroide ponderado pela intensidade (marcações circulares). Sem meia_janela, os cantos usam MEIA_JANELA_CANTOS
+# e o centroide uma janela derivada do espaçamento dos pontos. Nos cantos a janela é limitada pelo espaçamento
+# (limitar_meia_janela_cantos) e um ponto levado a mais de deslocamento_maximo pixels da posição de entrada
+# volta para ela. Retorna array N x 2 em float32.
+def refinar_subpixel(imagem_cinza, pontos, meia_janela=None, metodo="cantos",
+                     deslocamento_maximo=DESLOCAMENTO_MAXIMO_CANTOS):
+    refinados = np.array(pontos, dtype=np.float32).reshape(-1, 2)
+    if len(refinados) == 0:
+        return refinados
+    if metodo == "centroide":
+        return centroides_ponderados(imagem_cinza, refinados, meia_janela)
+    if metodo != "cantos":
+        raise ValueError(f"Método de refinamento desconhecido: {metodo} (use cantos ou centroide)")
+    meia_janela = limitar_meia_janela_cantos(refinados, MEIA_JANELA_CANTOS if meia_janela is None else meia_janela)
+    sementes = refinados.copy()
+    cv2.cornerSubPix(imagem_cinza, refinados.reshape(-1, 1, 2), (meia_janela, meia_janela), (-1, -1),
+                     CRITERIO_SUBPIXEL)
+    afastados = np.hypot(*(refinados - sementes).T) > deslocamento_maximo
+    refinados[afastados] = sementes[afastados]
+    return refinados
+
+# Função para manter apenas pontos suficientemente distantes dos pontos já aceitos (ver ImgProc_Deduplication)
+def deduplicar(pontos, limiar=15, inclusivo=False):
+    from ImgProc_Deduplication import indices_pontos_distantes
+    return pontos[indices_pontos_distantes(pontos, limiar, inclusivo)]
+
+# Etapas disponíveis: tipo ("imagem", "mascara", "cantos", "refino" ou "pontos") e função.
+# As etapas de refino recebem a imagem em tons de cinza de entrada (não a preparada) e os pontos.
+ETAPAS = {
+    "equalizar": ("imagem", cv2.equalizeHist),
+    "contraste": ("imagem", ajustar_contraste_brilho),
+    "tabela": ("imagem", aplicar_tabela_calibracao),
+    "suavizar": ("imagem", suavizar),
+    "bordas": ("imagem", detectar_bordas),
+    "mascara": ("mascara", dilatar),
+    "cantos": ("cantos", localizar_cantos),
+    "subpixel": ("refino", refinar_subpixel),
+    "inteiros": ("pontos", truncar),
+    "dedup": ("pontos", deduplicar),
+}
+
+# Configurações dos scripts existentes
+PRESETS = {
+    "pointdetection": [
+        {"etapa": "contraste", "alpha": 1.5, "beta": 30},
+        {"etapa": "suavizar", "ksize": 5},
+        {"etapa": "cantos", "maxCorners": 0, "qualityLevel": 0.001, "minDistance": 10},
+        {"etapa": "inteiros"},
+    ],
+    "pointdetection2": [
+        {"etapa": "contraste", "alpha": 1.5, "beta": 30},
+        {"etapa": "suavizar", "ksize": 5},
+        {"etapa": "cantos", "maxCorners": 0, "qualityLevel": 0.05, "minDistance": 10},
+        {"etapa": "inteiros"},
+        {"etapa": "dedup", "limiar": 10},
+    ],
+    "distancias": [
+        {"etapa": "contraste", "alpha": 1.5, "beta": 30},
+        {"etapa": "suavizar", "ksize": 5},
+        {"etapa": "cantos", "maxCorners": 0, "qualityLevel": 0.05, "minDistance": 15},
+        {"etapa": "inteiros"},
+        {"etapa": "dedup", "limiar": 15},
+    ],
+    "monitoramento": [
+        {"etapa": "equalizar"},
+        {"etapa": "contraste", "alpha": 1.5, "beta": 30},
+        {"etapa": "suavizar", "ksize": 5},
+        {"etapa": "bordas", "threshold1": 50, "threshold2": 150},
+        {"etapa": "mascara", "iteracoes": 2},
+        {"etapa": "cantos", "maxCorners": 1000, "qualityLevel": 0.1, "minDistance": 20},
+        {"etapa": "inteiros"},
+    ],
+}
+PRESETS["pointdetection3"] = PRESETS["distancias"]
+
+# Função para obter uma configuração (nome de preset, caminho de JSON ou a própria lista de etapas),
+# validando os nomes das etapas
+def carregar_configuracao(configuracao):
+    if isinstance(configuracao, str):
+        if configuracao in PRESETS:
+            configuracao = PRESETS[configuracao]
+        elif configuracao.endswith(".json") and os.path.exists(configuracao):
+            with open(configuracao, encoding="utf-8") as arquivo:
+                configuracao = json.load(arquivo)
+        else:
+            raise ValueError(f"Pipeline desconhecido: {configuracao} (presets: {', '.join(sorted(PRESETS))})")
+    for item in configuracao:
+        if item.get("etapa") not in ETAPAS:
+            raise ValueError(f"Etapa desconhecida: {item.get('etapa')} (disponíveis: {', '.join(ETAPAS)})")
+    return list(configuracao)
+
+# Função para derivar uma configuração trocando parâmetros de etapas pelo nome,
+# ex.: ajustar_configuracao("distancias", cantos={"minDistance": 8}, contraste={"alpha": 2.0})
+def ajustar_configuracao(configuracao, **alteracoes):
+    configuracao = carregar_configuracao(configuracao)
+    desconhecidas = set(alteracoes) - {item["etapa"] for item in configuracao}
+    if desconhecidas:
+        raise ValueError(f"Etapas ausentes da configuração: {', '.join(sorted(desconhecidas))}")
+    return [{**item, **alteracoes.get(item["etapa"], {})} for item in configuracao]
+
+def _parametros(item):
+    return {chave: valor for chave, valor in item.items() if chave != "etapa"}
+
+# Parâmetros na chave do cache (tabelas entram pelo hash do conteúdo)
+def _parametros_chave(item):
+    from ImgProc_StageCache import hash_imagem
+    return {chave: hash_imagem(valor) if isinstance(valor, np.ndarray) else valor for chave, valor in item.items()}
+
+def _executar_preparo(imagem_cinza, etapas):
+    mascara = None
+    for item in etapas:
+        tipo, funcao = ETAPAS[item["etapa"]]
+        with etapa(item["etapa"]):
+            if tipo == "mascara":
+                mascara = funcao(imagem_cinza, **_parametros(item))
+            else:
+                imagem_cinza = funcao(imagem_cinza, **_parametros(item))
+    return imagem_cinza, mascara
+
+# Função para executar as etapas de imagem: retorna (imagem preparada, máscara ou None).
+# Com cache, o preparo inteiro vira uma única entrada (imagem e máscara empilhadas), chaveada pela imagem
+# de entrada e pelos parâmetros de todas as etapas.
+def preparar(imagem, configuracao, cache=None):
+    imagem_cinza = converter_cinza(imagem)
+    etapas = [item for item in carregar_configuracao(configuracao) if ETAPAS[item["etapa"]][0] in ("imagem", "mascara")]
+    if cache is None:
+        return _executar_preparo(imagem_cinza, etapas)
+
+    from ImgProc_StageCache import hash_imagem
+
+    def calcular():
+        preparada, mascara = _executar_preparo(imagem_cinza, etapas)
+        return np.stack((preparada, mascara)) if mascara is not None else preparada[None]
+
+    with etapa("preparo_cache"):
+        empilhadas, _ = cache.obter_ou_calcular("preparo", hash_imagem(imagem_cinza),
+                                                [_parametros_chave(item) for item in etapas], calcular)
+    return empilhadas[0], (empilhadas[1] if len(empilhadas) > 1 else None)
+
+# Função para executar as etapas de pontos sobre a imagem já preparada (retorna o array N x 2).
+# O refino sub-pixel usa 'imagem_cinza' (a imagem de entrada); sem ela, a própria imagem preparada.
+def localizar(preparada, mascara, configuracao, imagem_cinza=None):
+    pontos = np.empty((0, 2), dtype=np.float32)
+    for item in carregar_configuracao(configuracao):
+        tipo, funcao = ETAPAS[item["etapa"]]
+        if tipo == "cantos":
+            with etapa(item["etapa"]) as registro:
+                pontos = funcao(preparada, mascara, **_parametros(item))
+                registro["pontos"] = len(pontos)
+        elif tipo == "refino":
+            with etapa(item["etapa"], pontos=len(pontos)):
+                pontos = funcao(preparada if imagem_cinza is None else imagem_cinza, pontos, **_parametros(item))
+        elif tipo == "pontos":
+            with etapa(item["etapa"]) as registro:
+                pontos = funcao(pontos, **_parametros(item))
+                registro["pontos"] = len(pontos)
+    return pontos
+
+# Função para executar uma configuração completa sobre a imagem (colorida ou em tons de cinza)
+def executar(imagem, configuracao, cache=None):
+    configuracao = carregar_configuracao(configuracao)
+    imagem_cinza = converter_cinza(imagem)
+    preparada, mascara = preparar(imagem_cinza, configuracao, cache)
+    return localizar(preparada, mascara, configuracao, imagem_cinza)
+
+# Função para derivar a versão sub-pixel de uma configuração: o truncamento para pixels inteiros sai e o refino
+# entra logo após o detector, antes do filtro de pontos próximos (que passa a comparar as posições refinadas)
+def com_subpixel(configuracao, metodo="cantos", meia_janela=None):
+    refino = {"etapa": "subpixel", "metodo": metodo, "meia_janela": meia_janela}
+    resultado = []
+    for item in carregar_configuracao(configuracao):
+        if item["etapa"] in ("inteiros", "subpixel"):
+            continue
+        resultado.append(item)
+        if ETAPAS[item["etapa"]][0] == "cantos":
+            resultado.append(refino)
+    return resultado
+
+# Função para obter um conjunto de pontos como um único array N x 2 contíguo, sem cópia quando já estiver
+# no formato: int32 para coordenadas inteiras (as dos scripts originais) e float32 para as sub-pixel
+def como_pontos(coordenadas_pontos):
+    pontos = np.asarray(coordenadas_pontos)
+    tipo = np.int32 if pontos.dtype.kind in "iub" else np.float32
+    return np.ascontiguousarray(pontos, dtype=tipo).reshape(-1, 2)
+
+# Função para converter o array de pontos na lista de tuplas usada pelos scripts e pelos CSVs
+def para_lista(pontos):
+    return [tuple(p) for p in np.asarray(pontos).tolist()]
+
+# Coordenadas sub-pixel nos CSVs: milésimos de pixel (as inteiras continuam sem casas decimais)
+FORMATO_SUBPIXEL = "%.3f"
+
+# Salvar pontos em CSV (<pasta_csv>/<imagem><sufixo>.csv); avisar=False dispensa a mensagem (lote)
+def salvar_coordenadas(coordenadas_pontos, caminho_imagem, pasta_csv="csv_coordinates", sufixo="_coordinates",
+                       avisar=True):
+    import pandas as pd
+
+    os.makedirs(pasta_csv, exist_ok=True)
+    nome_arquivo = os.path.splitext(os.path.basename(caminho_imagem))[0]
+    nome_csv = os.path.join(pasta_csv, f"{nome_arquivo}{sufixo}.csv")
+    df_pontos = pd.DataFrame(coordenadas_pontos, columns=["X", "Y"])
+    df_pontos.to_csv(nome_csv, index=False, float_format=FORMATO_SUBPIXEL)
+    if avisar:
+        print(f"Coordenadas salvas em '{nome_csv}'")
+
+# Visualizador opcional: a imagem com os pontos já desenhados e, se informada, a imagem em tons de cinza ao lado.
+# O matplotlib só é importado aqui, então o uso sem interface não paga o seu carregamento.
+def exibir_imagem_com_pontos(imagem, coordenadas_pontos, imagem_cinza=None, titulo="Pontos Detectados"):
+    import matplotlib.pyplot as plt
+
+    from ImgProc_Overlay import desenhar_sobreposicao
+
+    if imagem_cinza is not None:
+        plt.subplot(1, 2, 1)
+    plt.imshow(cv2.cvtColor(desenhar_sobreposicao(imagem, coordenadas_pontos), cv2.COLOR_BGR2RGB))
+    plt.gca().invert_yaxis()  # Inverter o eixo Y para que o zero fique em baixo
+    plt.title(f"{titulo} ({len(coordenadas_pontos)})")
+    if imagem_cinza is not None:
+        plt.subplot(1, 2, 2)
+        plt.imshow(imagem_cinza, cmap='gray')
+        plt.gca().invert_yaxis()
+        plt.title(f"Imagem em Tons de Cinza com Pontos ({len(coordenadas_pontos)})")
+        plt.tight_layout()  # Ajusta o layout para evitar sobreposição
+    plt.show()
+
+# Função para escolher a imagem na janela de seleção (o tkinter só é importado quando a janela é usada)
+def selecionar_imagem():
+    from tkinter import Tk
+    from tkinter.filedialog import askopenfilename
+
+    Tk().withdraw()
+    return askopenfilename(title="Selecione uma imagem", filetypes=[("Imagens", "*.jpg;*.jpeg;*.png;*.bmp")])
+
+# Função para executar um script interativo de detecção (ImgProc_PointDetection*.py): escolhe a imagem,
+# detecta os pontos com o preset, lista e salva as coordenadas e exibe a figura
+def executar_script(detectar, titulo="Pontos Detectados", exibir_cinza=False):
+    caminho_imagem = selecionar_imagem()
+    if not caminho_imagem:
+        print("Nenhuma imagem selecionada.")
+        return
+    imagem = cv2.imread(caminho_imagem)
+    if imagem is None:
+        print("Erro ao carregar a imagem.")
+        return
+    coordenadas_pontos = detectar(imagem)
+
+    print(f"Total de pontos detectados: {len(coordenadas_pontos)}")
+    for i, coord in enumerate(coordenadas_pontos):
+        print(f"Ponto {i + 1}: X = {coord[0]}, Y = {coord[1]}")
+
+    salvar_coordenadas(coordenadas_pontos, caminho_imagem)
+    imagem_cinza = converter_cinza_para_preto(imagem) if exibir_cinza else None
+    exibir_imagem_com_pontos(imagem, coordenadas_pontos, imagem_cinza, titulo)
+
+def main(argv=None):
+    from ImgProc_BatchProcessing import listar_imagens
+    from ImgProc_ImageLoading import carregar_imagem
+
+    parser = argparse.ArgumentParser(description="Executa um pipeline de detecção declarativo (preset ou JSON).")
+    parser.add_argument("entradas", nargs="*", help="Diretórios, arquivos ou padrões glob de imagens")
+    parser.add_argument("--pipeline", default="distancias",
+                        help=f"Preset ({', '.join(sorted(PRESETS))}) ou arquivo JSON com a lista de etapas")
+    parser.add_argument("--mostrar", action="store_true", help="Exibe as etapas da configuração e encerra")
+    parser.add_argument("--pasta-csv", default="csv_coordinates", help="Pasta dos CSVs de coordenadas")
+    parser.add_argument("--subpixel", choices=("cantos", "centroide"),
+                        help="Refina os pontos com precisão sub-pixel (cornerSubPix ou centroide ponderado)")
+    args = parser.parse_args(argv)
+
+    try:
+        configuracao = carregar_configuracao(args.pipeline)
+    except ValueError as erro:
+        parser.error(str(erro))
+    if args.subpixel:
+        configuracao = com_subpixel(configuracao, args.subpixel)
+    if args.mostrar or not args.entradas:
+        print(json.dumps(configuracao, ensure_ascii=False, indent=1))
+        return 0
+
+    for caminho_imagem in listar_imagens(args.entradas):
+        imagem = carregar_imagem(caminho_imagem, "cinza")
+        if imagem is None:
+            print(f"Erro ao carregar a imagem: {caminho_imagem}")
+            continue
+        coordenadas_pontos = executar(imagem, configuracao)
+        print(f"{caminho_imagem}: {len(coordenadas_pontos)} pontos")
+        salvar_coordenadas(coordenadas_pontos, caminho_imagem, args.pasta_csv)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+import cv2
+import numpy as np
+
+from ImgProc_Deduplication import indices_pontos_distantes
+from ImgProc_Pipeline import (ajustar_contraste_brilho, converter_cinza, detectar_bordas, dilatar, localizar_cantos,
+                              refinar_subpixel, suavizar)
+
+__all__ = ["detectar_cantos_piramide", "tabela_equalizacao", "detectar_cantos_em_blocos"]
+
+# Meia janela de cv2.cornerSubPix por unidade de escala da pirâmide: um candidato do nível reduzido pode estar a
+# alguns pixels reduzidos do canto, então a janela na resolução original cresce com a escala
+MEIA_JANELA_POR_ESCALA = 4
+
+# Detecção grossa-para-fina: os candidatos são os cantos do nível reduzido da pirâmide (já suavizado por
+# cv2.pyrDown) e todos são levados de uma vez para a resolução original por refinar_subpixel. Com
+# subpixel="cantos" (padrão), cv2.cornerSubPix com a janela proporcional à escala (limitada pelo espaçamento);
+# com "centroide", o centroide ponderado; com None, os pontos ficam na posição do nível reduzido vezes a escala.
+# As distâncias são dadas em pixels da imagem original; o espaçamento dos pontos no nível reduzido
+# (espaçamento / 2 ** niveis) precisa ficar acima de uns 5 px. Retorna array N x 2 em float32.
+def detectar_cantos_piramide(imagem, niveis=2, maxCorners=1000, qualityLevel=0.1, minDistance=20,
+                             subpixel="cantos"):
+    imagem_cinza = converter_cinza(imagem)
+    reduzida = imagem_cinza
+    for _ in range(niveis):
+        reduzida = cv2.pyrDown(reduzida)
+    escala = 2 ** niveis
+
+    pontos = localizar_cantos(reduzida, maxCorners=maxCorners, qualityLevel=qualityLevel,
+                              minDistance=max(1.0, minDistance / escala)) * escala
+    if subpixel == "cantos":
+        # Um ponto que sai da janela não convergiu para o canto do seu candidato
+        meia_janela = MEIA_JANELA_POR_ESCALA * escala
+        pontos = refinar_subpixel(imagem_cinza, pontos, meia_janela, deslocamento_maximo=meia_janela)
+    elif subpixel:
+        pontos = refinar_subpixel(imagem_cinza, pontos, metodo=subpixel)
+    # Candidatos vizinhos podem convergir para o mesmo canto durante o refinamento
+    return pontos[indices_pontos_distantes(pontos, minDistance)]
+
+# Tabela de equalização equivalente a cv2.equalizeHist, calculada sobre a imagem inteira
+# para que todos os blocos usem exatamente o mesmo mapeamento de intensidades
+def tabela_equalizacao(imagem_cinza):
+    histograma = np.bincount(imagem_cinza.ravel(), minlength=256).astype(np.int64)
+    total = imagem_cinza.size
+    primeiro = int(np.flatnonzero(histograma)[0]) if total else 0
+    if total == 0 or histograma[primeiro] == total:
+        return np.full(256, primeiro, dtype=np.uint8)
+
+    escala = 255.0 / (total - histograma[primeiro])
+    acumulado = np.cumsum(histograma) - histograma[:primeiro + 1].sum()
+    tabela = np.clip(np.rint(acumulado * escala), 0, 255).astype(np.uint8)
+    tabela[:primeiro + 1] = 0
+    return tabela
+
+# Função para aplicar as etapas de melhorar_imagem + bordas em um recorte, com a equalização global
+def _bordas_do_recorte(recorte, tabela):
+    recorte = cv2.LUT(recorte, tabela)
+    recorte = suavizar(ajustar_contraste_brilho(recorte, alpha=1.5, beta=30))
+    bordas = detectar_bordas(recorte)
+    return bordas, dilatar(bordas)
+
+# Detecção em blocos com sobreposição, para imagens grandes demais para o pipeline completo.
+# Cada bloco é processado com uma margem extra e só mantém os pontos da sua região central,
+# de modo que cada ponto pertence a um único bloco. Cada candidato guarda a sua resposta de canto
+# (cv2.cornerMinEigenVal, a mesma medida de goodFeaturesToTrack); no fim, qualityLevel é aplicado contra a
+# maior resposta da imagem inteira e a distância mínima e maxCorners seguem a ordem global de força,
+# como em uma única chamada sobre a imagem inteira. Retorna array N x 2 em float32.
+def detectar_cantos_em_blocos(imagem, tamanho_bloco=2048, sobreposicao=64, maxCorners=1000, qualityLevel=0.1,
+                              minDistance=20):
+    imagem_cinza = converter_cinza(imagem)
+    altura, largura = imagem_cinza.shape
+    tabela = tabela_equalizacao(imagem_cinza)
+
+    encontrados, respostas = [], []
+    resposta_maxima = 0.0
+    for y0 in range(0, altura, tamanho_bloco):
+        for x0 in range(0, largura, tamanho_bloco):
+            y1, x1 = min(y0 + tamanho_bloco, altura), min(x0 + tamanho_bloco, largura)
+            ya, xa = max(0, y0 - sobreposicao), max(0, x0 - sobreposicao)
+            yb, xb = min(altura, y1 + sobreposicao), min(largura, x1 + sobreposicao)
+
+            bordas, mascara = _bordas_do_recorte(imagem_cinza[ya:yb, xa:xb], tabela)
+            resposta = cv2.cornerMinEigenVal(bordas, 3, 3)
+            centro = (slice(y0 - ya, y1 - ya), slice(x0 - xa, x1 - xa))
+            if cv2.countNonZero(mascara[centro]):
+                resposta_maxima = max(resposta_maxima, cv2.minMaxLoc(resposta[centro], mascara[centro])[1])
+            # O limiar do bloco (relativo ao seu próprio máximo) nunca é maior que o global:
+            # os candidatos do bloco contêm todos os pontos que passam no limiar global
+            pontos = cv2.goodFeaturesToTrack(bordas, maxCorners=maxCorners, qualityLevel=qualityLevel,
+                                             minDistance=minDistance, mask=mascara)
+            if pontos is None:
+                continue
+
+            pontos = pontos.reshape(-1, 2)
+            no_centro = ((pontos[:, 0] >= x0 - xa) & (pontos[:, 0] < x1 - xa) &
+                         (pontos[:, 1] >= y0 - ya) & (pontos[:, 1] < y1 - ya))
+            pontos = pontos[no_centro]
+            pixels = np.rint(pontos).astype(np.intp)
+            respostas.append(resposta[pixels[:, 1], pixels[:, 0]])
+            encontrados.append(pontos + (xa, ya))
+
+    if not encontrados:
+        return np.empty((0, 2), dtype=np.float32)
+    pontos, respostas = np.concatenate(encontrados).astype(np.float32), np.concatenate(respostas)
+    fortes = respostas >= qualityLevel * resposta_maxima
+    pontos, respostas = pontos[fortes], respostas[fortes]
+    pontos = pontos[np.argsort(-respostas, kind="stable")]
+    return pontos[indices_pontos_distantes(pontos, minDistance)][:maxCorners]
@@ -0,0 +1,245 @@
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import cv2
+import numpy as np
+from scipy.spatial import cKDTree
+
+from ImgProc_Pipeline import converter_cinza
+
+PASTA_ROIS = "configuracoes_roi"
+
+# Configuração "auto": as regiões são detectadas em cada imagem pela densidade de marcações
+AUTOMATICA = "auto"
+
+# Lado maior da imagem reduzida usada na detecção automática (as regiões voltam à escala original)
+LADO_DETECCAO = 1024
+
+# Uma região de interesse é {"nome", "retangulo": (x, y, largura, altura), "poligono": array N x 2 ou None},
+# em pixels da imagem original. Com polígono, o retângulo é o envelope dele e só os pontos internos são mantidos.
+def normalizar_roi(dados, indice=0):
+    nome = str(dados.get("nome") or f"roi_{indice + 1}")
+    if dados.get("poligono") is not None:
+        poligono = np.asarray(dados["poligono"], dtype=np.int32).reshape(-1, 2)
+        if len(poligono) < 3:
+            raise ValueError(f"O polígono da região '{nome}' precisa de ao menos 3 vértices.")
+        retangulo = tuple(int(v) for v in cv2.boundingRect(poligono))
+    elif dados.get("retangulo") is not None:
+        poligono = None
+        retangulo = tuple(int(v) for v in dados["retangulo"])
+        if len(retangulo) != 4 or retangulo[2] <= 0 or retangulo[3] <= 0:
+            raise ValueError(f"O retângulo da região '{nome}' deve ser [x, y, largura, altura].")
+    else:
+        raise ValueError(f"A região '{nome}' precisa de 'retangulo' ou 'poligono'.")
+    return {"nome": nome, "retangulo": retangulo, "poligono": poligono}
+
+def caminho_configuracao(nome, pasta=PASTA_ROIS):
+    return os.path.join(pasta, f"{nome}.json")
+
+# Função para gravar as regiões de uma montagem de câmera em JSON
+def salvar_rois(nome, rois, pasta=PASTA_ROIS):
+    os.makedirs(pasta, exist_ok=True)
+    caminho = caminho_configuracao(nome, pasta)
+    dados = {"nome": nome, "rois": []}
+    for roi in rois:
+        if roi["poligono"] is not None:
+            dados["rois"].append({"nome": roi["nome"], "poligono": roi["poligono"].tolist()})
+        else:
+            dados["rois"].append({"nome": roi["nome"], "retangulo": list(roi["retangulo"])})
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        json.dump(dados, arquivo, ensure_ascii=False, indent=1)
+    return caminho
+
+# Função para carregar as regiões de uma montagem pelo nome (em 'pasta') ou pelo caminho do JSON.
+# Fica em memória no processo, então cada worker lê o arquivo uma única vez.
+@lru_cache(maxsize=None)
+def carregar_rois(nome, pasta=PASTA_ROIS):
+    caminho = nome if nome.endswith(".json") else caminho_configuracao(nome, pasta)
+    if not os.path.exists(caminho):
+        raise ValueError(f"Configuração de regiões não encontrada: {caminho} (use ImgProc_ROI.py detectar)")
+    with open(caminho, encoding="utf-8") as arquivo:
+        dados = json.load(arquivo)
+    rois = tuple(normalizar_roi(roi, i) for i, roi in enumerate(dados.get("rois", [])))
+    if not rois:
+        raise ValueError(f"Nenhuma região em {caminho}.")
+    if len({roi["nome"] for roi in rois}) != len(rois):
+        raise ValueError(f"Nomes de região repetidos em {caminho}.")
+    return rois
+
+# Função para medir a regularidade do espaçamento das marcações de cada região (índice de Clark-Evans):
+# a distância média ao vizinho mais próximo dividida pela esperada para marcações ao acaso na mesma densidade.
+# Vale ~1 para marcações ao acaso (textura), mais para marcações espaçadas (spray, grade) e ~2 para uma grade.
+def regularidade_marcas(centros, rotulos, regioes):
+    regularidades = {}
+    for i in regioes:
+        marcas = centros[rotulos == i]
+        if len(marcas) < 3:
+            regularidades[i] = 0.0
+            continue
+        distancias, _ = cKDTree(marcas).query(marcas, k=2)
+        area = cv2.contourArea(cv2.convexHull(marcas.astype(np.float32)))
+        regularidades[i] = float(distancias[:, 1].mean() * 2 * np.sqrt(len(marcas) / area)) if area > 0 else 0.0
+    return regularidades
+
+# Função para detectar as regiões marcadas (o quadro de marcações de cada peça) pela densidade de marcações:
+# manchas escuras pequenas em relação ao fundo local. Bordas longas não são contadas, e regiões de marcações
+# sem espaçamento regular (a textura das garras) são descartadas.
+# Retorna as regiões nos pixels de 'imagem', da esquerda para a direita; sem nenhuma, a imagem inteira.
+def detectar_rois(imagem, area_minima=0.01, fracao_maior=0.25, margem=0.02, fracao_regularidade=0.9):
+    imagem_cinza = converter_cinza(imagem)
+    altura, largura = imagem_cinza.shape
+    escala = min(1.0, LADO_DETECCAO / max(altura, largura))
+    reduzida = cv2.resize(imagem_cinza, None, fx=escala, fy=escala, interpolation=cv2.INTER_AREA) \
+        if escala < 1 else imagem_cinza
+
+    marcas = cv2.adaptiveThreshold(reduzida, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 51, 15)
+    _, _, estatisticas, centroides = cv2.connectedComponentsWithStats(marcas, connectivity=8)
+    lado_maximo = max(reduzida.shape) // 12
+    pequenas = ((estatisticas[1:, cv2.CC_STAT_AREA] >= 2) & (estatisticas[1:, cv2.CC_STAT_WIDTH] <= lado_maximo)
+                & (estatisticas[1:, cv2.CC_STAT_HEIGHT] <= lado_maximo))
+    # Mapa com uma unidade no centro de cada marcação; a soma em uma janela é o número de marcações nela
+    mapa = np.zeros(reduzida.shape, dtype=np.float32)
+    centros = np.round(centroides[1:][pequenas]).astype(np.intp)
+    mapa[centros[:, 1], centros[:, 0]] = 1
+    janela = max(3, max(reduzida.shape) // 20)
+    densas = (cv2.boxFilter(mapa, -1, (janela, janela), normalize=False) >= 6).astype(np.uint8)
+    lado = janela // 2 | 1
+    densas = cv2.morphologyEx(densas, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (lado, lado)))
+
+    _, rotulos_regioes, regioes, _ = cv2.connectedComponentsWithStats(densas, connectivity=8)
+    areas = regioes[1:, cv2.CC_STAT_AREA]
+    if len(areas) == 0:
+        return [{"nome": "roi_1", "retangulo": (0, 0, largura, altura), "poligono": None}]
+    validas = [i + 1 for i in np.argsort(regioes[1:, cv2.CC_STAT_LEFT], kind="stable")
+               if areas[i] >= max(fracao_maior * areas.max(), area_minima * densas.size)]
+    # A textura das garras de aço também forma regiões densas, mas com as marcações ao acaso: só ficam as regiões
+    # quase tão regulares quanto a mais regular da imagem. O critério é relativo porque um spray de tinta é só um
+    # pouco mais regular que o acaso; um limite absoluto descartaria as peças pintadas assim.
+    regularidades = regularidade_marcas(centros, rotulos_regioes[centros[:, 1], centros[:, 0]], validas)
+    minima = fracao_regularidade * max(regularidades.values(), default=0.0)
+    validas = [i for i in validas if regularidades[i] >= minima]
+    rois = []
+    for i in validas:
+        x, y, w, h = regioes[i, :4] / escala
+        folga_x, folga_y = margem * largura, margem * altura
+        x0, y0 = max(0, int(x - folga_x)), max(0, int(y - folga_y))
+        x1, y1 = min(largura, int(np.ceil(x + w + folga_x))), min(altura, int(np.ceil(y + h + folga_y)))
+        rois.append({"nome": f"roi_{len(rois) + 1}", "retangulo": (x0, y0, x1 - x0, y1 - y0), "poligono": None})
+    return rois or [{"nome": "roi_1", "retangulo": (0, 0, largura, altura), "poligono": None}]
+
+# Função para escalar regiões (ex.: detectadas na imagem decodificada reduzida) para a resolução original
+def escalar_rois(rois, fator):
+    if fator == 1:
+        return list(rois)
+    return [{**roi, "retangulo": tuple(int(v * fator) for v in roi["retangulo"]),
+             "poligono": None if roi["poligono"] is None else roi["poligono"] * fator} for roi in rois]
+
+# Função para obter as regiões de uma imagem: as da configuração ou, com "auto", as detectadas nela.
+# 'reducao' é a redução com que a imagem foi decodificada; as regiões ficam sempre em pixels originais.
+def rois_da_imagem(imagem, configuracao, reducao=1):
+    if configuracao == AUTOMATICA:
+        return escalar_rois(detectar_rois(imagem), reducao)
+    return list(carregar_rois(configuracao))
+
+# Função para recortar a região (uma visão da imagem, sem cópia). Retorna (recorte, origem), com a origem
+# em pixels originais e múltipla de 'reducao', para que as coordenadas ampliadas do recorte continuem exatas.
+def recortar(imagem, roi, reducao=1):
+    x, y, w, h = roi["retangulo"]
+    altura, largura = imagem.shape[:2]
+    x0, y0 = min(largura, max(0, x // reducao)), min(altura, max(0, y // reducao))
+    x1, y1 = min(largura, -(-(x + w) // reducao)), min(altura, -(-(y + h) // reducao))
+    if x1 <= x0 or y1 <= y0:
+        raise ValueError(f"A região '{roi['nome']}' está fora da imagem.")
+    return imagem[y0:y1, x0:x1], (x0 * reducao, y0 * reducao)
+
+# Função para manter só os pontos dentro do polígono da região ('origem' é o canto do recorte)
+def filtrar_na_roi(coordenadas_pontos, roi, origem=(0, 0)):
+    if roi is None or roi["poligono"] is None or len(coordenadas_pontos) == 0:
+        return coordenadas_pontos
+    pontos = np.asarray(coordenadas_pontos, dtype=np.float32).reshape(-1, 2) + np.float32(origem)
+    poligono = roi["poligono"].astype(np.float32).reshape(-1, 1, 2)
+    dentro = np.array([cv2.pointPolygonTest(poligono, (float(x), float(y)), False) >= 0 for x, y in pontos])
+    if isinstance(coordenadas_pontos, np.ndarray):
+        return coordenadas_pontos[dentro]
+    return [p for p, manter in zip(coordenadas_pontos, dentro) if manter]
+
+# Função para levar as coordenadas do recorte para a imagem inteira (arrays N x 2 continuam arrays)
+def deslocar(coordenadas_pontos, origem):
+    if isinstance(coordenadas_pontos, np.ndarray):
+        return coordenadas_pontos + np.asarray(origem, dtype=coordenadas_pontos.dtype)
+    x0, y0 = origem
+    return [(x + x0, y + y0) for x, y in coordenadas_pontos]
+
+# Função para executar 'processar(recorte, roi, origem)' em cada região, em paralelo em um pool de threads
+# (o OpenCV libera o GIL durante a detecção). Retorna (roi, resultado ou exceção) na ordem das regiões.
+def processar_rois(imagem, rois, processar, threads=None, reducao=1):
+    def executar(roi):
+        try:
+            recorte, origem = recortar(imagem, roi, reducao)
+            return roi, processar(recorte, roi, origem)
+        except Exception as erro:
+            return roi, erro
+
+    if len(rois) == 1 or threads == 1:
+        return [executar(roi) for roi in rois]
+    with ThreadPoolExecutor(max_workers=min(len(rois), threads or len(rois)), thread_name_prefix="roi") as executor:
+        return list(executor.map(executar, rois))
+
+# Função para desenhar as regiões sobre a imagem (conferência da configuração)
+def desenhar_rois(imagem, rois):
+    figura = cv2.cvtColor(imagem, cv2.COLOR_GRAY2BGR) if imagem.ndim == 2 else imagem.copy()
+    espessura = max(2, max(figura.shape[:2]) // 400)
+    for roi in rois:
+        x, y, w, h = roi["retangulo"]
+        if roi["poligono"] is not None:
+            cv2.polylines(figura, [roi["poligono"].reshape(-1, 1, 2)], True, (0, 0, 255), espessura)
+        else:
+            cv2.rectangle(figura, (x, y), (x + w, y + h), (0, 0, 255), espessura)
+        cv2.putText(figura, roi["nome"], (x + espessura, y + 12 * espessura), cv2.FONT_HERSHEY_SIMPLEX,
+                    espessura / 2, (0, 0, 255), espessura)
+    return figura
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Regiões de interesse (retângulos ou polígonos) por montagem.")
+    parser.add_argument("--pasta", default=PASTA_ROIS, help="Pasta das configurações")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    detectar = subparsers.add_parser("detectar",
+                                     help="Detecta as regiões marcadas em uma imagem e grava a configuração")
+    detectar.add_argument("nome", help="Nome da configuração (ex.: a montagem da câmera)")
+    detectar.add_argument("imagem", help="Imagem de referência da montagem")
+    detectar.add_argument("--figura", help="Grava a imagem com as regiões desenhadas")
+    mostrar = subparsers.add_parser("mostrar", help="Desenha as regiões de uma configuração sobre uma imagem")
+    mostrar.add_argument("nome", help="Nome da configuração ou caminho do JSON")
+    mostrar.add_argument("imagem")
+    mostrar.add_argument("figura", help="Arquivo da figura gerada")
+    args = parser.parse_args(argv)
+
+    imagem = cv2.imread(args.imagem)
+    if imagem is None:
+        print(f"Erro ao carregar a imagem: {args.imagem}")
+        return 1
+    if args.comando == "detectar":
+        rois = detectar_rois(imagem)
+        caminho = salvar_rois(args.nome, rois, args.pasta)
+        for roi in rois:
+            print(f"{roi['nome']}: x={roi['retangulo'][0]} y={roi['retangulo'][1]} "
+                  f"{roi['retangulo'][2]}x{roi['retangulo'][3]}")
+        print(f"Configuração salva em '{caminho}' (edite o JSON para renomear, ajustar ou usar polígonos)")
+    else:
+        try:
+            rois = carregar_rois(args.nome, args.pasta)
+        except ValueError as erro:
+            print(erro)
+            return 1
+    if args.figura:
+        cv2.imwrite(args.figura, desenhar_rois(imagem, rois))
+        print(f"Figura salva em '{args.figura}'")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
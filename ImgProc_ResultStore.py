@@ -0,0 +1,138 @@
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+# Formato binário dos resultados: um arquivo bruto por array (lido com np.memmap, sem cópia)
+# e um manifesto JSON com o tipo, a forma e o arquivo de cada array de cada imagem.
+PASTA_RESULTADOS = "resultados"
+NOME_MANIFESTO = "manifesto.json"
+VERSAO_FORMATO = 1
+
+TIPO_COORDENADAS = np.dtype("<f4")
+TIPO_PARES = np.dtype("<i4")
+TIPO_DISTANCIAS = np.dtype("<f4")
+
+# Função para descrever um array gravado no manifesto
+def _descrever(arquivo, tipo, forma):
+    return {"arquivo": arquivo, "dtype": tipo.str, "forma": list(forma)}
+
+# Função para salvar as coordenadas e os blocos de distâncias de uma imagem em formato binário.
+# Os blocos (indices_a, indices_b, distancias) são gravados à medida que chegam; os índices
+# dos pontos são gravados começando em 1, como nos CSVs.
+def salvar_resultado_binario(pasta, nome, coordenadas_pontos, blocos, caminho_imagem=""):
+    os.makedirs(pasta, exist_ok=True)
+
+    coordenadas = np.asarray(coordenadas_pontos, dtype=TIPO_COORDENADAS).reshape(-1, 2)
+    arquivo_coordenadas = f"{nome}_coordenadas.f32"
+    coordenadas.tofile(os.path.join(pasta, arquivo_coordenadas))
+
+    arquivo_pares = f"{nome}_pares.i32"
+    arquivo_distancias = f"{nome}_distancias.f32"
+    total = 0
+    with open(os.path.join(pasta, arquivo_pares), "wb") as saida_pares, \
+            open(os.path.join(pasta, arquivo_distancias), "wb") as saida_distancias:
+        for indices_a, indices_b, valores in blocos:
+            pares = np.empty((len(indices_a), 2), dtype=TIPO_PARES)
+            pares[:, 0] = indices_a + 1
+            pares[:, 1] = indices_b + 1
+            pares.tofile(saida_pares)
+            np.asarray(valores, dtype=TIPO_DISTANCIAS).tofile(saida_distancias)
+            total += len(pares)
+
+    return {
+        "imagem": caminho_imagem,
+        "coordenadas": _descrever(arquivo_coordenadas, TIPO_COORDENADAS, coordenadas.shape),
+        "pares": _descrever(arquivo_pares, TIPO_PARES, (total, 2)),
+        "distancias": _descrever(arquivo_distancias, TIPO_DISTANCIAS, (total,)),
+    }
+
+# Função para ler o manifesto (vazio se a pasta ainda não tiver resultados)
+def carregar_manifesto(pasta):
+    caminho = os.path.join(pasta, NOME_MANIFESTO)
+    if not os.path.exists(caminho):
+        return {"versao": VERSAO_FORMATO, "imagens": {}}
+    with open(caminho, encoding="utf-8") as arquivo:
+        return json.load(arquivo)
+
+# Função para incluir as entradas de novas imagens no manifesto (gravação atômica)
+def atualizar_manifesto(pasta, entradas):
+    os.makedirs(pasta, exist_ok=True)
+    manifesto = carregar_manifesto(pasta)
+    manifesto["imagens"].update(entradas)
+    caminho = os.path.join(pasta, NOME_MANIFESTO)
+    temporario = caminho + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        json.dump(manifesto, arquivo, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(temporario, caminho)
+    return manifesto
+
+# Função para abrir os arrays de uma única imagem sem carregá-los em memória
+def abrir_resultado(pasta, nome, manifesto=None):
+    manifesto = manifesto or carregar_manifesto(pasta)
+    if nome not in manifesto["imagens"]:
+        raise KeyError(f"Imagem '{nome}' não encontrada em '{pasta}'.")
+
+    arrays = {}
+    for chave, descricao in manifesto["imagens"][nome].items():
+        if not isinstance(descricao, dict):
+            continue
+        forma = tuple(descricao["forma"])
+        if forma[0] == 0:
+            # np.memmap não aceita arquivos vazios
+            arrays[chave] = np.empty(forma, dtype=descricao["dtype"])
+        else:
+            arrays[chave] = np.memmap(os.path.join(pasta, descricao["arquivo"]), dtype=descricao["dtype"],
+                                      mode="r", shape=forma)
+    return arrays
+
+# Função para converter os resultados binários de uma imagem nos CSVs de coordenadas e distâncias
+def exportar_csv(pasta, nome, pasta_csv=".", manifesto=None):
+    import pandas as pd
+
+    arrays = abrir_resultado(pasta, nome, manifesto)
+    os.makedirs(pasta_csv, exist_ok=True)
+
+    nome_coordenadas = os.path.join(pasta_csv, f"{nome}_coordinates.csv")
+    coordenadas = arrays["coordenadas"]
+    # Coordenadas inteiras continuam sendo exportadas como inteiros
+    if np.array_equal(coordenadas, np.round(coordenadas)):
+        coordenadas = coordenadas.astype(np.int64)
+    df_pontos = pd.DataFrame(coordenadas, columns=["X", "Y"])
+    df_pontos.to_csv(nome_coordenadas, index=False)
+
+    nome_distancias = os.path.join(pasta_csv, f"{nome}_distances.csv")
+    pares, distancias = arrays["pares"], arrays["distancias"]
+    df_distancias = pd.DataFrame({"Ponto A": pares[:, 0], "Ponto B": pares[:, 1], "Distância": distancias})
+    df_distancias.to_csv(nome_distancias, index=False)
+    return nome_coordenadas, nome_distancias
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Consulta e exportação dos resultados binários.")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    listar = subparsers.add_parser("listar", help="Lista as imagens registradas no manifesto")
+    listar.add_argument("pasta", nargs="?", default=PASTA_RESULTADOS)
+
+    exportar = subparsers.add_parser("exportar", help="Converte resultados binários em CSV")
+    exportar.add_argument("pasta", nargs="?", default=PASTA_RESULTADOS)
+    exportar.add_argument("--imagens", nargs="*", help="Nomes das imagens (padrão: todas)")
+    exportar.add_argument("--saida", default="csv_exportados", help="Pasta de destino dos CSVs")
+    args = parser.parse_args(argv)
+
+    manifesto = carregar_manifesto(args.pasta)
+    if args.comando == "listar":
+        for nome, entrada in sorted(manifesto["imagens"].items()):
+            print(f"{nome}: {entrada['coordenadas']['forma'][0]} pontos, {entrada['pares']['forma'][0]} distâncias")
+        return 0
+
+    nomes = args.imagens or sorted(manifesto["imagens"])
+    for nome in nomes:
+        for caminho in exportar_csv(args.pasta, nome, args.saida, manifesto):
+            print(f"Exportado '{caminho}'")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
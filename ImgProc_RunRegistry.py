@@ -0,0 +1,212 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+
+REGISTRO_PADRAO = "execucoes.sqlite"
+
+# Versão da configuração; mudar sempre que um pipeline mudar de comportamento, para forçar o reprocessamento
+VERSAO_CONFIGURACAO = 5
+
+# Opções que alteram os resultados (as demais, como cache e métricas, não entram na chave)
+OPCOES_RESULTADO = ("modo_distancias", "raio", "vizinhos", "deteccao", "niveis", "tamanho_bloco", "formato",
+                    "sobreposicao", "ids", "calibracao", "reducao",
+                    "detector", "rois", "subpixel")
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS execucoes (
+    id INTEGER PRIMARY KEY,
+    hash_imagem TEXT NOT NULL,
+    hash_configuracao TEXT NOT NULL,
+    configuracao TEXT NOT NULL,
+    pipeline TEXT NOT NULL,
+    especime TEXT NOT NULL,
+    caminho_imagem TEXT NOT NULL,
+    data_captura REAL,
+    data_processamento REAL NOT NULL,
+    status TEXT NOT NULL,
+    pontos INTEGER,
+    distancias INTEGER,
+    tempo REAL,
+    erro TEXT,
+    saidas TEXT,
+    UNIQUE (hash_imagem, hash_configuracao, caminho_imagem)
+);
+CREATE INDEX IF NOT EXISTS execucoes_especime ON execucoes (especime, data_captura);
+"""
+
+# Versão do esquema (PRAGMA user_version). Na versão 1 a chave era só (hash_imagem, hash_configuracao): uma cópia
+# idêntica da foto em outra pasta era dada como processada e o seu espécime ficava sem execução.
+VERSAO_ESQUEMA = 2
+
+# Migração da versão 1: recria a tabela com a chave nova, mantendo as execuções registradas
+MIGRACAO_V1 = f"""
+BEGIN;
+DROP INDEX IF EXISTS execucoes_especime;
+ALTER TABLE execucoes RENAME TO execucoes_v1;
+{ESQUEMA}
+INSERT INTO execucoes SELECT * FROM execucoes_v1;
+DROP TABLE execucoes_v1;
+PRAGMA user_version = {VERSAO_ESQUEMA};
+COMMIT;
+"""
+
+# Função para calcular o hash do conteúdo do arquivo da imagem (sem decodificá-la)
+def hash_arquivo(caminho, tamanho_bloco=1 << 20):
+    resumo = hashlib.blake2b(digest_size=20)
+    with open(caminho, "rb") as arquivo:
+        for bloco in iter(lambda: arquivo.read(tamanho_bloco), b""):
+            resumo.update(bloco)
+    return resumo.hexdigest()
+
+# Função para montar a configuração de uma execução (pipeline + opções que afetam a saída) e seu hash
+def configuracao_execucao(pipeline, opcoes, pasta_saida="."):
+    configuracao = {"versao": VERSAO_CONFIGURACAO, "pipeline": pipeline, "pasta_saida": os.path.abspath(pasta_saida)}
+    configuracao.update({chave: opcoes.get(chave) for chave in OPCOES_RESULTADO})
+    if configuracao["calibracao"]:
+        # O nome do perfil não basta: recalibrar regrava o mesmo arquivo com outra tabela
+        from ImgProc_Calibration import carregar_perfil
+        from ImgProc_StageCache import hash_imagem
+        configuracao["tabela_calibracao"] = hash_imagem(carregar_perfil(configuracao["calibracao"])["tabela_deteccao"])
+    if configuracao["rois"]:
+        from ImgProc_ROI import AUTOMATICA, carregar_rois
+        if configuracao["rois"] != AUTOMATICA:
+            # Idem para as regiões: editar o JSON da montagem muda a geometria sem mudar o nome
+            configuracao["geometria_rois"] = [
+                [roi["nome"], list(roi["retangulo"]), None if roi["poligono"] is None else roi["poligono"].tolist()]
+                for roi in carregar_rois(configuracao["rois"])]
+    texto = json.dumps(configuracao, sort_keys=True)
+    return configuracao, hashlib.blake2b(texto.encode(), digest_size=20).hexdigest()
+
+# Função para deduzir o espécime de uma imagem: o caminho da pasta onde ela está, relativo à pasta raiz
+# (a do banco de registro). Só o nome da pasta não basta: toda série tem suas pastas "peca A" e "peca B".
+def especime_da_imagem(caminho_imagem, raiz="."):
+    pasta = os.path.dirname(os.path.abspath(caminho_imagem))
+    try:
+        pasta = os.path.relpath(pasta, os.path.abspath(raiz))
+    except ValueError:
+        # Outra unidade (Windows): fica o caminho absoluto
+        pass
+    return pasta.replace(os.sep, "/")
+
+# Registro das execuções em SQLite: uma linha por (conteúdo da imagem, configuração, caminho absoluto da imagem).
+# Só o processo principal escreve no banco; os workers apenas processam.
+class RegistroExecucoes:
+    def __init__(self, caminho=REGISTRO_PADRAO):
+        self.caminho = caminho
+        self.raiz = os.path.dirname(os.path.abspath(caminho))
+        self.conexao = sqlite3.connect(caminho)
+        self.conexao.row_factory = sqlite3.Row
+        versao = self.conexao.execute("PRAGMA user_version").fetchone()[0]
+        existente = self.conexao.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'execucoes'").fetchone()
+        if existente and versao < VERSAO_ESQUEMA:
+            self.conexao.executescript(MIGRACAO_V1)
+        else:
+            self.conexao.executescript(ESQUEMA + f"PRAGMA user_version = {VERSAO_ESQUEMA};")
+
+    def fechar(self):
+        self.conexao.close()
+
+    # Retorna a execução bem-sucedida desta imagem/configuração, se todas as saídas ainda existirem
+    def buscar(self, hash_imagem, hash_configuracao, caminho_imagem):
+        linha = self.conexao.execute(
+            """SELECT * FROM execucoes
+               WHERE hash_imagem = ? AND hash_configuracao = ? AND caminho_imagem = ? AND status = 'ok'""",
+            (hash_imagem, hash_configuracao, os.path.abspath(caminho_imagem))).fetchone()
+        if linha is None or not all(os.path.exists(s) for s in json.loads(linha["saidas"] or "[]")):
+            return None
+        return linha
+
+    # Grava (ou substitui) o resultado de uma imagem processada
+    def registrar(self, resultado, hash_imagem, configuracao, hash_configuracao, saidas, especime=None):
+        caminho_imagem = resultado["imagem"]
+        try:
+            data_captura = os.path.getmtime(caminho_imagem)
+        except OSError:
+            data_captura = None
+        with self.conexao:
+            self.conexao.execute(
+                """INSERT OR REPLACE INTO execucoes (hash_imagem, hash_configuracao, configuracao, pipeline, especime,
+                       caminho_imagem, data_captura, data_processamento, status, pontos, distancias, tempo, erro,
+                       saidas)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (hash_imagem, hash_configuracao, json.dumps(configuracao, sort_keys=True), configuracao["pipeline"],
+                 especime or especime_da_imagem(caminho_imagem, self.raiz), os.path.abspath(caminho_imagem),
+                 data_captura, time.time(), resultado["status"], resultado["pontos"], resultado["distancias"],
+                 resultado.get("tempo"), resultado["erro"], json.dumps(saidas if resultado["status"] == "ok" else [])))
+
+    # Consulta as execuções, opcionalmente por espécime e por intervalo de datas de captura (timestamps)
+    def consultar(self, especime=None, desde=None, ate=None, pipeline=None):
+        condicoes, parametros = [], []
+        for coluna, operador, valor in (("especime", "=", especime), ("data_captura", ">=", desde),
+                                        ("data_captura", "<=", ate), ("pipeline", "=", pipeline)):
+            if valor is not None:
+                condicoes.append(f"{coluna} {operador} ?")
+                parametros.append(valor)
+        onde = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+        return self.conexao.execute(
+            f"SELECT * FROM execucoes {onde} ORDER BY especime, data_captura, id", parametros).fetchall()
+
+    # Resumo por espécime: quantidade de imagens, período coberto e média de pontos
+    def especimes(self):
+        return self.conexao.execute(
+            """SELECT especime, COUNT(*) AS execucoes, SUM(status = 'ok') AS ok, MIN(data_captura) AS inicio,
+                      MAX(data_captura) AS fim, AVG(pontos) AS media_pontos
+               FROM execucoes GROUP BY especime ORDER BY especime""").fetchall()
+
+# Função para converter datas "AAAA-MM-DD[ HH:MM]" em timestamps
+def _data(texto):
+    if texto is None:
+        return None
+    for formato in ("%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return time.mktime(time.strptime(texto, formato))
+        except ValueError:
+            continue
+    raise argparse.ArgumentTypeError(f"Data inválida: {texto} (use AAAA-MM-DD ou 'AAAA-MM-DD HH:MM')")
+
+def _formatar_data(timestamp):
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(timestamp)) if timestamp else "-"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Consulta o registro de execuções.")
+    parser.add_argument("--registro", default=REGISTRO_PADRAO, help="Arquivo SQLite do registro")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    subparsers.add_parser("especimes", help="Resumo por espécime")
+    consultar = subparsers.add_parser("consultar", help="Execuções de um espécime ao longo do tempo")
+    consultar.add_argument("--especime")
+    consultar.add_argument("--pipeline", choices=("monitoramento", "distancias"))
+    consultar.add_argument("--desde", type=_data, help="Data de captura inicial (AAAA-MM-DD)")
+    consultar.add_argument("--ate", type=_data, help="Data de captura final (AAAA-MM-DD)")
+    consultar.add_argument("--csv", help="Grava o resultado da consulta neste CSV")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.registro):
+        print(f"Registro não encontrado: {args.registro}")
+        return 1
+    registro = RegistroExecucoes(args.registro)
+    if args.comando == "especimes":
+        for linha in registro.especimes():
+            media = f"{linha['media_pontos']:.1f}" if linha["media_pontos"] is not None else "-"
+            print(f"{linha['especime']}: {linha['ok']} de {linha['execucoes']} execuções ok, "
+                  f"{_formatar_data(linha['inicio'])} a {_formatar_data(linha['fim'])}, média de {media} pontos")
+        return 0
+
+    linhas = registro.consultar(args.especime, args.desde, args.ate, args.pipeline)
+    if args.csv:
+        import pandas as pd
+        pd.DataFrame([dict(linha) for linha in linhas]).to_csv(args.csv, index=False)
+        print(f"Consulta salva em '{args.csv}'")
+    for linha in linhas:
+        nome_imagem = os.path.basename(linha["caminho_imagem"])
+        print(f"{_formatar_data(linha['data_captura'])}  {linha['especime']}  {nome_imagem}"
+              f"  [{linha['status']}] {linha['pipeline']}: {linha['pontos']} pontos, {linha['distancias']} distâncias")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,456 @@
+import argparse
+import io
+import json
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as TempoEsgotado
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ENDERECO_PADRAO = "127.0.0.1"
+PORTA_PADRAO = 8765
+# Modos de distância do pipeline "distancias" (o de monitoramento mede sempre a partir do ponto inicial)
+MODOS_SERVICO = ("todos", "raio", "vizinhos", "grade")
+
+# Inicializador dos workers do serviço: mesmo ajuste do lote, módulos carregados uma única vez
+# e cache de etapas sempre ativo (em memória, e também em disco se houver pasta)
+def inicializar_worker_servico(pasta_cache=None, limite_cache_mb=2048):
+    import ImgProc_BatchProcessing as lote
+    import ImgProc_DistanceCalculation  # noqa: F401
+    import ImgProc_GridTopology  # noqa: F401
+    import ImgProc_StructuralMonitoring  # noqa: F401
+    from ImgProc_StageCache import CacheEtapas
+
+    lote.inicializar_worker(pasta_cache, limite_cache_mb)
+    if lote._CACHE is None:
+        lote._CACHE = CacheEtapas()
+
+# Função executada no worker para um lote de pedidos; cada pedido falha isoladamente
+def processar_lote_servico(pedidos):
+    import numpy as np
+
+    from ImgProc_BatchProcessing import PIPELINES
+    from ImgProc_ImageLoading import carregar_imagem, decodificar
+
+    respostas = []
+    for pedido in pedidos:
+        inicio = time.perf_counter()
+        try:
+            # Os pipelines só precisam dos tons de cinza: a imagem é decodificada direto em cinza
+            if pedido.get("bytes") is not None:
+                imagem = decodificar(np.frombuffer(pedido["bytes"], dtype=np.uint8), "cinza")
+            else:
+                imagem = carregar_imagem(pedido["caminho"], "cinza")
+            if imagem is None:
+                raise ValueError("Erro ao carregar a imagem.")
+            coordenadas_pontos, blocos = PIPELINES[pedido["pipeline"]](imagem, pedido["opcoes"])
+            blocos = list(blocos)
+            if blocos:
+                pares = np.column_stack((np.concatenate([a for a, _, _ in blocos]),
+                                         np.concatenate([b for _, b, _ in blocos])))
+                distancias = np.concatenate([d for _, _, d in blocos])
+            else:
+                pares, distancias = np.empty((0, 2)), np.empty(0)
+            respostas.append({
+                "status": "ok",
+                "coordenadas": np.asarray(coordenadas_pontos, dtype=np.float32).reshape(-1, 2),
+                "pares": pares.astype(np.int32),
+                "distancias": distancias.astype(np.float32),
+                "tempo_processamento": time.perf_counter() - inicio,
+            })
+        except Exception as erro:
+            respostas.append({"status": "erro", "erro": f"{type(erro).__name__}: {erro}",
+                              "tempo_processamento": time.perf_counter() - inicio})
+    return respostas
+
+# Latências recentes e contadores do serviço
+class Metricas:
+    def __init__(self, janela=2000):
+        self.trava = threading.Lock()
+        self.latencias = deque(maxlen=janela)
+        self.esperas = deque(maxlen=janela)
+        self.processamentos = deque(maxlen=janela)
+        self.atendidos = 0
+        self.erros = 0
+        self.rejeitados = 0
+        self.lotes = 0
+        self.itens_em_lotes = 0
+
+    def registrar(self, espera, processamento, total, ok):
+        with self.trava:
+            self.esperas.append(espera)
+            self.processamentos.append(processamento)
+            self.latencias.append(total)
+            self.atendidos += 1
+            self.erros += 0 if ok else 1
+
+    @staticmethod
+    def _percentis(valores):
+        if not valores:
+            return {}
+        ordenados = sorted(valores)
+        def percentil(p):
+            return ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))] * 1000
+        return {"p50_ms": percentil(50), "p95_ms": percentil(95), "p99_ms": percentil(99),
+                "max_ms": ordenados[-1] * 1000}
+
+    def resumo(self):
+        with self.trava:
+            return {
+                "atendidos": self.atendidos, "erros": self.erros, "rejeitados": self.rejeitados,
+                "lotes": self.lotes, "tamanho_medio_lote": self.itens_em_lotes / self.lotes if self.lotes else 0.0,
+                "latencia": self._percentis(self.latencias), "espera_fila": self._percentis(self.esperas),
+                "processamento": self._percentis(self.processamentos),
+            }
+
+# Serviço de detecção: fila limitada (pedidos além da capacidade são recusados), um despachante que
+# agrupa pedidos em lotes e um pool de processos mantido aquecido entre os pedidos
+class ServicoDeteccao:
+    def __init__(self, processos=None, tamanho_fila=64, tamanho_lote=4, espera_lote_ms=5, pasta_cache=None,
+                 limite_cache_mb=2048):
+        self.processos = processos or os.cpu_count() or 1
+        self.fila = queue.Queue(maxsize=tamanho_fila)
+        self.tamanho_lote = tamanho_lote
+        self.espera_lote = espera_lote_ms / 1000
+        self.metricas = Metricas()
+        # Limita os lotes em andamento ao número de workers, para que a fila reflita a carga real
+        self.vagas = threading.Semaphore(self.processos)
+        self.executor = ProcessPoolExecutor(max_workers=self.processos, initializer=inicializar_worker_servico,
+                                            initargs=(pasta_cache, limite_cache_mb))
+        self.ativo = True
+        self.despachante = threading.Thread(target=self._despachar, daemon=True)
+        self.despachante.start()
+
+    # Aquece todos os workers antes de aceitar pedidos (imports e inicialização do OpenCV)
+    def aquecer(self):
+        list(self.executor.map(processar_lote_servico, [[]] * self.processos))
+
+    # Enfileira um pedido; retorna um Future ou None se a fila estiver cheia
+    def enviar(self, pedido):
+        futuro = Future()
+        if not self.ativo:
+            futuro.set_exception(RuntimeError("Serviço encerrando."))
+            return futuro
+        try:
+            self.fila.put_nowait((pedido, futuro, time.perf_counter()))
+        except queue.Full:
+            with self.metricas.trava:
+                self.metricas.rejeitados += 1
+            return None
+        return futuro
+
+    def _despachar(self):
+        while self.ativo:
+            try:
+                primeiro = self.fila.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            lote = [primeiro]
+            limite = time.perf_counter() + self.espera_lote
+            while len(lote) < self.tamanho_lote:
+                restante = limite - time.perf_counter()
+                try:
+                    lote.append(self.fila.get(timeout=restante) if restante > 0 else self.fila.get_nowait())
+                except queue.Empty:
+                    break
+            self.vagas.acquire()
+            with self.metricas.trava:
+                self.metricas.lotes += 1
+                self.metricas.itens_em_lotes += len(lote)
+            inicio_lote = time.perf_counter()
+            try:
+                futuro_lote = self.executor.submit(processar_lote_servico, [pedido for pedido, _, _ in lote])
+            except RuntimeError as erro:
+                self.vagas.release()
+                for _, futuro, _ in lote:
+                    futuro.set_exception(erro)
+                continue
+            futuro_lote.add_done_callback(lambda f, lote=lote, inicio=inicio_lote: self._concluir(f, lote, inicio))
+
+    def _concluir(self, futuro_lote, lote, inicio_lote):
+        self.vagas.release()
+        agora = time.perf_counter()
+        try:
+            respostas = futuro_lote.result()
+        except Exception as erro:
+            respostas = [{"status": "erro", "erro": f"{type(erro).__name__}: {erro}", "tempo_processamento": 0.0}
+                         for _ in lote]
+        for (_, futuro, chegada), resposta in zip(lote, respostas):
+            self.metricas.registrar(inicio_lote - chegada, resposta["tempo_processamento"], agora - chegada,
+                                    resposta["status"] == "ok")
+            resposta["tempo_fila"] = inicio_lote - chegada
+            resposta["tempo_total"] = agora - chegada
+            futuro.set_result(resposta)
+
+    # Encerra o despachante e o pool; os pedidos que ainda estavam na fila recebem o erro de encerramento,
+    # em vez de deixar os tratadores esperando até o tempo limite
+    def encerrar(self):
+        self.ativo = False
+        self.despachante.join()
+        while True:
+            try:
+                _, futuro, _ = self.fila.get_nowait()
+            except queue.Empty:
+                break
+            futuro.set_exception(RuntimeError("Serviço encerrando."))
+        self.executor.shutdown(cancel_futures=True)
+
+# Função para converter a resposta em JSON (índices a partir de 1, como nos CSVs)
+def resposta_json(resposta):
+    if resposta["status"] != "ok":
+        return dict(resposta)
+    return {
+        "status": "ok",
+        "pontos": resposta["coordenadas"].tolist(),
+        "distancias": [[a + 1, b + 1, d] for (a, b), d in zip(resposta["pares"].tolist(),
+                                                             resposta["distancias"].tolist())],
+        "tempo_fila": resposta["tempo_fila"],
+        "tempo_processamento": resposta["tempo_processamento"],
+        "tempo_total": resposta["tempo_total"],
+    }
+
+# Função para converter a resposta em um .npz (arrays tipados, índices a partir de 0)
+def resposta_binaria(resposta):
+    import numpy as np
+
+    buffer = io.BytesIO()
+    np.savez(buffer, coordenadas=resposta["coordenadas"], pares=resposta["pares"],
+             distancias=resposta["distancias"])
+    return buffer.getvalue()
+
+# Tratador HTTP; o serviço e o tempo limite ficam no próprio servidor (self.server)
+class Tratador(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, formato, *args):
+        pass
+
+    def _responder(self, codigo, corpo, tipo="application/json", cabecalhos=None):
+        if not isinstance(corpo, bytes):
+            corpo = json.dumps(corpo, ensure_ascii=False).encode()
+        self.send_response(codigo)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(corpo)))
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def do_GET(self):
+        caminho = urllib.parse.urlparse(self.path).path
+        if caminho == "/saude":
+            self._responder(200, {"status": "ok", "fila": self.server.servico.fila.qsize()})
+        elif caminho == "/metricas":
+            servico = self.server.servico
+            self._responder(200, {**servico.metricas.resumo(), "fila": servico.fila.qsize(),
+                                  "capacidade_fila": servico.fila.maxsize, "processos": servico.processos})
+        else:
+            self._responder(404, {"erro": "Caminho desconhecido."})
+
+    # POST /detectar?pipeline=...&modo_distancias=...&formato=json|binario
+    # Corpo: JSON {"caminho": "..."} ou os bytes da imagem (application/octet-stream, image/*)
+    def do_POST(self):
+        url = urllib.parse.urlparse(self.path)
+        if url.path != "/detectar":
+            self._responder(404, {"erro": "Caminho desconhecido."})
+            return
+        parametros = {k: v[-1] for k, v in urllib.parse.parse_qs(url.query).items()}
+        corpo = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        try:
+            pedido = _montar_pedido(parametros, corpo, self.headers.get("Content-Type", ""))
+        except ValueError as erro:
+            self._responder(400, {"erro": str(erro)})
+            return
+
+        futuro = self.server.servico.enviar(pedido)
+        if futuro is None:
+            # Fila cheia: o cliente deve tentar de novo mais tarde
+            self._responder(503, {"erro": "Fila cheia."}, cabecalhos={"Retry-After": "1"})
+            return
+        try:
+            resposta = futuro.result(timeout=self.server.tempo_limite)
+        except TempoEsgotado:
+            self._responder(504, {"erro": "Tempo limite excedido."})
+            return
+        except Exception as erro:
+            self._responder(500, {"erro": f"{type(erro).__name__}: {erro}"})
+            return
+        if resposta["status"] != "ok":
+            self._responder(422, resposta_json(resposta))
+        elif parametros.get("formato") == "binario":
+            self._responder(200, resposta_binaria(resposta), "application/octet-stream")
+        else:
+            self._responder(200, resposta_json(resposta))
+
+# Função para validar os parâmetros do pedido HTTP
+def _montar_pedido(parametros, corpo, tipo_conteudo):
+    from ImgProc_BatchProcessing import MODOS_DETECCAO, PIPELINES
+
+    pipeline = parametros.get("pipeline", "monitoramento")
+    if pipeline not in PIPELINES:
+        raise ValueError(f"Pipeline desconhecido: {pipeline}")
+    modo = parametros.get("modo_distancias", "todos")
+    if modo not in MODOS_SERVICO:
+        raise ValueError(f"Modo de distância desconhecido: {modo}")
+    deteccao = parametros.get("deteccao", "completa")
+    if deteccao not in MODOS_DETECCAO:
+        raise ValueError(f"Modo de detecção desconhecido: {deteccao} (use {', '.join(MODOS_DETECCAO)})")
+    opcoes = {"modo_distancias": modo, "deteccao": deteccao}
+    if parametros.get("detector"):
+        from ImgProc_Detectors import DETECTORES
+        if parametros["detector"] not in DETECTORES:
+            raise ValueError(f"Detector desconhecido: {parametros['detector']}")
+        opcoes["detector"] = parametros["detector"]
+    if parametros.get("subpixel"):
+        if parametros["subpixel"] not in ("cantos", "centroide"):
+            raise ValueError(f"Refinamento sub-pixel desconhecido: {parametros['subpixel']} (use cantos ou centroide)")
+        opcoes["subpixel"] = parametros["subpixel"]
+    try:
+        if "raio" in parametros:
+            opcoes["raio"] = float(parametros["raio"])
+        if "vizinhos" in parametros:
+            opcoes["vizinhos"] = int(parametros["vizinhos"])
+    except ValueError:
+        raise ValueError("Os parâmetros raio e vizinhos devem ser numéricos.") from None
+    if modo == "raio" and "raio" not in opcoes:
+        raise ValueError("O modo 'raio' exige o parâmetro raio.")
+    if modo == "vizinhos" and "vizinhos" not in opcoes:
+        raise ValueError("O modo 'vizinhos' exige o parâmetro vizinhos.")
+
+    if tipo_conteudo.startswith("application/json"):
+        try:
+            caminho = json.loads(corpo)["caminho"]
+        except (ValueError, KeyError, TypeError):
+            raise ValueError('O corpo JSON deve ser {"caminho": "..."}.') from None
+        return {"pipeline": pipeline, "opcoes": opcoes, "caminho": os.path.abspath(caminho), "bytes": None}
+    if not corpo:
+        raise ValueError("Corpo vazio: envie os bytes da imagem ou {\"caminho\": \"...\"}.")
+    return {"pipeline": pipeline, "opcoes": opcoes, "caminho": None, "bytes": corpo}
+
+def servir(endereco=ENDERECO_PADRAO, porta=PORTA_PADRAO, tempo_limite=60.0, **opcoes_servico):
+    # A porta é reservada antes de iniciar os workers, para falhar cedo se já estiver em uso
+    servidor = ThreadingHTTPServer((endereco, porta), Tratador)
+    servidor.daemon_threads = True
+    servidor.tempo_limite = tempo_limite
+    servidor.servico = servico = ServicoDeteccao(**opcoes_servico)
+    # SIGTERM encerra o serviço do mesmo modo que Ctrl+C
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        print(f"Aquecendo {servico.processos} processos...")
+        servico.aquecer()
+        print(f"Serviço disponível em http://{endereco}:{servidor.server_port}")
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        servico.encerrar()
+        print(json.dumps(servico.metricas.resumo(), ensure_ascii=False, indent=1))
+
+# Função do cliente: envia uma imagem (pelo caminho ou pelos bytes) e tenta de novo enquanto a fila estiver cheia
+def enviar_imagem(url, caminho_imagem, parametros=None, enviar_bytes=False, tentativas=10):
+    consulta = urllib.parse.urlencode(parametros or {})
+    if enviar_bytes:
+        with open(caminho_imagem, "rb") as arquivo:
+            corpo, tipo = arquivo.read(), "application/octet-stream"
+    else:
+        corpo, tipo = json.dumps({"caminho": os.path.abspath(caminho_imagem)}).encode(), "application/json"
+
+    for tentativa in range(tentativas):
+        pedido = urllib.request.Request(f"{url}/detectar?{consulta}", data=corpo, headers={"Content-Type": tipo})
+        try:
+            with urllib.request.urlopen(pedido) as resposta:
+                return resposta.status, resposta.headers.get("Content-Type", ""), resposta.read()
+        except urllib.error.HTTPError as erro:
+            if erro.code != 503 or tentativa == tentativas - 1:
+                return erro.code, erro.headers.get("Content-Type", ""), erro.read()
+            time.sleep(float(erro.headers.get("Retry-After", 1)))
+
+# Função para montar os parâmetros da URL a partir das opções do cliente (validados pelo serviço)
+def parametros_cliente(args):
+    parametros = {"pipeline": args.pipeline, "formato": args.formato}
+    for nome in ("modo_distancias", "deteccao", "detector", "subpixel"):
+        if getattr(args, nome):
+            parametros[nome] = getattr(args, nome)
+    for nome in ("raio", "vizinhos"):
+        if getattr(args, nome) is not None:
+            parametros[nome] = getattr(args, nome)
+    return parametros
+
+def cliente(args):
+    parametros = parametros_cliente(args)
+    if args.saida:
+        os.makedirs(args.saida, exist_ok=True)
+
+    falhas = 0
+    for caminho_imagem in args.imagens:
+        inicio = time.perf_counter()
+        codigo, tipo, corpo = enviar_imagem(args.url, caminho_imagem, parametros, args.enviar_bytes)
+        latencia = (time.perf_counter() - inicio) * 1000
+        if codigo != 200:
+            falhas += 1
+            print(f"[erro] {caminho_imagem}: HTTP {codigo} {corpo.decode(errors='replace')}")
+            continue
+        if tipo.startswith("application/json"):
+            dados = json.loads(corpo)
+            print(f"[ok]   {caminho_imagem}: {len(dados['pontos'])} pontos, {len(dados['distancias'])} distâncias "
+                  f"({latencia:.1f} ms)")
+        else:
+            print(f"[ok]   {caminho_imagem}: {len(corpo)} bytes ({latencia:.1f} ms)")
+        if args.saida:
+            nome_arquivo = os.path.splitext(os.path.basename(caminho_imagem))[0]
+            extensao = ".json" if tipo.startswith("application/json") else ".npz"
+            with open(os.path.join(args.saida, nome_arquivo + extensao), "wb") as arquivo:
+                arquivo.write(corpo)
+    return 0 if falhas == 0 else 2
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serviço local de detecção mantido em execução e seu cliente.")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    servidor = subparsers.add_parser("servidor", help="Inicia o serviço HTTP local")
+    servidor.add_argument("--endereco", default=ENDERECO_PADRAO)
+    servidor.add_argument("--porta", type=int, default=PORTA_PADRAO)
+    servidor.add_argument("--processos", type=int, default=None)
+    servidor.add_argument("--tamanho-fila", type=int, default=64,
+                          help="Pedidos aguardando além deste limite recebem HTTP 503")
+    servidor.add_argument("--tamanho-lote", type=int, default=4, help="Pedidos enviados juntos a um worker")
+    servidor.add_argument("--espera-lote-ms", type=float, default=5.0, help="Espera máxima para completar um lote")
+    servidor.add_argument("--tempo-limite", type=float, default=60.0, help="Tempo máximo por pedido (s)")
+    servidor.add_argument("--cache", help="Pasta do cache de etapas em disco (o cache em memória está sempre ativo)")
+    servidor.add_argument("--limite-cache-mb", type=int, default=2048)
+
+    cliente_parser = subparsers.add_parser("cliente", help="Envia imagens ao serviço")
+    # O cliente não importa o OpenCV nem os pipelines: só a biblioteca padrão
+    cliente_parser.add_argument("imagens", nargs="+", help="Arquivos de imagem")
+    cliente_parser.add_argument("--url", default=f"http://{ENDERECO_PADRAO}:{PORTA_PADRAO}")
+    cliente_parser.add_argument("--pipeline", choices=("monitoramento", "distancias"), default="monitoramento")
+    cliente_parser.add_argument("--modo-distancias", choices=MODOS_SERVICO, help="Só para o pipeline 'distancias'")
+    cliente_parser.add_argument("--raio", type=float)
+    cliente_parser.add_argument("--vizinhos", type=int)
+    cliente_parser.add_argument("--deteccao", choices=("completa", "piramide", "blocos"),
+                                help="Candidatos na imagem inteira, na pirâmide reduzida ou em blocos")
+    cliente_parser.add_argument("--detector", help="Detector registrado no serviço (ver ImgProc_Detectors.py)")
+    cliente_parser.add_argument("--subpixel", choices=("cantos", "centroide"), help="Refinamento sub-pixel dos pontos")
+    cliente_parser.add_argument("--formato", choices=("json", "binario"), default="json")
+    cliente_parser.add_argument("--enviar-bytes", action="store_true",
+                                help="Envia o conteúdo da imagem em vez do caminho (serviço em outra pasta/máquina)")
+    cliente_parser.add_argument("--saida", help="Pasta onde gravar as respostas (.json ou .npz)")
+    args = parser.parse_args(argv)
+
+    if args.comando == "cliente":
+        return cliente(args)
+    servir(args.endereco, args.porta, args.tempo_limite, processos=args.processos, tamanho_fila=args.tamanho_fila,
+           tamanho_lote=args.tamanho_lote, espera_lote_ms=args.espera_lote_ms, pasta_cache=args.cache,
+           limite_cache_mb=args.limite_cache_mb)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
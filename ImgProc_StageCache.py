@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+
+# Versão do formato das chaves; mudar sempre que uma etapa em cache mudar de comportamento
+VERSAO_CACHE = 1
+
+# Função para calcular o hash do conteúdo de uma imagem (forma, tipo e pixels)
+def hash_imagem(imagem):
+    resumo = hashlib.blake2b(digest_size=20)
+    resumo.update(f"{imagem.shape}|{imagem.dtype.str}".encode())
+    resumo.update(np.ascontiguousarray(imagem).data)
+    return resumo.hexdigest()
+
+# Função para derivar a chave de uma etapa a partir da chave da entrada e dos parâmetros
+def chave_etapa(etapa, chave_entrada, parametros):
+    texto = json.dumps([VERSAO_CACHE, etapa, chave_entrada, parametros], sort_keys=True, default=str)
+    return hashlib.blake2b(texto.encode(), digest_size=20).hexdigest()
+
+# Cache de resultados intermediários do pré-processamento, em dois níveis:
+# memória (LRU limitado em bytes) e disco (arquivos .npy, removidos do mais antigo para o
+# mais novo quando o tamanho total passa do limite). Pode ser usado por várias threads do mesmo processo
+# (ex.: as regiões de interesse de uma imagem); o LRU em memória é protegido por uma trava.
+class CacheEtapas:
+    def __init__(self, pasta=None, limite_memoria=256 * 1024 ** 2, limite_disco=2 * 1024 ** 3):
+        self.pasta = pasta
+        self.limite_memoria = limite_memoria
+        self.limite_disco = limite_disco
+        self.memoria = OrderedDict()
+        self.bytes_memoria = 0
+        self.bytes_disco = None
+        self.acertos = 0
+        self.faltas = 0
+        self._trava = threading.Lock()
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+
+    def _caminho(self, chave):
+        return os.path.join(self.pasta, chave[:2], f"{chave}.npy")
+
+    def _guardar_memoria(self, chave, valor):
+        if valor.nbytes > self.limite_memoria:
+            return
+        with self._trava:
+            if chave in self.memoria:
+                self.memoria.move_to_end(chave)
+                return
+            self.memoria[chave] = valor
+            self.bytes_memoria += valor.nbytes
+            while self.bytes_memoria > self.limite_memoria:
+                _, removido = self.memoria.popitem(last=False)
+                self.bytes_memoria -= removido.nbytes
+
+    # Lista os arquivos do disco (caminho, tamanho, último acesso)
+    def _arquivos_disco(self):
+        arquivos = []
+        for raiz, _, nomes in os.walk(self.pasta):
+            for nome in nomes:
+                if nome.endswith(".npy"):
+                    caminho = os.path.join(raiz, nome)
+                    try:
+                        info = os.stat(caminho)
+                    except FileNotFoundError:
+                        continue
+                    arquivos.append((caminho, info.st_size, info.st_mtime))
+        return arquivos
+
+    def _limitar_disco(self):
+        arquivos = self._arquivos_disco()
+        self.bytes_disco = sum(tamanho for _, tamanho, _ in arquivos)
+        for caminho, tamanho, _ in sorted(arquivos, key=lambda arquivo: arquivo[2]):
+            if self.bytes_disco <= self.limite_disco:
+                break
+            try:
+                os.remove(caminho)
+            except FileNotFoundError:
+                pass
+            self.bytes_disco -= tamanho
+
+    def _guardar_disco(self, chave, valor):
+        caminho = self._caminho(chave)
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        # Gravação atômica: outros processos nunca leem um arquivo pela metade
+        temporario = f"{caminho}.{uuid.uuid4().hex}.tmp"
+        with open(temporario, "wb") as arquivo:
+            np.save(arquivo, valor)
+        os.replace(temporario, caminho)
+
+        with self._trava:
+            if self.bytes_disco is None:
+                self._limitar_disco()
+            else:
+                self.bytes_disco += os.path.getsize(caminho)
+                if self.bytes_disco > self.limite_disco:
+                    self._limitar_disco()
+
+    def _ler_disco(self, chave):
+        caminho = self._caminho(chave)
+        try:
+            valor = np.load(caminho)
+        except (FileNotFoundError, ValueError, OSError):
+            return None
+        # Atualiza a data do arquivo para que a remoção siga a ordem de uso
+        try:
+            os.utime(caminho)
+        except FileNotFoundError:
+            pass
+        return valor
+
+    def obter(self, chave):
+        with self._trava:
+            if chave in self.memoria:
+                self.memoria.move_to_end(chave)
+                return self.memoria[chave]
+        if self.pasta:
+            valor = self._ler_disco(chave)
+            if valor is not None:
+                valor.flags.writeable = False
+                self._guardar_memoria(chave, valor)
+                return valor
+        return None
+
+    def guardar(self, chave, valor):
+        valor = np.asarray(valor)
+        valor.flags.writeable = False
+        self._guardar_memoria(chave, valor)
+        if self.pasta:
+            self._guardar_disco(chave, valor)
+
+    # Função para obter o resultado de uma etapa do cache ou calculá-lo.
+    # Retorna (resultado, chave); a chave alimenta a etapa seguinte da cadeia.
+    # Os arrays retornados são somente leitura, pois podem ser compartilhados.
+    def obter_ou_calcular(self, etapa, chave_entrada, parametros, funcao, *args):
+        chave = chave_etapa(etapa, chave_entrada, parametros)
+        valor = self.obter(chave)
+        if valor is not None:
+            self.acertos += 1
+            return valor, chave
+        self.faltas += 1
+        valor = funcao(*args)
+        self.guardar(chave, valor)
+        return valor, chave
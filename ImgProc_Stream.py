@@ -0,0 +1,268 @@
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+import pandas as pd
+
+from ImgProc_StructuralMonitoring import detectar_cantos_com_filtro, filtrar_pontos
+
+# Políticas quando a fila de quadros está cheia: "nenhum" bloqueia a leitura (arquivos: nenhum quadro
+# é perdido), "antigos" descarta o quadro mais antigo da fila e "novos" descarta o quadro recém-lido
+POLITICAS_DESCARTE = ("nenhum", "antigos", "novos")
+
+COLUNAS_PONTOS = ("Quadro", "Tempo (s)", "Ponto", "X", "Y")
+COLUNAS_QUADROS = ("Quadro", "Tempo (s)", "Status", "Pontos", "Espera (ms)", "Processamento (ms)")
+
+# Função para abrir a fonte de quadros: índice de câmera, arquivo de vídeo ou sequência de imagens
+# (diretório, glob ou padrão do OpenCV como "quadro_%04d.png"). Retorna (gerador de (tempo_s, imagem), ao_vivo).
+def abrir_fonte(fonte, fps_sequencia=1.0):
+    if fonte.isdigit():
+        return _quadros_captura(cv2.VideoCapture(int(fonte)), ao_vivo=True), True
+
+    if os.path.isdir(fonte) or any(c in fonte for c in "*?["):
+        from ImgProc_BatchProcessing import listar_imagens
+        caminhos = listar_imagens([fonte])
+        if not caminhos:
+            raise ValueError(f"Nenhuma imagem encontrada em '{fonte}'.")
+        return _quadros_sequencia(caminhos, fps_sequencia), False
+
+    if not os.path.exists(fonte) and "%" not in fonte:
+        raise ValueError(f"Fonte não encontrada: {fonte}")
+    return _quadros_captura(cv2.VideoCapture(fonte), ao_vivo=False), False
+
+def _quadros_captura(captura, ao_vivo):
+    if not captura.isOpened():
+        raise ValueError("Não foi possível abrir a fonte de vídeo.")
+    inicio = time.perf_counter()
+    try:
+        while True:
+            ok, imagem = captura.read()
+            if not ok:
+                break
+            # Vídeo: instante do quadro no arquivo; câmera: tempo decorrido desde o início
+            tempo = time.perf_counter() - inicio if ao_vivo else captura.get(cv2.CAP_PROP_POS_MSEC) / 1000
+            yield tempo, imagem
+    finally:
+        captura.release()
+
+def _quadros_sequencia(caminhos, fps):
+    for indice, caminho in enumerate(caminhos):
+        imagem = cv2.imread(caminho)
+        if imagem is None:
+            print(f"Erro ao carregar a imagem: {caminho}")
+            continue
+        yield indice / fps, imagem
+
+def _ms(segundos):
+    return None if segundos is None else round(segundos * 1000, 2)
+
+# Função para nomear os CSVs a partir da fonte (câmera, vídeo, diretório ou padrão de arquivos)
+def nome_fonte(fonte):
+    if fonte.isdigit():
+        return f"camera_{fonte}"
+    nome = os.path.basename(os.path.normpath(fonte))
+    if any(c in nome for c in "*?[%"):
+        nome = os.path.basename(os.path.dirname(os.path.normpath(fonte)))
+    return os.path.splitext(nome)[0] or "fluxo"
+
+# Monitoramento contínuo: uma thread lê os quadros para uma fila limitada, várias threads detectam os pontos
+# (o OpenCV libera o GIL, então decodificação e detecção se sobrepõem) e a thread principal grava os resultados
+# na ordem dos quadros, reordenando-os num buffer pequeno. A memória fica limitada pelo tamanho das filas e do
+# buffer, qualquer que seja a duração do vídeo.
+class MonitorFluxo:
+    def __init__(self, quadros, pasta_saida, nome, threads=2, tamanho_fila=8, politica="nenhum",
+                 orcamento_ms=None, limiar_distancia=20, max_quadros=None, subpixel=None, limite_reordenacao=256):
+        self.quadros = quadros
+        self.threads = max(1, threads)
+        self.fila = queue.Queue(maxsize=max(1, tamanho_fila))
+        self.resultados = queue.Queue(maxsize=max(1, tamanho_fila) * 2)
+        self.politica = politica
+        self.orcamento = orcamento_ms / 1000 if orcamento_ms else None
+        self.limiar_distancia = limiar_distancia
+        self.max_quadros = max_quadros
+        self.subpixel = subpixel
+        self.parar = threading.Event()
+        self.lidos = self.descartados_fila = 0
+        self.contagem_status = {}
+        self.latencias = deque(maxlen=5000)
+        # Resultados que chegaram antes de um quadro anterior, aguardando para serem gravados em ordem
+        # (só os pontos ficam retidos, não as imagens)
+        self.pendentes = {}
+        self.proximo = 0
+        self.limite_reordenacao = max(1, limite_reordenacao)
+        os.makedirs(pasta_saida, exist_ok=True)
+        self.caminho_pontos = os.path.join(pasta_saida, f"{nome}_pontos.csv")
+        self.caminho_quadros = os.path.join(pasta_saida, f"{nome}_quadros.csv")
+
+    # Thread produtora: lê os quadros e aplica a política de descarte quando a fila está cheia
+    def _produzir(self):
+        try:
+            for indice, (tempo, imagem) in enumerate(self.quadros):
+                if self.parar.is_set() or (self.max_quadros and indice >= self.max_quadros):
+                    break
+                self.lidos += 1
+                item = (indice, tempo, time.perf_counter(), imagem)
+                if self.politica == "nenhum":
+                    while not self.parar.is_set():
+                        try:
+                            self.fila.put(item, timeout=0.1)
+                            break
+                        except queue.Full:
+                            continue
+                elif self.politica == "novos":
+                    try:
+                        self.fila.put_nowait(item)
+                    except queue.Full:
+                        self._descartar(indice, tempo)
+                else:
+                    while True:
+                        try:
+                            self.fila.put_nowait(item)
+                            break
+                        except queue.Full:
+                            try:
+                                antigo = self.fila.get_nowait()
+                            except queue.Empty:
+                                continue
+                            self._descartar(antigo[0], antigo[1])
+        finally:
+            for _ in range(self.threads):
+                self.fila.put(None)
+
+    def _descartar(self, indice, tempo):
+        self.descartados_fila += 1
+        self.resultados.put((indice, tempo, "descartado_fila", None, None, None))
+
+    # Threads de detecção: quadros que esperaram mais que o orçamento de latência são descartados
+    def _processar(self):
+        while True:
+            item = self.fila.get()
+            if item is None:
+                self.resultados.put(None)
+                return
+            indice, tempo, chegada, imagem = item
+            espera = time.perf_counter() - chegada
+            if self.orcamento is not None and espera > self.orcamento:
+                self.resultados.put((indice, tempo, "descartado_atraso", None, espera, None))
+                continue
+            inicio = time.perf_counter()
+            try:
+                pontos = np.asarray(filtrar_pontos(detectar_cantos_com_filtro(imagem, subpixel=self.subpixel),
+                                                   self.limiar_distancia), dtype=np.float32).reshape(-1, 2)
+                status = "ok"
+            except Exception as erro:
+                pontos, status = None, f"erro: {erro}"
+            self.resultados.put((indice, tempo, status, pontos, espera, time.perf_counter() - inicio))
+
+    # Função para gravar os resultados na ordem dos quadros. Se o buffer passar do limite (um quadro travado
+    # na detecção), grava a partir do menor quadro pendente; o atrasado é gravado fora de ordem quando chegar.
+    def _reordenar(self, resultado, arquivo_pontos, arquivo_quadros):
+        if resultado[0] < self.proximo:
+            self._gravar(resultado, arquivo_pontos, arquivo_quadros)
+            return
+        self.pendentes[resultado[0]] = resultado
+        if len(self.pendentes) > self.limite_reordenacao:
+            self.proximo = min(self.pendentes)
+        while self.proximo in self.pendentes:
+            self._gravar(self.pendentes.pop(self.proximo), arquivo_pontos, arquivo_quadros)
+            self.proximo += 1
+
+    # Função para gravar um resultado nos CSVs abertos (acrescentando linhas, sem reter os anteriores)
+    def _gravar(self, resultado, arquivo_pontos, arquivo_quadros):
+        indice, tempo, status, pontos, espera, processamento = resultado
+        chave = status.split(":")[0]
+        self.contagem_status[chave] = self.contagem_status.get(chave, 0) + 1
+        if pontos is not None and len(pontos):
+            pd.DataFrame({COLUNAS_PONTOS[0]: indice, COLUNAS_PONTOS[1]: tempo,
+                          COLUNAS_PONTOS[2]: np.arange(1, len(pontos) + 1), COLUNAS_PONTOS[3]: pontos[:, 0],
+                          COLUNAS_PONTOS[4]: pontos[:, 1]}).to_csv(arquivo_pontos, header=False, index=False,
+                                                                     float_format="%.3f")
+        if espera is not None and processamento is not None:
+            self.latencias.append(espera + processamento)
+        pd.DataFrame([(indice, tempo, status, None if pontos is None else len(pontos), _ms(espera),
+                       _ms(processamento))], columns=list(COLUNAS_QUADROS)).to_csv(
+            arquivo_quadros, header=False, index=False, float_format="%.3f")
+
+    # Função para executar o monitoramento até o fim da fonte (ou Ctrl+C); retorna o resumo
+    def executar(self):
+        produtor = threading.Thread(target=self._produzir, name="leitura", daemon=True)
+        workers = [threading.Thread(target=self._processar, name=f"deteccao-{i}", daemon=True)
+                   for i in range(self.threads)]
+        inicio = time.perf_counter()
+        with open(self.caminho_pontos, "w", newline="", encoding="utf-8") as arquivo_pontos, \
+                open(self.caminho_quadros, "w", newline="", encoding="utf-8") as arquivo_quadros:
+            pd.DataFrame(columns=list(COLUNAS_PONTOS)).to_csv(arquivo_pontos, index=False)
+            pd.DataFrame(columns=list(COLUNAS_QUADROS)).to_csv(arquivo_quadros, index=False)
+            produtor.start()
+            for worker in workers:
+                worker.start()
+            ativos = self.threads
+            while ativos:
+                try:
+                    resultado = self.resultados.get()
+                except KeyboardInterrupt:
+                    # Interrompe a leitura e termina de gravar os quadros que já estavam na fila
+                    self.parar.set()
+                    continue
+                if resultado is None:
+                    ativos -= 1
+                    continue
+                self._reordenar(resultado, arquivo_pontos, arquivo_quadros)
+                arquivo_pontos.flush()
+                arquivo_quadros.flush()
+            # Quadros lidos mas não enfileirados (Ctrl+C) deixam lacunas: grava o que restou, em ordem
+            for indice in sorted(self.pendentes):
+                self._gravar(self.pendentes.pop(indice), arquivo_pontos, arquivo_quadros)
+        produtor.join()
+        return self.resumo(time.perf_counter() - inicio)
+
+    def resumo(self, tempo_total):
+        latencias = np.asarray(self.latencias) * 1000
+        return {"lidos": self.lidos, "status": dict(self.contagem_status), "descartados_fila": self.descartados_fila,
+                "tempo_s": tempo_total, "quadros_por_s": self.contagem_status.get("ok", 0) / tempo_total,
+                "latencia_p50_ms": float(np.percentile(latencias, 50)) if len(latencias) else None,
+                "latencia_p95_ms": float(np.percentile(latencias, 95)) if len(latencias) else None}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Monitoramento contínuo de vídeo, câmera ou sequência de imagens.")
+    parser.add_argument("fonte", help="Arquivo de vídeo, índice da câmera (0, 1, ...), diretório ou glob de imagens")
+    parser.add_argument("--saida", default="csv_fluxo", help="Pasta dos CSVs")
+    parser.add_argument("--threads", type=int, default=max(1, (os.cpu_count() or 2) - 1),
+                        help="Threads de detecção")
+    parser.add_argument("--tamanho-fila", type=int, default=8, help="Quadros aguardando detecção (limita a memória)")
+    parser.add_argument("--descarte", choices=POLITICAS_DESCARTE,
+                        help="Política com a fila cheia (padrão: 'antigos' para câmera, 'nenhum' para arquivos)")
+    parser.add_argument("--orcamento-ms", type=float,
+                        help="Descarta quadros que esperaram mais que isso na fila antes da detecção")
+    parser.add_argument("--max-quadros", type=int, help="Encerra após ler esta quantidade de quadros")
+    parser.add_argument("--fps-sequencia", type=float, default=1.0,
+                        help="Quadros por segundo atribuídos às sequências de imagens (coluna de tempo)")
+    parser.add_argument("--subpixel", choices=("cantos", "centroide"),
+                        help="Refina os pontos com precisão sub-pixel (cornerSubPix ou centroide ponderado)")
+    args = parser.parse_args(argv)
+
+    try:
+        quadros, ao_vivo = abrir_fonte(args.fonte, args.fps_sequencia)
+    except ValueError as erro:
+        print(erro)
+        return 1
+    politica = args.descarte or ("antigos" if ao_vivo else "nenhum")
+    monitor = MonitorFluxo(quadros, args.saida, nome_fonte(args.fonte), args.threads, args.tamanho_fila, politica,
+                           args.orcamento_ms, max_quadros=args.max_quadros, subpixel=args.subpixel)
+    resumo = monitor.executar()
+    print(f"\nQuadros lidos: {resumo['lidos']} - {resumo['status']} em {resumo['tempo_s']:.2f} s "
+          f"({resumo['quadros_por_s']:.2f} quadros/s processados)")
+    if resumo["latencia_p50_ms"] is not None:
+        print(f"Latência (espera + detecção): p50 {resumo['latencia_p50_ms']:.1f} ms, "
+              f"p95 {resumo['latencia_p95_ms']:.1f} ms")
+    print(f"Resultados em '{monitor.caminho_pontos}' e '{monitor.caminho_quadros}'")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,88 +1,79 @@
+import argparse
 import cv2
-import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-from tkinter import Tk
-from tkinter.filedialog import askopenfilename
 import os
-import math
-
-# Função para ajustar contraste e brilho
-def ajustar_contraste_brilho(imagem, alpha=1.2, beta=20):
-    return cv2.convertScaleAbs(imagem, alpha=alpha, beta=beta)
+from ImgProc_Deduplication import filtrar_pontos_proximos
+from ImgProc_DistanceEngine import gerar_distancias, blocos_para_lista
+from ImgProc_Instrumentation import adicionar_argumentos, etapa, sessao
+from ImgProc_Overlay import caminho_figura, salvar_sobreposicao
+from ImgProc_Pipeline import (ajustar_configuracao, ajustar_contraste_brilho, com_subpixel, executar, localizar,
+                              preparar, selecionar_imagem, suavizar)
+import ImgProc_Pipeline as pipeline
+
+# API pública do script (as funções comuns vêm de ImgProc_Pipeline e são importadas de lá)
+__all__ = ["LIMIAR_FILTRO", "configuracao_deteccao", "melhorar_imagem", "preparar_bordas",
+           "localizar_cantos_nas_bordas", "detectar_cantos_cinza", "detectar_cantos_com_filtro", "filtrar_pontos",
+           "calcular_distancias_a_partir_do_inicial", "salvar_coordenadas", "salvar_distancias",
+           "exibir_imagem_com_pontos", "main"]
+
+# Limiar do filtro de pontos próximos aplicado depois da detecção (script, lote e varredura de parâmetros)
+LIMIAR_FILTRO = 20
+
+# Configuração do preset "monitoramento" de ImgProc_Pipeline com os parâmetros informados:
+# equalização, contraste e brilho, suavização, bordas de Canny e cantos restritos às bordas dilatadas.
+# Com subpixel ("cantos" ou "centroide"), os pontos são refinados na imagem em tons de cinza em vez de truncados.
+def configuracao_deteccao(maxCorners=1000, qualityLevel=0.1, minDistance=20, alpha=1.5, beta=30, subpixel=None):
+    configuracao = ajustar_configuracao(
+        "monitoramento", contraste={"alpha": alpha, "beta": beta},
+        cantos={"maxCorners": maxCorners, "qualityLevel": qualityLevel, "minDistance": minDistance})
+    return com_subpixel(configuracao, subpixel) if subpixel else configuracao
 
 # Função para melhorar a imagem
-def melhorar_imagem(imagem_cinza):
-    imagem_equalizada = cv2.equalizeHist(imagem_cinza)
-    imagem_ajustada = ajustar_contraste_brilho(imagem_equalizada, alpha=1.5, beta=30)
-    imagem_suavizada = cv2.GaussianBlur(imagem_ajustada, (5, 5), 0)
-    return imagem_suavizada
-
-# Função para detectar bordas
-def detectar_bordas(imagem):
-    return cv2.Canny(imagem, threshold1=50, threshold2=150)
-
-# Função para detectar cantos com filtros avançados
-def detectar_cantos_com_filtro(imagem):
-    imagem_cinza = cv2.cvtColor(imagem, cv2.COLOR_BGR2GRAY)
-    imagem_melhorada = melhorar_imagem(imagem_cinza)
-    bordas = detectar_bordas(imagem_melhorada)
-    mascara = cv2.dilate(bordas, None, iterations=2)
-    
-    pontos = cv2.goodFeaturesToTrack(
-        bordas,
-        maxCorners=1000,          # Limitar número de cantos detectados
-        qualityLevel=0.1,       # Tornar mais seletivo
-        minDistance=20,         # Distância mínima entre pontos
-        mask=mascara            # Usar máscara para restringir áreas de interesse
-    )
+def melhorar_imagem(imagem_cinza, alpha=1.5, beta=30):
+    return suavizar(ajustar_contraste_brilho(cv2.equalizeHist(imagem_cinza), alpha=alpha, beta=beta))
+
+# Função para obter as bordas e a máscara dilatada, reaproveitando o preparo do cache quando houver
+def preparar_bordas(imagem_cinza, cache=None, alpha=1.5, beta=30):
+    return preparar(imagem_cinza, configuracao_deteccao(alpha=alpha, beta=beta), cache)
+
+# Função para localizar os cantos no mapa de bordas já preparado (retorna array N x 2 em float32)
+def localizar_cantos_nas_bordas(bordas, mascara, maxCorners=1000, qualityLevel=0.1, minDistance=20):
+    return localizar(bordas, mascara, [{"etapa": "cantos", "maxCorners": maxCorners, "qualityLevel": qualityLevel,
+                                        "minDistance": minDistance}])
+
+# Função para detectar cantos em uma imagem já em tons de cinza (retorna array N x 2 em float32)
+def detectar_cantos_cinza(imagem_cinza, maxCorners=1000, qualityLevel=0.1, minDistance=20, cache=None,
+                          alpha=1.5, beta=30):
+    bordas, mascara = preparar_bordas(imagem_cinza, cache, alpha, beta)
+    return localizar_cantos_nas_bordas(bordas, mascara, maxCorners, qualityLevel, minDistance)
+
+# Função para detectar cantos com filtros avançados (retorna array N x 2: int32, ou float32 com subpixel)
+def detectar_cantos_com_filtro(imagem, maxCorners=1000, qualityLevel=0.1, minDistance=20, cache=None,
+                               alpha=1.5, beta=30, subpixel=None):
+    configuracao = configuracao_deteccao(maxCorners, qualityLevel, minDistance, alpha, beta, subpixel)
+    pontos = executar(imagem, configuracao, cache)
     
-    if pontos is None:
+    if len(pontos) == 0:
         print("Nenhum ponto detectado após aplicação do filtro.")
-        return []
-    
-    pontos = np.int32(pontos)
-    return [(p[0][0], p[0][1]) for p in pontos]
+    return pontos
 
 # Função para filtrar pontos muito próximos
 def filtrar_pontos(coordenadas_pontos, limiar_distancia=15):
-    pontos_filtrados = []
-    for ponto in coordenadas_pontos:
-        if not pontos_filtrados:
-            pontos_filtrados.append(ponto)
-        elif all(calcular_distancia(ponto, p) > limiar_distancia for p in pontos_filtrados):
-            pontos_filtrados.append(ponto)
+    with etapa("dedup") as registro:
+        pontos_filtrados = filtrar_pontos_proximos(coordenadas_pontos, limiar_distancia, inclusivo=True)
+        registro["pontos"] = len(pontos_filtrados)
     return pontos_filtrados
 
-# Função para calcular distância euclidiana entre dois pontos
-def calcular_distancia(pontoA, pontoB):
-    return math.sqrt((pontoB[0] - pontoA[0]) ** 2 + (pontoB[1] - pontoA[1]) ** 2)
-
 # Função para calcular distâncias a partir do primeiro ponto
 def calcular_distancias_a_partir_do_inicial(coordenadas_pontos):
-    distancias = []
-    if coordenadas_pontos:
-        ponto_inicial = coordenadas_pontos[0]
-        for i, ponto in enumerate(coordenadas_pontos):
-            if i == 0:
-                continue
-            distancia = calcular_distancia(ponto_inicial, ponto)
-            distancias.append((1, i + 1, distancia))
-    return distancias
+    return blocos_para_lista(gerar_distancias(coordenadas_pontos, modo="inicial"))
 
 # Função para salvar coordenadas em CSV
-def salvar_coordenadas(coordenadas_pontos, caminho_imagem):
-    pasta_csv = "csv_coordenadas"
-    os.makedirs(pasta_csv, exist_ok=True)
-    nome_arquivo = os.path.splitext(os.path.basename(caminho_imagem))[0]
-    nome_csv = os.path.join(pasta_csv, f"{nome_arquivo}_coordenadas.csv")
-    df_pontos = pd.DataFrame(coordenadas_pontos, columns=["X", "Y"])
-    df_pontos.to_csv(nome_csv, index=False)
-    print(f"Coordenadas salvas em '{nome_csv}'")
+def salvar_coordenadas(coordenadas_pontos, caminho_imagem, pasta_csv="csv_coordenadas"):
+    pipeline.salvar_coordenadas(coordenadas_pontos, caminho_imagem, pasta_csv, "_coordenadas")
 
 # Função para salvar distâncias em CSV
-def salvar_distancias(distancias, caminho_imagem):
-    pasta_csv = "csv_distancias"
+def salvar_distancias(distancias, caminho_imagem, pasta_csv="csv_distancias"):
     os.makedirs(pasta_csv, exist_ok=True)
     nome_arquivo = os.path.splitext(os.path.basename(caminho_imagem))[0]
     nome_csv = os.path.join(pasta_csv, f"{nome_arquivo}_distancias.csv")
@@ -90,51 +81,70 @@ def salvar_distancias(distancias, caminho_imagem):
     df_distancias.to_csv(nome_csv, index=False)
     print(f"Distâncias salvas em '{nome_csv}'")
 
-# Função para exibir imagem com pontos detectados
+# Função para exibir imagem com pontos detectados (visualizador opcional; os pontos já vêm desenhados na imagem)
 def exibir_imagem_com_pontos(imagem, coordenadas_pontos):
-    plt.imshow(cv2.cvtColor(imagem, cv2.COLOR_BGR2RGB))
-    for (x, y) in coordenadas_pontos:
-        plt.plot(x, y, 'gx')
-    plt.gca().invert_yaxis()
-    plt.title("Pontos Detectados")
-    plt.show()
+    pipeline.exibir_imagem_com_pontos(imagem, coordenadas_pontos)
 
 # Função principal
-def main():
-    Tk().withdraw()
-    caminho_imagem = askopenfilename(title="Selecione uma imagem", filetypes=[("Imagens", "*.jpg;*.jpeg;*.png;*.bmp")])
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Detecta os pontos da estrutura e calcula as distâncias a partir do ponto inicial.")
+    parser.add_argument("imagem", nargs="?", help="Imagem a processar (se omitida, abre a janela de seleção)")
+    parser.add_argument("--verboso", action="store_true", help="Exibe cada ponto e cada distância no console")
+    parser.add_argument("--exibir", action="store_true", help="Abre a imagem com os pontos no matplotlib")
+    parser.add_argument("--ids", action="store_true", help="Escreve o número de cada ponto na figura")
+    parser.add_argument("--pasta-figuras", default="sobreposicoes", help="Pasta da figura com os pontos")
+    parser.add_argument("--subpixel", choices=("cantos", "centroide"),
+                        help="Refina os pontos com precisão sub-pixel (cornerSubPix ou centroide ponderado)")
+    adicionar_argumentos(parser)
+    args = parser.parse_args(argv)
+
+    caminho_imagem = args.imagem
+    if not caminho_imagem:
+        caminho_imagem = selecionar_imagem()
 
     if caminho_imagem:
         print(f"Caminho da imagem selecionada: {caminho_imagem}")
         
-        # Tentar ler a imagem com um caminho de arquivo absoluto
-        imagem = cv2.imread(caminho_imagem)
-        
-        if imagem is None:
-            print("Erro ao carregar a imagem. Verifique se o caminho está correto ou se a imagem está corrompida.")
-            return
-
-        # Se a imagem for carregada corretamente, prossiga com o processamento
-        coordenadas_pontos = detectar_cantos_com_filtro(imagem)
-        coordenadas_pontos = filtrar_pontos(coordenadas_pontos, limiar_distancia=20)
-
-        if not coordenadas_pontos:
-            print("Não foi possível detectar pontos na imagem.")
-            return
-        
-        print("Coordenadas dos pontos detectados:")
-        for i, coord in enumerate(coordenadas_pontos):
-            print(f"Ponto {i + 1}: X = {coord[0]}, Y = {coord[1]}")
-
-        salvar_coordenadas(coordenadas_pontos, caminho_imagem)
-
-        distancias = calcular_distancias_a_partir_do_inicial(coordenadas_pontos)
-        print("\nDistâncias a partir do ponto inicial:")
-        for dist in distancias:
-            print(f"Distância entre Ponto {dist[0]} e Ponto {dist[1]}: {dist[2]:.2f}")
-
-        salvar_distancias(distancias, caminho_imagem)
-        exibir_imagem_com_pontos(imagem, coordenadas_pontos)
+        with sessao(args, {"imagem": caminho_imagem}):
+            # Tentar ler a imagem com um caminho de arquivo absoluto
+            with etapa("decodificacao"):
+                imagem = cv2.imread(caminho_imagem)
+            
+            if imagem is None:
+                print("Erro ao carregar a imagem. Verifique se o caminho está correto ou se a imagem está corrompida.")
+                return
+
+            # Se a imagem for carregada corretamente, prossiga com o processamento
+            coordenadas_pontos = detectar_cantos_com_filtro(imagem, subpixel=args.subpixel)
+            coordenadas_pontos = filtrar_pontos(coordenadas_pontos, limiar_distancia=LIMIAR_FILTRO)
+
+            if len(coordenadas_pontos) == 0:
+                print("Não foi possível detectar pontos na imagem.")
+                return
+            
+            print(f"Total de pontos detectados: {len(coordenadas_pontos)}")
+            if args.verboso:
+                print("Coordenadas dos pontos detectados:")
+                for i, coord in enumerate(coordenadas_pontos):
+                    print(f"Ponto {i + 1}: X = {coord[0]}, Y = {coord[1]}")
+
+            with etapa("distancias") as registro:
+                distancias = calcular_distancias_a_partir_do_inicial(coordenadas_pontos)
+                registro["pares"] = len(distancias)
+            if args.verboso:
+                print("\nDistâncias a partir do ponto inicial:")
+                for dist in distancias:
+                    print(f"Distância entre Ponto {dist[0]} e Ponto {dist[1]}: {dist[2]:.2f}")
+
+            with etapa("serializacao", pontos=len(coordenadas_pontos), pares=len(distancias)):
+                salvar_coordenadas(coordenadas_pontos, caminho_imagem)
+                salvar_distancias(distancias, caminho_imagem)
+            with etapa("sobreposicao", pontos=len(coordenadas_pontos)):
+                caminho_saida = salvar_sobreposicao(caminho_figura(caminho_imagem, args.pasta_figuras), imagem,
+                                                    coordenadas_pontos, ids=args.ids)
+            print(f"Figura salva em '{caminho_saida}'")
+        if args.exibir:
+            exibir_imagem_com_pontos(imagem, coordenadas_pontos)
     else:
         print("Nenhuma imagem selecionada.")
 
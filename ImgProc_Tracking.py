@@ -0,0 +1,155 @@
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from ImgProc_BatchProcessing import listar_imagens
+from ImgProc_DistanceEngine import gerar_distancias
+from ImgProc_Pipeline import converter_cinza
+
+# Parâmetros do fluxo óptico piramidal de Lucas-Kanade
+PARAMETROS_LK = {
+    "winSize": (21, 21),
+    "maxLevel": 3,
+    "criteria": (cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 30, 0.01),
+}
+
+# Função para detectar os pontos de referência com o pipeline de ImgProc_StructuralMonitoring
+def detectar_pontos(imagem, limiar_distancia=20):
+    import ImgProc_StructuralMonitoring as monitoramento
+
+    coordenadas_pontos = monitoramento.detectar_cantos_com_filtro(imagem)
+    coordenadas_pontos = monitoramento.filtrar_pontos(coordenadas_pontos, limiar_distancia=limiar_distancia)
+    return np.asarray(coordenadas_pontos, dtype=np.float32).reshape(-1, 2)
+
+# Função para propagar pontos entre dois quadros com verificação ida e volta.
+# Retorna as novas posições e a máscara dos pontos rastreados com sucesso.
+def rastrear_pontos(cinza_anterior, cinza_atual, pontos, erro_maximo=1.0):
+    if len(pontos) == 0:
+        return pontos, np.zeros(0, dtype=bool)
+    pontos_lk = pontos.reshape(-1, 1, 2)
+    seguintes, status, _ = cv2.calcOpticalFlowPyrLK(cinza_anterior, cinza_atual, pontos_lk, None, **PARAMETROS_LK)
+    retorno, status_retorno, _ = cv2.calcOpticalFlowPyrLK(cinza_atual, cinza_anterior, seguintes, None, **PARAMETROS_LK)
+    erro_ida_volta = np.linalg.norm((retorno - pontos_lk).reshape(-1, 2), axis=1)
+    validos = (status.ravel() == 1) & (status_retorno.ravel() == 1) & (erro_ida_volta < erro_maximo)
+    return seguintes.reshape(-1, 2), validos
+
+# Rastreador que detecta uma vez e propaga os pontos pelos quadros seguintes,
+# redetectando apenas quando a fração de pontos rastreados cai abaixo do limite
+class RastreadorPontos:
+    def __init__(self, qualidade_minima=0.8, limiar_distancia=20, erro_maximo=1.0):
+        self.qualidade_minima = qualidade_minima
+        self.limiar_distancia = limiar_distancia
+        self.erro_maximo = erro_maximo
+        self.ids = np.empty(0, dtype=np.int32)
+        self.pontos = np.empty((0, 2), dtype=np.float32)
+        self.proximo_id = 1
+        self.quantidade_referencia = 0
+        self.cinza_anterior = None
+
+    # Função para atribuir IDs novos apenas às detecções longe dos pontos já rastreados
+    def _incorporar_deteccoes(self, detectados):
+        if len(self.pontos) and len(detectados):
+            distancias, _ = cKDTree(self.pontos).query(detectados, k=1)
+            detectados = detectados[distancias > self.limiar_distancia]
+        novos_ids = np.arange(self.proximo_id, self.proximo_id + len(detectados), dtype=np.int32)
+        self.proximo_id += len(detectados)
+        self.ids = np.concatenate((self.ids, novos_ids))
+        self.pontos = np.concatenate((self.pontos, detectados)).astype(np.float32)
+        self.quantidade_referencia = len(self.pontos)
+
+    # Função para processar um quadro; retorna (ids, pontos, redetectado)
+    def processar(self, imagem):
+        cinza = converter_cinza(imagem)
+        redetectado = False
+
+        if self.cinza_anterior is not None and self.cinza_anterior.shape != cinza.shape:
+            # Quadros de tamanhos diferentes não podem ser rastreados: recomeça do zero
+            self.ids = np.empty(0, dtype=np.int32)
+            self.pontos = np.empty((0, 2), dtype=np.float32)
+            self.cinza_anterior = None
+
+        if self.cinza_anterior is None:
+            self._incorporar_deteccoes(detectar_pontos(imagem, self.limiar_distancia))
+            redetectado = True
+        else:
+            self.pontos, validos = rastrear_pontos(self.cinza_anterior, cinza, self.pontos, self.erro_maximo)
+            self.pontos, self.ids = self.pontos[validos], self.ids[validos]
+            # Sem pontos (ex.: nenhuma detecção no primeiro quadro) a fração não tem referência: redetecta sempre
+            if len(self.pontos) == 0 or len(self.pontos) < self.qualidade_minima * self.quantidade_referencia:
+                self._incorporar_deteccoes(detectar_pontos(imagem, self.limiar_distancia))
+                redetectado = True
+
+        self.cinza_anterior = cinza
+        return self.ids.copy(), self.pontos.copy(), redetectado
+
+# Função para calcular as distâncias de pares fixos de IDs, ignorando os pares com pontos perdidos
+def distancias_por_ids(pares_ids, ids, pontos):
+    if len(pares_ids) == 0 or len(ids) == 0:
+        return pares_ids[:0], np.empty(0)
+    posicao = np.full(max(int(ids.max()), int(pares_ids.max())) + 1, -1, dtype=np.intp)
+    posicao[ids] = np.arange(len(ids))
+    indices_a, indices_b = posicao[pares_ids[:, 0]], posicao[pares_ids[:, 1]]
+    presentes = (indices_a >= 0) & (indices_b >= 0)
+    indices_a, indices_b = indices_a[presentes], indices_b[presentes]
+    return pares_ids[presentes], np.linalg.norm(pontos[indices_b] - pontos[indices_a], axis=1)
+
+# Função para salvar as coordenadas e distâncias de um quadro rastreado
+def salvar_quadro(caminho_imagem, ids, pontos, pares_ids, distancias, pasta_csv="csv_rastreamento"):
+    os.makedirs(pasta_csv, exist_ok=True)
+    nome_arquivo = os.path.splitext(os.path.basename(caminho_imagem))[0]
+
+    df_pontos = pd.DataFrame({"ID": ids, "X": pontos[:, 0], "Y": pontos[:, 1]})
+    df_pontos.to_csv(os.path.join(pasta_csv, f"{nome_arquivo}_coordinates.csv"), index=False, float_format="%.2f")
+
+    df_distancias = pd.DataFrame({"ID A": pares_ids[:, 0], "ID B": pares_ids[:, 1], "Distância": distancias})
+    df_distancias.to_csv(os.path.join(pasta_csv, f"{nome_arquivo}_distances.csv"), index=False, float_format="%.2f")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rastreamento de pontos entre imagens sucessivas (Lucas-Kanade).")
+    parser.add_argument("entradas", nargs="+", help="Imagens da série temporal (diretórios, arquivos ou globs)")
+    parser.add_argument("--saida", default="csv_rastreamento", help="Pasta dos CSVs por quadro")
+    parser.add_argument("--qualidade-minima", type=float, default=0.8,
+                        help="Fração mínima de pontos rastreados antes de redetectar")
+    parser.add_argument("--vizinhos", type=int, default=4,
+                        help="Vizinhos por ponto usados para os pares de distância fixos")
+    args = parser.parse_args(argv)
+
+    caminhos = listar_imagens(args.entradas)
+    if not caminhos:
+        print("Nenhuma imagem encontrada.")
+        return 1
+
+    rastreador = RastreadorPontos(qualidade_minima=args.qualidade_minima)
+    pares_ids = np.empty((0, 2), dtype=np.int32)
+    inicio = time.perf_counter()
+    for caminho_imagem in caminhos:
+        imagem = cv2.imread(caminho_imagem)
+        if imagem is None:
+            print(f"Erro ao carregar a imagem: {caminho_imagem}")
+            continue
+
+        ids, pontos, redetectado = rastreador.processar(imagem)
+        if redetectado:
+            # Os pares comparados ao longo do tempo são ampliados a cada nova detecção,
+            # preservando os pares já existentes entre pontos que continuam rastreados
+            for indices_a, indices_b, _ in gerar_distancias(pontos, modo="vizinhos", k=args.vizinhos):
+                novos_pares = np.sort(np.column_stack((ids[indices_a], ids[indices_b])), axis=1)
+                pares_ids = np.unique(np.concatenate((pares_ids, novos_pares)), axis=0)
+
+        pares_presentes, distancias = distancias_por_ids(pares_ids, ids, pontos)
+        salvar_quadro(caminho_imagem, ids, pontos, pares_presentes, distancias, args.saida)
+        estado = "detecção" if redetectado else "rastreamento"
+        print(f"{os.path.basename(caminho_imagem)}: {len(ids)} pontos ({estado})")
+
+    tempo_total = time.perf_counter() - inicio
+    print(f"\nTempo total: {tempo_total:.2f} s - {len(caminhos) / tempo_total:.2f} imagens/s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Os módulos ImgProc_*.py ficam na raiz do repositório
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASTA_IMAGENS = os.path.join(RAIZ, "images")
+sys.path.insert(0, RAIZ)
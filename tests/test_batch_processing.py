@@ -0,0 +1,40 @@
+import os
+import shutil
+
+import pytest
+
+from conftest import PASTA_IMAGENS
+from ImgProc_BatchProcessing import caminho_saida_imagem, conferir_nomes_saida, processar_lote, raiz_entradas
+
+# Fotos de mesmo nome em pastas diferentes ("peca A/IMG_1.jpg") gravam saídas separadas, sem mensagens por arquivo
+def test_mesmo_nome_em_pastas_diferentes(tmp_path, capsys):
+    caminhos = []
+    for peca in ("peca A", "peca B"):
+        pasta = tmp_path / "images" / peca
+        pasta.mkdir(parents=True)
+        caminhos.append(str(pasta / "IMG_1.jpg"))
+        shutil.copy(os.path.join(PASTA_IMAGENS, "25_nos.jpg"), caminhos[-1])
+    saida = tmp_path / "saida"
+    resultados = processar_lote(caminhos, pipeline="monitoramento", pasta_saida=str(saida), processos=1)
+    assert [r["status"] for r in resultados] == ["ok", "ok"]
+    assert sorted(os.listdir(saida / "csv_coordenadas")) == ["peca A__IMG_1_coordenadas.csv",
+                                                           "peca B__IMG_1_coordenadas.csv"]
+    assert sorted(os.listdir(saida / "csv_distancias")) == ["peca A__IMG_1_distancias.csv",
+                                                          "peca B__IMG_1_distancias.csv"]
+    assert "Coordenadas salvas em" not in capsys.readouterr().out
+
+# A raiz vem das entradas (pastas, arquivos e a parte fixa dos padrões glob); numa pasta só, os nomes não mudam
+def test_raiz_das_entradas(tmp_path):
+    (tmp_path / "a").mkdir()
+    (tmp_path / "a" / "IMG_1.jpg").write_bytes(b"")
+    assert raiz_entradas([str(tmp_path / "a" / "IMG_1.jpg")]) == str(tmp_path / "a")
+    assert raiz_entradas([str(tmp_path / "a"), str(tmp_path / "b" / "**" / "*.jpg")]) == str(tmp_path)
+    caminho = str(tmp_path / "a" / "IMG_1.jpg")
+    assert caminho_saida_imagem(caminho, str(tmp_path / "a")) == caminho
+    assert caminho_saida_imagem(caminho, str(tmp_path / "outra")) == caminho
+
+# Mesmo nome com extensões diferentes cairia nos mesmos CSVs: o lote falha antes de gravar
+def test_colisao_de_nomes(tmp_path):
+    caminhos = [str(tmp_path / "IMG_1.jpg"), str(tmp_path / "IMG_1.png")]
+    with pytest.raises(ValueError, match="IMG_1.jpg"):
+        conferir_nomes_saida(caminhos, str(tmp_path))
@@ -0,0 +1,57 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from conftest import PASTA_IMAGENS
+from ImgProc_Calibration import (TABELA_PRETO, aplicar_tabela, calibrar_perfil, carregar_perfil, compilar_tabela,
+                                 nome_referencia, operacao_contraste_brilho, operacao_limiar, salvar_perfil)
+
+CALIBRACAO = os.path.join(PASTA_IMAGENS, "cinza_claro_199_200_202.jpeg")
+
+@pytest.fixture(scope="module")
+def cinza():
+    return cv2.imread(os.path.join(PASTA_IMAGENS, "6_nos_cinza.jpeg"), cv2.IMREAD_GRAYSCALE)
+
+# Cadeia original, operação por operação sobre a imagem inteira
+def cadeia(imagem, alpha, beta, limiar, valor):
+    ajustada = cv2.convertScaleAbs(imagem, alpha=alpha, beta=beta)
+    return np.where(ajustada > limiar, valor, ajustada).astype(np.uint8)
+
+# A tabela compilada reproduz bit a bit convertScaleAbs seguido do limiar, inclusive nos arredondamentos
+@pytest.mark.parametrize("alpha, beta, limiar, valor", [(1.5, 30, 180, 0), (2.37, -111.2, 127.5, 255),
+                                                         (0.8, 12.6, 90, 0)])
+def test_tabela_igual_a_cadeia(cinza, alpha, beta, limiar, valor):
+    tabela = compilar_tabela(operacao_contraste_brilho(alpha, beta), operacao_limiar(limiar, valor))
+    assert tabela.shape == (256,) and tabela.dtype == np.uint8
+    np.testing.assert_array_equal(aplicar_tabela(cinza, tabela), cadeia(cinza, alpha, beta, limiar, valor))
+    rampa = np.arange(256, dtype=np.uint8).reshape(16, 16)
+    np.testing.assert_array_equal(aplicar_tabela(rampa, tabela), cadeia(rampa, alpha, beta, limiar, valor))
+
+def test_tabela_preto(cinza):
+    np.testing.assert_array_equal(aplicar_tabela(cinza, TABELA_PRETO), np.where(cinza > 180, 0, cinza))
+
+# O perfil de uma imagem de calibração leva a marcação ao preto e o fundo ao branco, e sobrevive ao JSON
+def test_perfil_de_referencia(tmp_path):
+    perfil = calibrar_perfil(nome_referencia(CALIBRACAO), [CALIBRACAO])
+    assert perfil["nome"] == "claro_199_200_202"
+    assert perfil["marca"] < perfil["limiar"] < perfil["fundo"]
+    tabela = perfil["tabela_deteccao"]
+    assert tabela[int(perfil["marca"])] == 0 and tabela[int(round(perfil["fundo"]))] == 255
+    np.testing.assert_array_equal(
+        tabela, cadeia(np.arange(256, dtype=np.uint8), perfil["alpha"], perfil["beta"],
+                       perfil["alpha"] * perfil["limiar"] + perfil["beta"], 255).ravel())
+
+    caminho = salvar_perfil(perfil, str(tmp_path))
+    carregar_perfil.cache_clear()
+    carregado = carregar_perfil(perfil["nome"], str(tmp_path))
+    # Lido uma única vez por processo
+    assert carregar_perfil(perfil["nome"], str(tmp_path)) is carregado
+    assert carregar_perfil(caminho)["nome"] == perfil["nome"]
+    np.testing.assert_array_equal(carregado["tabela_deteccao"], tabela)
+    assert carregado["tabela_preto"].dtype == np.uint8
+
+def test_perfil_inexistente(tmp_path):
+    with pytest.raises(ValueError):
+        carregar_perfil("nenhum", str(tmp_path))
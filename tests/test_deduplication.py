@@ -0,0 +1,60 @@
+import math
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from conftest import PASTA_IMAGENS
+from ImgProc_Deduplication import filtrar_pontos_proximos
+
+# Laços quadráticos originais: detectar_cantos de ImgProc_DistanceCalculation (distância < mínima descarta)
+# e filtrar_pontos de ImgProc_StructuralMonitoring (distância <= limiar descarta)
+def filtro_exclusivo_original(coordenadas_pontos, minDistance):
+    mantidos = []
+    for x, y in coordenadas_pontos:
+        # np.linalg.norm no original; math.hypot dá o mesmo valor em uma fração do tempo
+        if all(math.hypot(x - px, y - py) >= minDistance for px, py in mantidos):
+            mantidos.append((x, y))
+    return mantidos
+
+def filtro_inclusivo_original(coordenadas_pontos, limiar_distancia):
+    mantidos = []
+    for ponto in coordenadas_pontos:
+        if all(math.sqrt((ponto[0] - p[0]) ** 2 + (ponto[1] - p[1]) ** 2) > limiar_distancia for p in mantidos):
+            mantidos.append(ponto)
+    return mantidos
+
+def _comparar(coordenadas_pontos, distancia):
+    assert filtrar_pontos_proximos(coordenadas_pontos, distancia) == filtro_exclusivo_original(coordenadas_pontos,
+                                                                                               distancia)
+    assert filtrar_pontos_proximos(coordenadas_pontos, distancia, inclusivo=True) == \
+        filtro_inclusivo_original(coordenadas_pontos, distancia)
+
+@pytest.mark.parametrize("semente", range(5))
+def test_pontos_aleatorios(semente):
+    rng = np.random.default_rng(semente)
+    pontos = rng.uniform(0, 300, (400, 2))
+    _comparar([tuple(p) for p in pontos.tolist()], 12.5)
+
+# Coordenadas inteiras em uma grade com passo igual ao limiar: muitos pares exatamente no limite,
+# onde os filtros inclusivo e exclusivo divergem
+def test_empates_no_limiar():
+    rng = np.random.default_rng(0)
+    pontos = np.array([(x, y) for x in range(0, 200, 15) for y in range(0, 200, 15)])
+    pontos = np.concatenate((pontos, pontos[rng.choice(len(pontos), 40)] + rng.integers(-3, 4, (40, 2))))
+    rng.shuffle(pontos)
+    _comparar([tuple(p) for p in pontos.tolist()], 15)
+
+def test_vazio():
+    _comparar([], 15)
+
+@pytest.mark.parametrize("nome", ["289_nos.jpg", "1089_pontos.jpg"])
+def test_pontos_da_imagem(nome):
+    imagem_cinza = cv2.imread(os.path.join(PASTA_IMAGENS, nome), cv2.IMREAD_GRAYSCALE)
+    imagem_suavizada = cv2.GaussianBlur(cv2.convertScaleAbs(imagem_cinza, alpha=1.5, beta=30), (5, 5), 0)
+    # Cantos sem distância mínima no detector: o filtro é quem separa os vizinhos
+    pontos = cv2.goodFeaturesToTrack(imagem_suavizada, maxCorners=0, qualityLevel=0.05, minDistance=1)
+    coordenadas_pontos = [tuple(p) for p in pontos.reshape(-1, 2).astype(np.int32).tolist()]
+    for distancia in (10, 15, 20):
+        _comparar(coordenadas_pontos, distancia)
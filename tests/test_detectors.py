@@ -0,0 +1,17 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from conftest import PASTA_IMAGENS
+from ImgProc_Detectors import detectar_pontos
+
+# Os detectores do registro entregam um array N x 2 contíguo em float32, sem arredondar os centroides
+@pytest.mark.parametrize("detector", ["monitoramento", "distancias", "pipeline", "centroides", "modelo"])
+def test_detectores_entregam_float32(detector):
+    imagem = cv2.imread(os.path.join(PASTA_IMAGENS, "289_pontos.jpg"), cv2.IMREAD_GRAYSCALE)
+    pontos = detectar_pontos(imagem, detector)
+    assert pontos.dtype == np.float32 and pontos.shape == (289, 2) and pontos.flags["C_CONTIGUOUS"]
+    if detector == "centroides":
+        assert np.any(pontos != np.round(pontos))
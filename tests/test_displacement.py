@@ -0,0 +1,53 @@
+import warnings
+
+import numpy as np
+
+from ImgProc_Displacement import ComparadorReferencia, associar_pontos, calcular_deformacoes, deformacao_maxima
+
+# Grade 10 x 10 com espaçamento de 40 px e pequenas imperfeições, como uma grade detectada
+def grade(rng, lado=10, espacamento=40.0):
+    xs, ys = np.meshgrid(np.arange(lado), np.arange(lado))
+    return np.column_stack((xs.ravel(), ys.ravel())) * espacamento + 100 + rng.normal(0, 0.5, (lado * lado, 2))
+
+# A imagem atual vem embaralhada, transladada, com pontos faltando e pontos espúrios:
+# cada ponto associado tem que voltar ao seu ponto de origem na referência
+def test_associacao_embaralhada_com_faltas():
+    rng = np.random.default_rng(5)
+    referencia = grade(rng)
+    movidos = referencia + (13.0, -7.0) + rng.normal(0, 1.0, referencia.shape)
+    mantidos = np.sort(rng.choice(len(referencia), len(referencia) - 7, replace=False))
+    espurios = np.array([[5.0, 5.0], [900.0, 900.0]])
+    atual = np.concatenate((movidos[mantidos], espurios))
+    ordem = rng.permutation(len(atual))
+    atual = atual[ordem]
+    origem = np.append(mantidos, [-1, -1])[ordem]
+
+    indices_ref, indices_atual, translacao = associar_pontos(referencia, atual)
+    np.testing.assert_allclose(translacao, (13.0, -7.0), atol=0.5)
+    assert len(indices_ref) == len(mantidos)
+    np.testing.assert_array_equal(origem[indices_atual], indices_ref)
+    assert np.all(np.diff(indices_ref) > 0)
+
+# Estiramento uniforme de 1% em x: deformação 0,01 nas arestas horizontais e ~0 nas verticais
+def test_deformacoes_da_grade():
+    rng = np.random.default_rng(8)
+    referencia = grade(rng, espacamento=60.0)
+    atual = referencia * (1.01, 1.0)
+    comparacao = ComparadorReferencia(referencia).comparar(atual[::-1])
+    arestas = comparacao["arestas"]
+    assert len(arestas) == 2 * 10 * 9
+    horizontais = np.abs(np.diff(referencia[arestas][:, :, 0], axis=1)[:, 0]) > 30
+    np.testing.assert_allclose(comparacao["deformacoes"][horizontais], 0.01, atol=2e-4)
+    np.testing.assert_allclose(comparacao["deformacoes"][~horizontais], 0.0, atol=2e-4)
+    assert abs(deformacao_maxima(comparacao["deformacoes"]) - 0.01) < 2e-4
+
+# Arestas com os dois pontos coincidentes na referência: deformação NaN e máximo NaN, sem avisos
+def test_deformacoes_todas_nan():
+    referencia = np.array([[10.0, 10.0], [10.0, 10.0]])
+    atual = np.array([[10.0, 10.0], [12.0, 10.0]])
+    _, _, _, deformacoes = calcular_deformacoes(referencia, atual, np.arange(2), np.arange(2), [(0, 1)])
+    assert np.isnan(deformacoes).all()
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        assert np.isnan(deformacao_maxima(deformacoes))
+        assert np.isnan(deformacao_maxima(np.empty(0)))
@@ -0,0 +1,70 @@
+import itertools
+import math
+
+import numpy as np
+import pytest
+
+from ImgProc_DistanceEngine import blocos_para_lista, gerar_distancias, salvar_blocos_csv
+
+# Coordenadas sub-pixel em oitavos de pixel: exatas em float32, o tipo dos pontos refinados
+PONTOS = np.random.default_rng(3).integers(0, 4000, size=(40, 2)) / 8
+
+# Referência: o laço original dos scripts, par a par na ordem de itertools.combinations
+def distancias_combinacoes(pontos):
+    return [(i + 1, j + 1, math.dist(pontos[i], pontos[j])) for i, j in itertools.combinations(range(len(pontos)), 2)]
+
+def comparar(obtidas, esperadas):
+    assert [(a, b) for a, b, _ in obtidas] == [(a, b) for a, b, _ in esperadas]
+    np.testing.assert_allclose([d for _, _, d in obtidas], [d for _, _, d in esperadas], rtol=1e-12)
+
+# Blocos pequenos cortam linhas da matriz condensada no meio: a ordem e os valores não podem mudar
+@pytest.mark.parametrize("tamanho_bloco", [1, 7, 39, 100, 1 << 20])
+def test_todos_igual_a_combinacoes(tamanho_bloco):
+    obtidas = blocos_para_lista(gerar_distancias(PONTOS, "todos", tamanho_bloco=tamanho_bloco))
+    comparar(obtidas, distancias_combinacoes(PONTOS))
+
+def test_inicial():
+    obtidas = blocos_para_lista(gerar_distancias(PONTOS, "inicial", tamanho_bloco=5))
+    comparar(obtidas, [par for par in distancias_combinacoes(PONTOS) if par[0] == 1])
+
+# Raio: exatamente os pares de combinations com distância <= raio, na mesma ordem
+def test_raio():
+    obtidas = blocos_para_lista(gerar_distancias(PONTOS, "raio", raio=120.0, tamanho_bloco=9))
+    comparar(obtidas, [par for par in distancias_combinacoes(PONTOS) if par[2] <= 120.0])
+
+# Vizinhos: cada ponto aparece ligado aos seus k mais próximos, sem pares repetidos
+def test_vizinhos():
+    k = 3
+    obtidas = blocos_para_lista(gerar_distancias(PONTOS, "vizinhos", k=k))
+    pares = {(a, b) for a, b, _ in obtidas}
+    assert len(pares) == len(obtidas)
+    assert all(a < b for a, b in pares)
+    todas = distancias_combinacoes(PONTOS)
+    for i in range(1, len(PONTOS) + 1):
+        proximos = sorted((d, b if a == i else a) for a, b, d in todas if i in (a, b))[:k]
+        assert all((min(i, j), max(i, j)) in pares for _, j in proximos)
+    distancia = {(a, b): d for a, b, d in todas}
+    np.testing.assert_allclose([d for _, _, d in obtidas], [distancia[a, b] for a, b, _ in obtidas], rtol=1e-12)
+
+def test_pares_na_ordem_recebida():
+    pares = [(5, 2), (0, 39), (7, 8)]
+    obtidas = blocos_para_lista(gerar_distancias(PONTOS, "pares", pares=pares))
+    comparar(obtidas, [(a + 1, b + 1, math.dist(PONTOS[a], PONTOS[b])) for a, b in pares])
+
+@pytest.mark.parametrize("modo", ["raio", "vizinhos", "pares", "outro"])
+def test_parametros_obrigatorios(modo):
+    with pytest.raises(ValueError):
+        gerar_distancias(PONTOS, modo)
+
+def test_menos_de_dois_pontos():
+    assert blocos_para_lista(gerar_distancias(PONTOS[:1])) == []
+
+# O CSV gravado bloco a bloco tem as mesmas linhas da lista
+def test_csv_em_blocos(tmp_path):
+    import pandas as pd
+
+    nome_csv = tmp_path / "distancias.csv"
+    total = salvar_blocos_csv(gerar_distancias(PONTOS, tamanho_bloco=50), nome_csv)
+    tabela = pd.read_csv(nome_csv)
+    assert total == len(tabela) == len(PONTOS) * (len(PONTOS) - 1) // 2
+    comparar(list(tabela.itertuples(index=False, name=None)), distancias_combinacoes(PONTOS))
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from ImgProc_GridTopology import arestas_delaunay, gerar_distancias_grade, reconstruir_grade
+
+# Grade 17 x 17 com espaçamento 36 px, embaralhada e girada em torno do centro, com um pequeno ruído
+def _grade(angulo, semente=0):
+    rng = np.random.default_rng(semente)
+    linhas, colunas = np.divmod(np.arange(17 * 17), 17)
+    pontos = np.column_stack((colunas, linhas)) * 36.0
+    theta = np.radians(angulo)
+    rotacao = np.array([[np.cos(theta), -np.sin(theta)], [np.sin(theta), np.cos(theta)]])
+    pontos = (pontos - 288) @ rotacao.T + 600 + rng.normal(0, 0.5, pontos.shape)
+    ordem = rng.permutation(len(pontos))
+    return pontos[ordem], linhas[ordem], colunas[ordem]
+
+# 17 x 17 nós: 2 x 17 x 16 = 544 vãos entre vizinhos, e cada aresta liga nós vizinhos da grade real
+@pytest.mark.parametrize("angulo", [0, 10, -25, 35])
+def test_grade_17x17(angulo):
+    pontos, linhas, colunas = _grade(angulo)
+    grade = reconstruir_grade(pontos)
+    a, b = grade["arestas"].T
+    assert len(grade["arestas"]) == 544
+    assert (np.abs(linhas[a] - linhas[b]) + np.abs(colunas[a] - colunas[b]) == 1).all()
+    assert (grade["componentes"] == 0).all()
+    assert grade["linhas"].max() == 16 and grade["colunas"].max() == 16
+    # Os índices reconstruídos preservam a vizinhança: cada aresta muda exatamente um índice em 1
+    passos = np.abs(grade["linhas"][a] - grade["linhas"][b]) + np.abs(grade["colunas"][a] - grade["colunas"][b])
+    assert (passos == 1).all()
+    distancias = np.concatenate([d for _, _, d in gerar_distancias_grade(pontos, grade)])
+    assert np.allclose(distancias, 36, atol=2.5)
+
+def test_pontos_colineares():
+    pontos = np.column_stack((np.arange(5) * 10.0, np.arange(5) * 10.0))
+    assert arestas_delaunay(pontos).tolist() == [[0, 1], [1, 2], [2, 3], [3, 4]]
@@ -0,0 +1,73 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from conftest import PASTA_IMAGENS
+from ImgProc_ImageLoading import LeitorAntecipado, ampliar_coordenadas, carregar_imagem, decodificar, flag_leitura
+
+IMAGEM = os.path.join(PASTA_IMAGENS, "25_nos.jpg")
+
+# O centro do pixel reduzido cai no centro do bloco de pixels originais
+@pytest.mark.parametrize("reducao", [2, 4, 8])
+def test_ampliar_coordenadas(reducao):
+    meio = (reducao - 1) / 2
+    subpixel = np.array([[0, 0], [10.25, 3.5]], dtype=np.float32)
+    ampliados = ampliar_coordenadas(subpixel, reducao)
+    assert ampliados.dtype == np.float32
+    np.testing.assert_allclose(ampliados, subpixel * reducao + meio)
+
+    inteiros = ampliar_coordenadas(np.array([[0, 0], [10, 3]], dtype=np.int32), reducao)
+    assert inteiros.dtype == np.int32
+    np.testing.assert_array_equal(inteiros, np.round(np.array([[0, 0], [10, 3]]) * reducao + meio))
+    assert ampliar_coordenadas([(10, 3)], reducao) == [tuple(int(v) for v in inteiros[1])]
+
+def test_ampliar_sem_reducao_devolve_o_mesmo_objeto():
+    pontos = [(1, 2)]
+    assert ampliar_coordenadas(pontos, 1) is pontos
+
+# A leitura direta equivale ao imread e a reduzida tem 1/r de cada lado
+def test_carregar_imagem():
+    np.testing.assert_array_equal(carregar_imagem(IMAGEM), cv2.imread(IMAGEM))
+    np.testing.assert_array_equal(carregar_imagem(IMAGEM, "cinza"), cv2.imread(IMAGEM, cv2.IMREAD_GRAYSCALE))
+    altura, largura = cv2.imread(IMAGEM, cv2.IMREAD_GRAYSCALE).shape
+    reduzida = carregar_imagem(IMAGEM, "cinza", 4)
+    assert reduzida.shape == (-(-altura // 4), -(-largura // 4))
+    assert carregar_imagem("inexistente.jpg") is None
+    assert decodificar(np.empty(0, dtype=np.uint8)) is None
+    with pytest.raises(ValueError):
+        flag_leitura("cinza", 3)
+
+# Os caminhos saem na ordem recebida, com os bytes do arquivo (None se não puder ser lido)
+def test_leitor_na_ordem():
+    caminhos = [os.path.join(PASTA_IMAGENS, nome) for nome in ("4_nos.jpg", "25_nos.jpg", "289_nos.jpg")]
+    caminhos.insert(1, "inexistente.jpg")
+    lidos = []
+    with LeitorAntecipado(caminhos) as leitor:
+        for caminho, dados in leitor:
+            if dados is None:
+                lidos.append((caminho, None))
+                continue
+            with open(caminho, "rb") as arquivo:
+                assert dados.tobytes() == arquivo.read()
+            lidos.append((caminho, len(dados)))
+    assert [caminho for caminho, _ in lidos] == caminhos
+    assert lidos[1] == ("inexistente.jpg", None)
+
+# Os bytes de um lote longo circulam por profundidade + 1 buffers, sem alocar um por imagem
+def test_leitor_reaproveita_buffers():
+    profundidade = 2
+    buffers = []
+    with LeitorAntecipado([IMAGEM] * 10, profundidade) as leitor:
+        for _, dados in leitor:
+            if not any(dados.base is buffer for buffer in buffers):
+                buffers.append(dados.base)
+    assert len(buffers) <= profundidade + 1
+
+# Sair do laço antes do fim não deixa a thread de leitura presa
+def test_leitor_interrompido():
+    with LeitorAntecipado([IMAGEM] * 10, profundidade=1) as leitor:
+        for _ in leitor:
+            break
+    assert not leitor.thread.is_alive()
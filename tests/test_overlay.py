@@ -0,0 +1,47 @@
+import cv2
+import numpy as np
+
+from ImgProc_Overlay import (COR_ARESTAS, COR_PONTOS, caminho_figura, desenhar_sobreposicao,
+                             salvar_sobreposicao)
+
+PONTOS = np.array([[40, 30], [160, 30], [100, 120]], dtype=np.float32)
+
+# Cada "x" cruza o seu ponto e tem as pontas nas diagonais; longe dos pontos a imagem não muda
+def test_marcadores_nas_coordenadas():
+    imagem = np.zeros((200, 250), dtype=np.uint8)
+    saida = desenhar_sobreposicao(imagem, PONTOS, tamanho=6, espessura=1)
+    assert saida.shape == (200, 250, 3)
+    for x, y in PONTOS.astype(int):
+        assert tuple(saida[y, x]) == COR_PONTOS
+        for dx, dy in ((-5, -5), (5, 5), (-5, 5), (5, -5)):
+            assert tuple(saida[y + dy, x + dx]) == COR_PONTOS
+        # Os braços do "x" não passam pelas linhas retas que saem do ponto
+        assert not saida[y, x + 4].any() and not saida[y + 4, x].any()
+    mascara = np.zeros(imagem.shape, dtype=bool)
+    for x, y in PONTOS.astype(int):
+        mascara[y - 8:y + 9, x - 8:x + 9] = True
+    assert not saida[~mascara].any()
+
+# As arestas ligam os pontos indicados (índices a partir de 0) e só eles
+def test_arestas():
+    imagem = np.zeros((200, 250), dtype=np.uint8)
+    saida = desenhar_sobreposicao(imagem, PONTOS, arestas=[(0, 1)], tamanho=3, espessura=1)
+    # Linhas com antisserrilhamento: a cor da aresta chega atenuada ao pixel central
+    np.testing.assert_allclose(saida[30, 100], COR_ARESTAS, atol=30)
+    # Meio do segmento entre os pontos 1 e 2, que não formam aresta
+    assert not saida[75, 130].any()
+
+# A imagem de entrada não é alterada e o buffer é reaproveitado entre imagens do mesmo tamanho
+def test_buffer_reaproveitado():
+    imagem = np.full((100, 100, 3), 50, dtype=np.uint8)
+    primeira = desenhar_sobreposicao(imagem, [[50, 50]])
+    segunda = desenhar_sobreposicao(imagem, [[20, 20]], buffer=primeira)
+    assert segunda is primeira
+    assert (imagem == 50).all()
+    assert tuple(segunda[50, 50]) == (50, 50, 50) and tuple(segunda[20, 20]) == COR_PONTOS
+
+def test_salvar_e_nome_da_figura(tmp_path):
+    caminho = caminho_figura("fotos/IMG_1.jpg", str(tmp_path / "figuras"))
+    assert caminho == str(tmp_path / "figuras" / "Figure_IMG_1.png")
+    salvar_sobreposicao(caminho, np.zeros((60, 80), dtype=np.uint8), [[40, 30]])
+    assert tuple(cv2.imread(caminho)[30, 40]) == COR_PONTOS
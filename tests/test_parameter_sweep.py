@@ -0,0 +1,21 @@
+import os
+
+import pytest
+
+from conftest import PASTA_IMAGENS
+from ImgProc_BatchProcessing import processar_distancias, processar_monitoramento
+from ImgProc_ImageLoading import carregar_imagem
+from ImgProc_ParameterSweep import avaliar_imagem
+
+# A varredura deve pontuar exatamente o que o lote executa com os mesmos parâmetros
+@pytest.mark.parametrize("reducao", [1, 2])
+@pytest.mark.parametrize("detector, pipeline, parametros", [
+    ("filtro", processar_monitoramento, {"qualityLevel": 0.1, "minDistance": 20}),
+    ("cantos", processar_distancias, {"qualityLevel": 0.05, "minDistance": 15}),
+])
+def test_contagem_igual_ao_lote(detector, pipeline, parametros, reducao):
+    caminho = os.path.join(PASTA_IMAGENS, "1089_nos.jpg")
+    grade = [{"alpha": 1.5, "beta": 30, **parametros}]
+    quantidade = avaliar_imagem(caminho, detector, grade, reducao)[0]["pontos"]
+    coordenadas_pontos, _ = pipeline(carregar_imagem(caminho, "cinza", reducao), {"reducao": reducao})
+    assert quantidade == len(coordenadas_pontos)
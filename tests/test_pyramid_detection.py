@@ -0,0 +1,64 @@
+import glob
+import os
+
+import cv2
+import numpy as np
+import pytest
+from scipy.spatial import cKDTree
+
+from conftest import PASTA_IMAGENS
+from ImgProc_PyramidDetection import detectar_cantos_em_blocos, detectar_cantos_piramide
+
+# Com maxCorners limitando a saída, os blocos devem manter os cantos mais fortes da imagem inteira
+# (e não os dos primeiros blocos) e aplicar qualityLevel contra o máximo global
+def test_blocos_equivalem_a_imagem_inteira():
+    caminho = glob.glob(os.path.join(glob.escape(PASTA_IMAGENS), "**", "IMG_20241218_153441194.jpg"),
+                        recursive=True)[0]
+    imagem_cinza = cv2.imread(caminho, cv2.IMREAD_GRAYSCALE)
+    for maxCorners in (1000, 300):
+        inteira = detectar_cantos_em_blocos(imagem_cinza, tamanho_bloco=100000, maxCorners=maxCorners)
+        blocos = detectar_cantos_em_blocos(imagem_cinza, tamanho_bloco=512, maxCorners=maxCorners)
+        assert blocos.dtype == np.float32 and blocos.shape[1] == 2
+        assert len(blocos) == len(inteira)
+        distancias, _ = cKDTree(inteira).query(blocos)
+        assert (distancias < 2).mean() > 0.95
+
+# Nós verdadeiros de 289_nos.jpg: cruzamentos das 17 linhas verticais com as 17 horizontais, cada linha no centro
+# de massa da sua escuridão no perfil médio tomado dentro da grade
+def _centros_das_linhas(perfil):
+    escuridao = np.clip(perfil.max() - 40 - perfil, 0, None)
+    indices = np.flatnonzero(escuridao)
+    linhas = np.split(indices, np.flatnonzero(np.diff(indices) > 3) + 1)
+    return np.array([np.average(linha, weights=escuridao[linha]) for linha in linhas])
+
+def nos_289():
+    imagem_cinza = cv2.imread(os.path.join(PASTA_IMAGENS, "289_nos.jpg"), cv2.IMREAD_GRAYSCALE).astype(np.float64)
+    xs = _centros_das_linhas(imagem_cinza[600:1150].mean(axis=0))
+    ys = _centros_das_linhas(imagem_cinza[:, 40:1200].mean(axis=1))
+    assert len(xs) == len(ys) == 17
+    return np.array([(x, y) for y in ys for x in xs])
+
+def _revocacao_e_erro(pontos, verdadeiros, tolerancia):
+    distancias, _ = cKDTree(pontos).query(verdadeiros)
+    return np.mean(distancias <= tolerancia), np.median(distancias)
+
+# A pirâmide não pode perder para a detecção na imagem inteira (detectar_cantos_com_filtro) em revocação nem em
+# erro de posição, e o refino tem que levar os candidatos do nível reduzido até o cruzamento das linhas
+@pytest.mark.parametrize("niveis", [1, 2])
+def test_piramide_contra_imagem_inteira(niveis):
+    from ImgProc_StructuralMonitoring import detectar_cantos_com_filtro
+    imagem = cv2.imread(os.path.join(PASTA_IMAGENS, "289_nos.jpg"))
+    verdadeiros = nos_289()
+    pontos = detectar_cantos_piramide(imagem, niveis=niveis)
+    revocacao, erro = _revocacao_e_erro(pontos, verdadeiros, 5)
+    revocacao_inteira, erro_inteira = _revocacao_e_erro(detectar_cantos_com_filtro(imagem), verdadeiros, 5)
+    assert pontos.dtype == np.float32 and len(pontos) == 289
+    assert revocacao >= revocacao_inteira and erro <= erro_inteira
+    assert _revocacao_e_erro(pontos, verdadeiros, 2)[0] > 0.98 and erro < 0.2
+
+# Grade sintética 30 x 30 com espaçamento de 30 px: todos os nós a menos de 1 px
+def test_piramide_grade_sintetica():
+    from ImgProc_Benchmark import gerar_grade_sintetica
+    imagem, verdadeiros = gerar_grade_sintetica(30, 30)
+    pontos = detectar_cantos_piramide(imagem, niveis=1)
+    assert len(pontos) == 900 and _revocacao_e_erro(pontos, verdadeiros, 1)[0] > 0.99
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+from ImgProc_DistanceEngine import gerar_distancias
+from ImgProc_ResultStore import (NOME_MANIFESTO, abrir_resultado, atualizar_manifesto, carregar_manifesto,
+                                 exportar_csv, salvar_resultado_binario)
+
+PONTOS = np.array([[10.5, 20.25], [30.0, 40.0], [55.125, 12.0], [70.0, 90.5]], dtype=np.float32)
+
+# Gravar em blocos e abrir por memmap devolve os mesmos arrays, com os índices a partir de 1 dos CSVs
+def test_ida_e_volta(tmp_path):
+    pasta = str(tmp_path)
+    blocos = list(gerar_distancias(PONTOS, tamanho_bloco=2))
+    entrada = salvar_resultado_binario(pasta, "IMG_1", PONTOS, iter(blocos), "fotos/IMG_1.jpg")
+    atualizar_manifesto(pasta, {"IMG_1": entrada})
+
+    arrays = abrir_resultado(pasta, "IMG_1")
+    assert isinstance(arrays["coordenadas"], np.memmap)
+    assert arrays["coordenadas"].dtype == np.float32 and arrays["pares"].dtype == np.int32
+    np.testing.assert_array_equal(arrays["coordenadas"], PONTOS)
+    pares = np.column_stack((np.concatenate([a for a, _, _ in blocos]), np.concatenate([b for _, b, _ in blocos])))
+    np.testing.assert_array_equal(arrays["pares"], pares + 1)
+    np.testing.assert_allclose(arrays["distancias"], np.concatenate([d for _, _, d in blocos]), rtol=1e-6)
+    assert len(arrays["pares"]) == 6
+
+# O manifesto acumula as imagens de gravações sucessivas e não deixa o arquivo temporário para trás
+def test_manifesto(tmp_path):
+    pasta = str(tmp_path)
+    for nome in ("A", "B"):
+        entrada = salvar_resultado_binario(pasta, nome, PONTOS, gerar_distancias(PONTOS), f"{nome}.jpg")
+        atualizar_manifesto(pasta, {nome: entrada})
+    manifesto = carregar_manifesto(pasta)
+    assert sorted(manifesto["imagens"]) == ["A", "B"]
+    assert manifesto["imagens"]["B"]["imagem"] == "B.jpg"
+    assert manifesto["imagens"]["A"]["pares"] == {"arquivo": "A_pares.i32", "dtype": "<i4", "forma": [6, 2]}
+    assert sorted(p.name for p in tmp_path.iterdir() if p.suffix in (".json", ".tmp")) == [NOME_MANIFESTO]
+
+# Imagem sem pontos: arrays vazios (np.memmap não abre arquivos vazios)
+def test_resultado_vazio(tmp_path):
+    pasta = str(tmp_path)
+    atualizar_manifesto(pasta, {"vazia": salvar_resultado_binario(pasta, "vazia", [], iter(()))})
+    arrays = abrir_resultado(pasta, "vazia")
+    assert arrays["coordenadas"].shape == (0, 2) and arrays["pares"].shape == (0, 2)
+
+# A exportação reproduz os CSVs dos scripts
+def test_exportar_csv(tmp_path):
+    pasta = str(tmp_path / "resultados")
+    atualizar_manifesto(pasta, {"IMG_1": salvar_resultado_binario(pasta, "IMG_1", PONTOS, gerar_distancias(PONTOS))})
+    nome_coordenadas, nome_distancias = exportar_csv(pasta, "IMG_1", str(tmp_path / "csv"))
+    np.testing.assert_array_equal(pd.read_csv(nome_coordenadas).to_numpy(), PONTOS)
+    distancias = pd.read_csv(nome_distancias)
+    assert distancias[["Ponto A", "Ponto B"]].values.tolist()[:3] == [[1, 2], [1, 3], [1, 4]]
@@ -0,0 +1,22 @@
+import os
+
+import cv2
+import pytest
+
+from conftest import PASTA_IMAGENS
+from ImgProc_ROI import detectar_rois
+
+PASTA_SUGESTOES = os.path.join(PASTA_IMAGENS, "Sugestoes de marcacoes")
+
+# Fotos em que a textura da garra superior virava uma região: só a região marcada da peça deve sobrar
+@pytest.mark.parametrize("caminho", [
+    os.path.join("sugestao (2)", "peca A", "IMG_20241218_152643760.jpg"),
+    os.path.join("sugestao (1)", "peca A", "IMG_20241218_153505839.jpg"),
+])
+def test_garra_nao_vira_regiao(caminho):
+    imagem = cv2.imread(os.path.join(PASTA_SUGESTOES, caminho))
+    rois = detectar_rois(imagem)
+    assert len(rois) == 1
+    x, y, largura, altura = rois[0]["retangulo"]
+    # A garra ocupa o topo da foto; a região marcada começa no terço central
+    assert y > imagem.shape[0] // 4 and altura < imagem.shape[0] // 2
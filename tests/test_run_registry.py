@@ -0,0 +1,86 @@
+from ImgProc_RunRegistry import RegistroExecucoes, configuracao_execucao
+
+# Pastas de mesmo nome em séries diferentes ("peca A") não podem cair no mesmo espécime
+def test_especime_pelo_caminho_relativo(tmp_path):
+    registro = RegistroExecucoes(str(tmp_path / "execucoes.sqlite"))
+    for serie in ("sugestao (1)", "sugestao (2)"):
+        pasta = tmp_path / "images" / serie / "peca A"
+        pasta.mkdir(parents=True)
+        imagem = pasta / "IMG_1.jpg"
+        imagem.write_bytes(serie.encode())
+        resultado = {"imagem": str(imagem), "status": "ok", "pontos": 1, "distancias": 0, "erro": None}
+        registro.registrar(resultado, serie, {"pipeline": "monitoramento"}, "h", [])
+    especimes = [linha["especime"] for linha in registro.especimes()]
+    registro.fechar()
+    assert especimes == ["images/sugestao (1)/peca A", "images/sugestao (2)/peca A"]
+
+# Recalibrar o perfil (mesmo nome, outra tabela) invalida as execuções registradas
+def test_hash_acompanha_tabela_de_calibracao(tmp_path):
+    from ImgProc_Calibration import carregar_perfil, compilar_tabela, operacao_limiar, salvar_perfil
+
+    hashes = []
+    for limiar in (120, 140):
+        tabela = compilar_tabela(operacao_limiar(limiar))
+        caminho = salvar_perfil({"nome": "teste", "tabela_deteccao": tabela, "tabela_preto": tabela}, str(tmp_path))
+        carregar_perfil.cache_clear()
+        hashes.append(configuracao_execucao("distancias", {"calibracao": caminho})[1])
+    assert hashes[0] != hashes[1]
+
+# Editar as regiões de uma montagem (mesmo nome, outra geometria) também invalida as execuções
+def test_hash_acompanha_geometria_das_rois(tmp_path):
+    from ImgProc_ROI import carregar_rois, normalizar_roi, salvar_rois
+
+    hashes = []
+    for largura in (100, 120):
+        caminho = salvar_rois("teste", [normalizar_roi({"retangulo": (0, 0, largura, 50)})], str(tmp_path))
+        carregar_rois.cache_clear()
+        hashes.append(configuracao_execucao("monitoramento", {"rois": caminho})[1])
+    assert hashes[0] != hashes[1]
+
+# Duas cópias idênticas da mesma foto em pastas diferentes: processar a primeira não pula a segunda,
+# e cada espécime fica com a sua execução
+def test_copias_identicas_em_pastas_diferentes(tmp_path):
+    from ImgProc_BatchProcessing import filtrar_processadas
+
+    registro = RegistroExecucoes(str(tmp_path / "execucoes.sqlite"))
+    caminhos = []
+    for peca in ("peca A", "peca B"):
+        pasta = tmp_path / peca
+        pasta.mkdir()
+        (pasta / "IMG_1.jpg").write_bytes(b"mesmo conteudo")
+        caminhos.append(str(pasta / "IMG_1.jpg"))
+
+    pendentes, hashes = filtrar_processadas(registro, caminhos, "h")
+    assert pendentes == caminhos and hashes[caminhos[0]] == hashes[caminhos[1]]
+    resultado = {"imagem": caminhos[0], "status": "ok", "pontos": 1, "distancias": 0, "erro": None}
+    registro.registrar(resultado, hashes[caminhos[0]], {"pipeline": "monitoramento"}, "h", [])
+    assert filtrar_processadas(registro, caminhos, "h")[0] == caminhos[1:]
+    registro.registrar(dict(resultado, imagem=caminhos[1]), hashes[caminhos[1]], {"pipeline": "monitoramento"}, "h", [])
+    assert filtrar_processadas(registro, caminhos, "h")[0] == []
+    especimes = [linha["especime"] for linha in registro.especimes()]
+    registro.fechar()
+    assert especimes == ["peca A", "peca B"]
+
+# Um banco da versão 1 (chave sem o caminho) é migrado ao abrir, sem perder as execuções registradas
+def test_migracao_do_esquema_v1(tmp_path):
+    import sqlite3
+
+    from ImgProc_RunRegistry import ESQUEMA, VERSAO_ESQUEMA
+
+    caminho = str(tmp_path / "execucoes.sqlite")
+    conexao = sqlite3.connect(caminho)
+    conexao.executescript(ESQUEMA.replace("UNIQUE (hash_imagem, hash_configuracao, caminho_imagem)",
+                                          "UNIQUE (hash_imagem, hash_configuracao)"))
+    conexao.execute("""INSERT INTO execucoes (hash_imagem, hash_configuracao, configuracao, pipeline, especime,
+                           caminho_imagem, data_processamento, status)
+                       VALUES ('a', 'h', '{}', 'monitoramento', 'peca A', '/x/peca A/IMG_1.jpg', 0, 'ok')""")
+    conexao.commit()
+    conexao.close()
+
+    registro = RegistroExecucoes(caminho)
+    assert registro.conexao.execute("PRAGMA user_version").fetchone()[0] == VERSAO_ESQUEMA
+    assert [linha["especime"] for linha in registro.consultar()] == ["peca A"]
+    resultado = {"imagem": str(tmp_path / "IMG_1.jpg"), "status": "ok", "pontos": 1, "distancias": 0, "erro": None}
+    registro.registrar(resultado, "a", {"pipeline": "monitoramento"}, "h", [])
+    assert len(registro.consultar()) == 2
+    registro.fechar()
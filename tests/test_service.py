@@ -0,0 +1,64 @@
+import json
+import os
+
+import pytest
+
+from conftest import PASTA_IMAGENS
+from ImgProc_Service import _montar_pedido
+
+CORPO = json.dumps({"caminho": os.path.join(PASTA_IMAGENS, "289_nos.jpg")}).encode()
+
+# Parâmetros inválidos são recusados ao montar o pedido (resposta 400), antes de chegar ao worker
+@pytest.mark.parametrize("parametros", [
+    {"pipeline": "outro"},
+    {"modo_distancias": "outro"},
+    {"deteccao": "outra"},
+    {"detector": "outro"},
+    {"modo_distancias": "raio"},
+])
+def test_parametros_invalidos(parametros):
+    with pytest.raises(ValueError):
+        _montar_pedido(parametros, CORPO, "application/json")
+
+@pytest.mark.parametrize("deteccao", ["completa", "piramide", "blocos"])
+def test_modos_de_deteccao(deteccao):
+    pedido = _montar_pedido({"deteccao": deteccao}, CORPO, "application/json")
+    assert pedido["opcoes"]["deteccao"] == deteccao
+
+# As opções do cliente (só biblioteca padrão) viram parâmetros que o serviço aceita
+def test_opcoes_do_cliente(monkeypatch):
+    import ImgProc_Service
+    from ImgProc_BatchProcessing import MODOS_DETECCAO
+
+    recebidos = []
+    monkeypatch.setattr(ImgProc_Service, "cliente", lambda args: recebidos.append(args) or 0)
+    ImgProc_Service.main(["cliente", "x.jpg", "--deteccao", "piramide", "--detector", "centroides",
+                          "--subpixel", "cantos"])
+    parametros = ImgProc_Service.parametros_cliente(recebidos[0])
+    assert parametros["deteccao"] in MODOS_DETECCAO
+    pedido = _montar_pedido(parametros, CORPO, "application/json")
+    assert pedido["opcoes"] == {"modo_distancias": "todos", "deteccao": "piramide", "detector": "centroides",
+                                "subpixel": "cantos"}
+
+# Pedidos ainda na fila ao encerrar recebem o erro de encerramento em vez de esperar o tempo limite
+def test_encerrar_resolve_pedidos_na_fila():
+    import threading
+    import time
+
+    from ImgProc_Service import ServicoDeteccao
+
+    servico = ServicoDeteccao(processos=1, tamanho_lote=1)
+    # Ocupa a única vaga: o despachante retira o primeiro pedido e espera, deixando os demais na fila
+    servico.vagas.acquire()
+    pedido = _montar_pedido({}, json.dumps({"caminho": "inexistente.jpg"}).encode(), "application/json")
+    futuros = [servico.enviar(pedido) for _ in range(3)]
+    while servico.fila.qsize() > 2:
+        time.sleep(0.01)
+    threading.Timer(0.2, servico.vagas.release).start()
+    servico.encerrar()
+    for futuro in futuros[1:]:
+        with pytest.raises(RuntimeError, match="encerrando"):
+            futuro.result(timeout=5)
+    futuros[0].exception(timeout=30)
+    with pytest.raises(RuntimeError, match="encerrando"):
+        servico.enviar(pedido).result(timeout=1)
@@ -0,0 +1,70 @@
+import os
+
+import numpy as np
+import pytest
+
+from ImgProc_StageCache import CacheEtapas, chave_etapa, hash_imagem
+
+# Arrays de 1000 bytes: o tamanho em disco (.npy) inclui o cabeçalho
+def array(valor):
+    return np.full(1000, valor, dtype=np.uint8)
+
+# Ao passar do limite, sai o menos usado recentemente (ler uma chave a renova)
+def test_lru_em_memoria():
+    cache = CacheEtapas(limite_memoria=3000)
+    for chave in "abc":
+        cache.guardar(chave, array(ord(chave)))
+    assert cache.obter("a") is not None
+    cache.guardar("d", array(0))
+    assert list(cache.memoria) == ["c", "a", "d"]
+    assert cache.obter("b") is None
+    assert cache.bytes_memoria == 3000
+
+def test_array_maior_que_o_limite_nao_fica_em_memoria():
+    cache = CacheEtapas(limite_memoria=500)
+    cache.guardar("a", array(1))
+    assert cache.obter("a") is None and cache.bytes_memoria == 0
+
+# Em disco, os arquivos mais antigos (por último acesso) saem até o total caber no limite
+def test_limite_em_disco(tmp_path):
+    tamanho_arquivo = 1128
+    cache = CacheEtapas(str(tmp_path), limite_memoria=0, limite_disco=2 * tamanho_arquivo + 100)
+    for instante, chave in enumerate(("a1", "b1")):
+        cache.guardar(chave, array(instante))
+        os.utime(cache._caminho(chave), (1000 + instante, 1000 + instante))
+    # Ler "a1" do disco atualiza a data: "b1" passa a ser o mais antigo
+    assert cache.obter("a1") is not None
+    cache.guardar("c1", array(2))
+
+    restantes = sorted(os.path.basename(caminho) for caminho, _, _ in cache._arquivos_disco())
+    assert restantes == ["a1.npy", "c1.npy"]
+    assert cache.bytes_disco == 2 * tamanho_arquivo <= cache.limite_disco
+    assert not [nome for _, _, nomes in os.walk(tmp_path) for nome in nomes if nome.endswith(".tmp")]
+
+# Outro processo (outra instância) encontra o resultado gravado em disco
+def test_leitura_do_disco_por_outra_instancia(tmp_path):
+    CacheEtapas(str(tmp_path)).guardar("ab", array(7))
+    valor = CacheEtapas(str(tmp_path)).obter("ab")
+    np.testing.assert_array_equal(valor, array(7))
+    assert not valor.flags.writeable
+
+def test_obter_ou_calcular():
+    cache = CacheEtapas()
+    chamadas = []
+    def calcular(x):
+        chamadas.append(x)
+        return np.arange(x)
+    primeiro, chave = cache.obter_ou_calcular("etapa", "entrada", {"p": 1}, calcular, 5)
+    segundo, _ = cache.obter_ou_calcular("etapa", "entrada", {"p": 1}, calcular, 5)
+    assert segundo is primeiro and chamadas == [5]
+    assert (cache.acertos, cache.faltas) == (1, 1)
+    assert chave == chave_etapa("etapa", "entrada", {"p": 1}) != chave_etapa("etapa", "entrada", {"p": 2})
+    with pytest.raises(ValueError):
+        primeiro[0] = 1
+
+# O hash distingue forma e tipo, não só os bytes dos pixels
+def test_hash_imagem():
+    imagem = np.zeros((4, 6), dtype=np.uint8)
+    assert hash_imagem(imagem) == hash_imagem(imagem.copy())
+    assert hash_imagem(imagem) != hash_imagem(imagem.reshape(6, 4))
+    assert hash_imagem(imagem) != hash_imagem(imagem.view(np.int8))
@@ -0,0 +1,50 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+from scipy.spatial import cKDTree
+
+from conftest import PASTA_IMAGENS
+from ImgProc_BatchProcessing import PIPELINES
+from ImgProc_ImageLoading import carregar_imagem
+from ImgProc_Pipeline import DESLOCAMENTO_MAXIMO_CANTOS, converter_cinza, refinar_subpixel
+
+CAMINHO = os.path.join(PASTA_IMAGENS, "289_pontos.jpg")
+
+# Referência: centroides das manchas na resolução original, sem as linhas finas da grade (abertura morfológica)
+def centroides_referencia():
+    imagem_cinza = cv2.imread(CAMINHO, cv2.IMREAD_GRAYSCALE)
+    _, binaria = cv2.threshold(imagem_cinza, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    binaria = cv2.morphologyEx(binaria, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5)))
+    _, _, _, centroides = cv2.connectedComponentsWithStats(binaria)
+    return centroides[1:]
+
+# O centroide sub-pixel deve manter a precisão nas imagens decodificadas reduzidas
+@pytest.mark.parametrize("reducao", [1, 2, 4])
+@pytest.mark.parametrize("pipeline", ["monitoramento", "distancias"])
+def test_centroide_em_imagem_real(pipeline, reducao):
+    referencia = centroides_referencia()
+    imagem = carregar_imagem(CAMINHO, "cor", reducao)
+    coordenadas_pontos, _ = PIPELINES[pipeline](imagem, {"subpixel": "centroide", "reducao": reducao})
+    erros, _ = cKDTree(referencia).query(np.asarray(coordenadas_pontos, dtype=np.float64))
+    assert len(coordenadas_pontos) == len(referencia) == 289
+    assert np.median(erros) < 0.45 and np.percentile(erros, 90) < 1.0
+
+# O refino por cantos não pode levar um nó de 289_nos.jpg (espaçamento de 36 px) para outro canto:
+# nenhum ponto se afasta da posição detectada mais que DESLOCAMENTO_MAXIMO_CANTOS
+def test_cantos_ficam_perto_da_deteccao():
+    from ImgProc_StructuralMonitoring import detectar_cantos_com_filtro
+    imagem = cv2.imread(os.path.join(PASTA_IMAGENS, "289_nos.jpg"))
+    detectados = detectar_cantos_com_filtro(imagem)
+    refinados = refinar_subpixel(converter_cinza(imagem), detectados, metodo="cantos")
+    assert len(refinados) == 289
+    assert np.hypot(*(refinados - detectados).T).max() <= DESLOCAMENTO_MAXIMO_CANTOS
+
+# Perto do nó verdadeiro o refino por cantos continua valendo: pontos a 0,7 px dos nós de uma grade sintética
+# voltam para menos de 0,1 px
+def test_cantos_convergem_perto_do_no():
+    from ImgProc_Benchmark import gerar_grade_sintetica
+    imagem, verdadeiros = gerar_grade_sintetica(12, 12, espacamento=30, espessura=1, desfoque=1.5)
+    refinados = refinar_subpixel(converter_cinza(imagem), verdadeiros + (0.5, -0.5))
+    assert np.median(np.hypot(*(refinados - verdadeiros).T)) < 0.1
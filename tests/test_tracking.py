@@ -0,0 +1,19 @@
+import os
+
+import cv2
+import numpy as np
+
+from conftest import PASTA_IMAGENS
+from ImgProc_Tracking import RastreadorPontos
+
+# Um primeiro quadro sem pontos não pode deixar o rastreador vazio pelo resto da sequência
+def test_redetecta_apos_quadro_sem_pontos():
+    imagem = cv2.imread(os.path.join(PASTA_IMAGENS, "289_nos.jpg"))
+    rastreador = RastreadorPontos()
+
+    ids, pontos, redetectado = rastreador.processar(np.full_like(imagem, 255))
+    assert redetectado and len(pontos) == 0
+
+    ids, pontos, redetectado = rastreador.processar(imagem)
+    assert redetectado and len(pontos) > 0
+    assert len(ids) == len(pontos)